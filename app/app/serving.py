@@ -0,0 +1,141 @@
+"""
+Serving profile for gunicorn, see gunicorn.conf.py
+
+Worker and thread counts are derived from the cores and memory the
+container may actually use (cgroup limits, CPU affinity), every value
+can be pinned through the environment:
+
+    SERVER_MODE          wsgi (sync or threaded workers) or asgi
+    WEB_CONCURRENCY      number of worker processes
+    WORKER_THREADS       threads per WSGI worker, 1 for sync workers
+    WORKER_MEMORY_MB     expected resident size of one worker
+    MAX_REQUESTS         recycle a worker after this many requests
+    MAX_REQUESTS_JITTER  random extra requests so workers do not
+                         recycle together
+    WORKER_TIMEOUT       seconds before a silent worker is killed
+    BIND                 address to listen on
+"""
+import os
+
+MODES = ('wsgi', 'asgi')
+APPLICATIONS = {
+    'wsgi': 'app.wsgi:application',
+    'asgi': 'app.asgi:application',
+}
+WORKER_CLASSES = {
+    'asgi': 'uvicorn.workers.UvicornWorker',
+}
+
+DEFAULTS = {
+    'SERVER_MODE': 'wsgi',
+    'WORKER_THREADS': 1,
+    'WORKER_MEMORY_MB': 150,
+    'MAX_REQUESTS': 1000,
+    'MAX_REQUESTS_JITTER': 100,
+    'WORKER_TIMEOUT': 30,
+    'BIND': '0.0.0.0:8000',
+}
+# memory left to the master, page cache and anything else in the container
+RESERVED_MEMORY_MB = 128
+
+
+def _read(path):
+    try:
+        with open(path) as handle:
+            return handle.read().strip()
+    except OSError:
+        return None
+
+
+def available_cpus():
+    """
+        return the cores this process may use, honouring CPU affinity
+        and a cgroup v2 `cpu.max` or v1 CFS quota, rounded up
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    quota = period = None
+    cpu_max = _read('/sys/fs/cgroup/cpu.max')
+    if cpu_max:
+        value, _, value_period = cpu_max.partition(' ')
+        if value != 'max':
+            quota, period = int(value), int(value_period or 100000)
+    else:
+        value = _read('/sys/fs/cgroup/cpu/cpu.cfs_quota_us')
+        value_period = _read('/sys/fs/cgroup/cpu/cpu.cfs_period_us')
+        if value and value_period and int(value) > 0:
+            quota, period = int(value), int(value_period)
+    if quota and period:
+        cpus = min(cpus, max(1, -(-quota // period)))
+    return cpus
+
+
+def available_memory_mb():
+    """
+        return the memory limit of the cgroup, or of the machine, in MB
+    """
+    for path in (
+        '/sys/fs/cgroup/memory.max',
+        '/sys/fs/cgroup/memory/memory.limit_in_bytes',
+    ):
+        value = _read(path)
+        # v1 reports an unlimited group as a huge page aligned number
+        if value and value != 'max' and int(value) < 1 << 60:
+            return int(value) // (1024 * 1024)
+    try:
+        pages = os.sysconf('SC_PHYS_PAGES')
+        page_size = os.sysconf('SC_PAGE_SIZE')
+    except (ValueError, OSError, AttributeError):
+        return None
+    return pages * page_size // (1024 * 1024)
+
+
+def worker_count(cpus, memory_mb, worker_memory_mb):
+    """
+        2 * cores + 1 workers, as many as fit in memory, at least one
+
+        the same rule applies to ASGI: Django 3.2 runs sync views on a
+        single thread per worker, so an event loop does not replace
+        processes for this app
+    """
+    workers = 2 * cpus + 1
+    if memory_mb:
+        fit = (memory_mb - RESERVED_MEMORY_MB) // worker_memory_mb
+        workers = min(workers, fit)
+    return max(1, workers)
+
+
+def get_config(environ=None):
+    """
+        return the serving profile, environment values over the defaults
+        and the autotuned worker count
+    """
+    environ = os.environ if environ is None else environ
+    config = {
+        name: type(default)(environ.get(name, default))
+        for name, default in DEFAULTS.items()
+    }
+    if config['SERVER_MODE'] not in MODES:
+        raise ValueError(f'SERVER_MODE must be one of {", ".join(MODES)}')
+
+    config['CPUS'] = available_cpus()
+    config['MEMORY_MB'] = available_memory_mb()
+    if environ.get('WEB_CONCURRENCY'):
+        config['WORKERS'] = int(environ['WEB_CONCURRENCY'])
+    else:
+        config['WORKERS'] = worker_count(
+            config['CPUS'], config['MEMORY_MB'], config['WORKER_MEMORY_MB']
+        )
+
+    config['APPLICATION'] = APPLICATIONS[config['SERVER_MODE']]
+    if config['SERVER_MODE'] in WORKER_CLASSES:
+        config['WORKER_CLASS'] = WORKER_CLASSES[config['SERVER_MODE']]
+        config['WORKER_THREADS'] = 1
+    elif config['WORKER_THREADS'] > 1:
+        config['WORKER_CLASS'] = 'gthread'
+    else:
+        config['WORKER_CLASS'] = 'sync'
+    return config
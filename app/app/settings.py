@@ -46,6 +46,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestMetricsMiddleware',
+    'core.query_detector.QueryDetectorMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -79,13 +81,45 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+# Connections are kept for DB_CONN_MAX_AGE seconds and checked with a
+# SELECT 1 before reuse, see core.db. DB_POOLER=transaction for an
+# external pooler in transaction mode (pgbouncer), which cannot hold
+# server side cursors across transactions
+
+DB_POOLER = os.environ.get('DB_POOLER', '')
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
         'NAME': os.environ.get('DB_NAME'),
         'HOST': os.environ.get('DB_HOST'),
+        'PORT': os.environ.get('DB_PORT', ''),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS':
+            os.environ.get('DB_CONN_HEALTH_CHECKS', '1') == '1',
+        'DISABLE_SERVER_SIDE_CURSORS': DB_POOLER == 'transaction',
+    }
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/ref/settings/#caches
+
+# Shared by the response cache, token lookups and login rate limits, set
+# CACHE_LOCATION to a memcached server so every worker process sees the
+# same entries, without it each process keeps its own memory cache
+
+CACHE_LOCATION = os.environ.get('CACHE_LOCATION', '')
+
+CACHES = {
+    'default': {
+        'BACKEND':
+            'django.core.cache.backends.memcached.PyMemcacheCache'
+            if CACHE_LOCATION
+            else 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': CACHE_LOCATION,
     }
 }
 
@@ -108,6 +142,42 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing, see core.hashing
+# PASSWORD_HASHER picks the algorithm of new hashes, the others stay to
+# verify existing hashes, which are upgraded on the next login
+
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'argon2')
+_POOLED_HASHERS = {
+    'argon2': 'core.hashing.PooledArgon2PasswordHasher',
+    'bcrypt': 'core.hashing.PooledBCryptSHA256PasswordHasher',
+    'pbkdf2': 'core.hashing.PooledPBKDF2PasswordHasher',
+}
+
+PASSWORD_HASHERS = [_POOLED_HASHERS[PASSWORD_HASHER]] + [
+    path for name, path in _POOLED_HASHERS.items() if name != PASSWORD_HASHER
+]
+
+PASSWORD_HASHING = {
+    'WORKERS': int(os.environ.get('PASSWORD_HASHING_WORKERS', '1')),
+    'MAX_PENDING': 8,
+    'TIMEOUT': 2,
+    'ARGON2_TIME_COST': 2,
+    'ARGON2_MEMORY_COST': 19456,
+    'ARGON2_PARALLELISM': 1,
+}
+
+# Token and signup rate limits, see user.throttling
+# counted in the default cache, configure a shared CACHES backend when
+# running several processes, an empty rate disables the limit
+
+REST_FRAMEWORK = {
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': os.environ.get('LOGIN_RATE_PER_IP', '30/min') or None,
+        'login_email':
+            os.environ.get('LOGIN_RATE_PER_EMAIL', '10/min') or None,
+    },
+}
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/3.2/topics/i18n/
@@ -137,4 +207,122 @@ STATIC_ROOT = 'vol/web/static'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
-AUTH_USER_MODEL = 'core.User'
\ No newline at end of file
+AUTH_USER_MODEL = 'core.User'
+
+# Thumbnails rendered for every uploaded recipe image, see recipe.images
+
+RECIPE_IMAGE_DERIVATIVES = {
+    'SIZES': (128, 512),
+    'FORMATS': ('webp', 'jpeg'),
+    'QUALITY': 80,
+    'WORKERS': int(os.environ.get('RECIPE_IMAGE_WORKERS', 2)),
+}
+
+# Limits checked while recipe images stream in, see recipe.uploads
+
+RECIPE_IMAGE_MAX_UPLOAD_SIZE = int(
+    os.environ.get('RECIPE_IMAGE_MAX_UPLOAD_SIZE', 10 * 1024 * 1024)
+)
+RECIPE_IMAGE_MAX_PIXELS = int(
+    os.environ.get('RECIPE_IMAGE_MAX_PIXELS', 24000000)
+)
+
+# Text search configuration used for recipe search vectors
+
+RECIPE_SEARCH_CONFIG = 'english'
+
+# Per user response cache of the recipe list endpoints, see recipe.caching
+# unset, it is on only when the cache is shared by the worker processes,
+# RECIPE_RESPONSE_CACHE=1 or 0 forces it
+
+RECIPE_RESPONSE_CACHE = {
+    'ENABLED': {'1': True, '0': False}.get(
+        os.environ.get('RECIPE_RESPONSE_CACHE')
+    ),
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': 300,
+}
+
+# Delta sync endpoint, see recipe.sync
+# SAFETY_WINDOW seconds are resent on every sync to cover rows stamped
+# by transactions that had not committed yet, keep it above the longest
+# write transaction
+
+RECIPE_SYNC = {
+    'PAGE_SIZE': 200,
+    'MAX_PAGE_SIZE': 1000,
+    'SAFETY_WINDOW': 10,
+    'TOMBSTONE_RETENTION_DAYS': 30,
+}
+
+# Largest batch accepted by the recipe bulk endpoint
+
+RECIPE_BULK_MAX_ITEMS = 1000
+
+# Recipe import, see recipe.importer
+# MAX_REQUEST_ROWS bounds the work of one upload, clients continue with
+# the returned offset
+
+RECIPE_IMPORT = {
+    'BATCH_SIZE': 1000,
+    'MAX_UPLOAD_SIZE': 200 * 1024 * 1024,
+    'MAX_REQUEST_ROWS': 50000,
+    'MAX_ERRORS': 100,
+}
+
+# Rows per server side cursor fetch of the recipe export
+
+RECIPE_EXPORT_CHUNK_SIZE = 2000
+
+# Per request metrics, see core.middleware
+# histograms are served at /internal/metrics/ to ALLOWED_NETWORKS only,
+# they are per process so scrape every worker
+
+REQUEST_METRICS = {
+    'ENABLED': os.environ.get('REQUEST_METRICS', '1') == '1',
+    'SERVER_TIMING': os.environ.get('SERVER_TIMING_HEADER', '1') == '1',
+    'ALLOWED_NETWORKS': ('127.0.0.1/32', '::1/128'),
+}
+
+# N+1 and slow query detector, see core.query_detector
+# meant for tests and staging, ACTION 'raise' fails the request
+
+QUERY_DETECTOR = {
+    'ENABLED': os.environ.get('QUERY_DETECTOR', '0') == '1',
+    'ACTION': os.environ.get('QUERY_DETECTOR_ACTION', 'log'),
+    'MAX_REPEATS': 5,
+    'SLOW_QUERY_MS': 200,
+}
+
+# Recipe, tag and ingredient reads as async views, see core.async_views
+# on by default under SERVER_MODE=asgi, THREADS bounds the pool and the
+# database connections it holds per worker
+
+ASYNC_READ_VIEWS = {
+    'ENABLED': os.environ.get(
+        'ASYNC_READ_VIEWS',
+        '1' if os.environ.get('SERVER_MODE') == 'asgi' else '0'
+    ) == '1',
+    'THREADS': int(os.environ.get('ASYNC_READ_THREADS', '4')),
+}
+
+# Liveness and readiness endpoints, see core.health
+# /readyz/ answers 503 until DATABASES accept queries and are migrated
+
+HEALTH_CHECKS = {
+    'DATABASES': ('default',),
+    'CHECK_MIGRATIONS': True,
+}
+
+# Token authentication cache, see user.authentication
+# CACHE_ALIAS enables the shared tier on top of the in process LRU, it
+# also carries revocations to the other processes, without it they keep
+# accepting a deleted token for up to TTL seconds
+
+TOKEN_AUTH_CACHE = {
+    'TTL': int(os.environ.get('TOKEN_AUTH_CACHE_TTL', 60)),
+    'MAX_ENTRIES': 10000,
+    'CACHE_ALIAS': os.environ.get('TOKEN_AUTH_CACHE_ALIAS') or (
+        'default' if CACHE_LOCATION else None
+    ),
+}
\ No newline at end of file
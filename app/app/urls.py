@@ -19,8 +19,13 @@ from django.urls.conf import include
 from django.conf.urls.static import static
 from django.conf import settings
 
+from core.views import healthz, metrics_view, readyz
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/user/',include('user.urls')),
     path('api/recipe/', include('recipe.urls')),
+    path('internal/metrics/', metrics_view, name='metrics'),
+    path('healthz/', healthz, name='healthz'),
+    path('readyz/', readyz, name='readyz'),
 ] + static(settings.MEDIA_URL, document_root = settings.MEDIA_ROOT)
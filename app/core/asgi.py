@@ -0,0 +1,59 @@
+from asgiref.sync import sync_to_async
+from django.core.handlers import asgi
+
+_DONE = object()
+
+
+class ASGIHandler(asgi.ASGIHandler):
+    """
+        Django's ASGI handler, pulling each part of a streaming response
+        from the thread the sync views run in
+
+        Django 3.2 iterates streaming content on the event loop, where a
+        generator that queries the database, like the recipe export,
+        raises SynchronousOnlyOperation once the headers are sent. the
+        response still streams and the loop is not blocked
+    """
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': response_headers(response),
+        })
+        # the same thread as the view, which may hold an open cursor
+        next_part = sync_to_async(next, thread_sensitive=True)
+        parts = iter(response)
+        while True:
+            part = await next_part(parts, _DONE)
+            if part is _DONE:
+                break
+            for chunk, _ in self.chunk_bytes(part):
+                await send({
+                    'type': 'http.response.body',
+                    'body': chunk,
+                    'more_body': True,
+                })
+        await send({'type': 'http.response.body'})
+        await sync_to_async(response.close, thread_sensitive=True)()
+
+
+def response_headers(response):
+    """
+        return the headers and cookies of `response` as ASGI byte pairs
+    """
+    headers = []
+    for header, value in response.items():
+        if isinstance(header, str):
+            header = header.encode('ascii')
+        if isinstance(value, str):
+            value = value.encode('latin1')
+        headers.append((bytes(header), bytes(value)))
+    for cookie in response.cookies.values():
+        headers.append(
+            (b'Set-Cookie', cookie.output(header='').encode('ascii').strip())
+        )
+    return headers
@@ -0,0 +1,98 @@
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.urls import URLPattern
+from rest_framework.permissions import SAFE_METHODS
+
+from core import db, middleware
+
+DEFAULTS = {
+    'ENABLED': False,
+    'THREADS': 4,
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_config():
+    """
+        return async view settings merged over the defaults
+    """
+    return {**DEFAULTS, **getattr(settings, 'ASYNC_READ_VIEWS', {})}
+
+
+def executor():
+    """
+        the pool running read views, THREADS also bounds the database
+        connections a worker holds for them
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=get_config()['THREADS'],
+                thread_name_prefix='read-view',
+            )
+        return _executor
+
+
+def async_view(view):
+    """
+        wrap a sync view function in a coroutine for the ASGI handler
+
+        Django 3.2 has no async ORM and runs every sync view of a process
+        on one thread, so GET, HEAD and OPTIONS run the view on the
+        bounded pool instead, where requests wait on the database side by
+        side. other methods keep Django's single thread. the response is
+        rendered in the same thread as the view.
+    """
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in SAFE_METHODS:
+            return await sync_to_async(view, thread_sensitive=True)(
+                request, *args, **kwargs
+            )
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            executor(), functools.partial(
+                context.run, _run, view, request, *args, **kwargs
+            )
+        )
+    return wrapper
+
+
+def _run(view, request, *args, **kwargs):
+    # pool threads hold their own connections, apply CONN_MAX_AGE and the
+    # health check as the handler does around a request
+    close_old_connections()
+    db.mark_health_checks()
+    try:
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render') and not response.is_rendered:
+            middleware.render(request, response)
+        return response
+    finally:
+        close_old_connections()
+
+
+def async_patterns(patterns, names):
+    """
+        return `patterns` with the views of the URL `names` made async,
+        same routes and names
+    """
+    return [
+        URLPattern(
+            pattern.pattern, async_view(pattern.callback),
+            pattern.default_args, pattern.name
+        )
+        if isinstance(pattern, URLPattern) and pattern.name in names
+        else pattern
+        for pattern in patterns
+    ]
@@ -0,0 +1,228 @@
+import os
+import platform
+import random
+import statistics
+import subprocess
+import time
+from contextlib import contextmanager
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.test.utils import (
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+
+from core.models import Ingredient, Recipe, Tag
+
+
+@contextmanager
+def isolated_database(verbosity=0):
+    """
+        run benchmarks against a throwaway test database so seeded rows
+        never touch the real one
+    """
+    setup_test_environment()
+    old_config = setup_databases(verbosity, interactive=False)
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity)
+        teardown_test_environment()
+
+
+def create_users(count, prefix='bench', password='password'):
+    """
+        create `count` users sharing one precomputed password hash
+    """
+    encoded = make_password(password)
+    users = [
+        get_user_model()(
+            email=f'{prefix}-{index}@example.com',
+            name=f'{prefix} {index}',
+            password=encoded,
+        )
+        for index in range(count)
+    ]
+    get_user_model().objects.bulk_create(users)
+    return list(
+        get_user_model().objects
+        .filter(email__startswith=f'{prefix}-')
+        .order_by('id')
+    )
+
+
+def seed_user(user, recipes=0, tags=0, ingredients=0, links=3,
+              batch_size=1000, seed=0, vocabulary=None):
+    """
+        bulk insert tags, ingredients and recipes for a user, linking each
+        recipe to up to `links` random tags and ingredients, titles are
+        drawn from `vocabulary` words when given
+    """
+    rng = random.Random(seed)
+
+    def title(index):
+        if not vocabulary:
+            return f'recipe {index}'
+        return ' '.join(rng.sample(vocabulary, min(3, len(vocabulary))))
+
+    Tag.objects.bulk_create(
+        (Tag(user=user, name=f'tag {index}') for index in range(tags)),
+        batch_size=batch_size
+    )
+    Ingredient.objects.bulk_create(
+        (
+            Ingredient(user=user, name=f'ingredient {index}')
+            for index in range(ingredients)
+        ),
+        batch_size=batch_size
+    )
+    first_recipe = Recipe.objects.order_by('-id').values_list(
+        'id', flat=True
+    ).first() or 0
+    Recipe.objects.bulk_create(
+        (
+            Recipe(
+                user=user,
+                title=title(index),
+                time_minutes=rng.randint(5, 180),
+                price=f'{rng.randint(100, 99999) / 100:.2f}',
+            )
+            for index in range(recipes)
+        ),
+        batch_size=batch_size
+    )
+
+    recipe_ids = list(
+        Recipe.objects.filter(user=user, id__gt=first_recipe)
+        .values_list('id', flat=True)
+    )
+    for model, name in ((Tag, 'tags'), (Ingredient, 'ingredients')):
+        related_ids = list(
+            model.objects.filter(user=user).values_list('id', flat=True)
+        )
+        if not related_ids:
+            continue
+        through = Recipe._meta.get_field(name).remote_field.through
+        column = f'{model._meta.model_name}_id'
+        through.objects.bulk_create(
+            (
+                through(recipe_id=recipe_id, **{column: related_id})
+                for recipe_id in recipe_ids
+                for related_id in rng.sample(
+                    related_ids, min(links, len(related_ids))
+                )
+            ),
+            batch_size=batch_size
+        )
+
+    return recipe_ids
+
+
+def timed(func, repeat):
+    """
+        call `func` `repeat` times, return durations in milliseconds
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+def percentile(values, pct):
+    """
+        nearest rank percentile of `values`
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarize(durations):
+    """
+        return the latency summary reported by benchmark commands
+    """
+    return {
+        'p50': round(percentile(durations, 50), 3),
+        'p95': round(percentile(durations, 95), 3),
+        'p99': round(percentile(durations, 99), 3),
+        'mean': round(statistics.fmean(durations), 3) if durations else 0.0,
+    }
+
+
+def run_scenario(func, requests, count_queries=True):
+    """
+        call `func` (returning an HTTP status) `requests` times and return
+        latency percentiles, error count, queries per request and
+        throughput
+    """
+    durations, queries, errors = [], 0, 0
+    started = time.perf_counter()
+    for index in range(requests):
+        if count_queries:
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                status_code = func(index)
+                durations.append((time.perf_counter() - start) * 1000)
+            queries += len(ctx.captured_queries)
+        else:
+            start = time.perf_counter()
+            status_code = func(index)
+            durations.append((time.perf_counter() - start) * 1000)
+        if status_code >= 400:
+            errors += 1
+    elapsed = time.perf_counter() - started
+
+    return {
+        'requests': requests,
+        'errors': errors,
+        **summarize(durations),
+        'queries_per_request': (
+            round(queries / requests, 2) if count_queries and requests
+            else None
+        ),
+        'throughput_rps': round(requests / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def git_revision():
+    """
+        return the commit being benchmarked, GIT_SHA wins over git
+    """
+    if os.environ.get('GIT_SHA'):
+        return os.environ['GIT_SHA']
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    """
+        describe the setup a benchmark ran on, stored next to results
+    """
+    return {
+        'git_sha': git_revision(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'cpu_count': os.cpu_count(),
+        'machine': platform.machine(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+    }
@@ -0,0 +1,92 @@
+import contextvars
+import functools
+from contextlib import contextmanager
+
+from django.core.signals import request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+# wrappers of the current request, contexts follow a request into
+# sync_to_async threads and the core.async_views pool
+_query_wrappers = contextvars.ContextVar('query_wrappers', default=())
+
+
+@contextmanager
+def wrapping_queries(wrapper):
+    """
+        run `wrapper`, a connection.execute_wrapper callable, around every
+        query issued in this context, whichever thread runs it
+    """
+    token = _query_wrappers.set(_query_wrappers.get() + (wrapper,))
+    try:
+        yield wrapper
+    finally:
+        _query_wrappers.reset(token)
+
+
+def _dispatch(execute, sql, params, many, context):
+    for wrapper in reversed(_query_wrappers.get()):
+        execute = functools.partial(wrapper, execute)
+    return execute(sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_dispatch(sender, connection, **kwargs):
+    if _dispatch not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_dispatch)
+
+
+@receiver(connection_created)
+def install_health_check(sender, connection, **kwargs):
+    """
+        run a pending health check before the next cursor is created, as
+        Django 4.1 does in BaseDatabaseWrapper._cursor
+    """
+    if getattr(connection, '_health_check_installed', False):
+        return
+    cursor = connection._cursor
+
+    @functools.wraps(cursor)
+    def checked_cursor(*args, **kwargs):
+        close_if_health_check_failed(connection)
+        return cursor(*args, **kwargs)
+
+    connection._cursor = checked_cursor
+    connection._health_check_installed = True
+
+
+@receiver(request_started)
+def mark_health_checks(**kwargs):
+    """
+        mark persistent connections to be checked before their first
+        query of the request, so a connection that died while idle is
+        replaced instead of failing that query
+
+        enabled per database with CONN_HEALTH_CHECKS, as in Django 4.1,
+        only connections reused across requests (CONN_MAX_AGE) are open
+        at this point. requests that never query, like cache hits, 304s
+        and /healthz/, pay no round trip
+    """
+    for connection in connections.all():
+        if (
+            connection.connection is not None
+            and connection.settings_dict.get('CONN_HEALTH_CHECKS')
+        ):
+            connection.health_check_done = False
+
+
+def close_if_health_check_failed(connection):
+    """
+        close `connection` if it is marked for a check and no longer
+        usable, the caller then opens a new one
+    """
+    if (
+        connection.connection is None
+        or getattr(connection, 'health_check_done', True)
+        or connection.in_atomic_block
+    ):
+        return
+    connection.health_check_done = True
+    if not connection.is_usable():
+        connection.close()
@@ -0,0 +1,157 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.utils.module_loading import import_string
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import exceptions
+
+DEFAULTS = {
+    'WORKERS': 1,
+    'MAX_PENDING': 8,
+    'TIMEOUT': 2,
+    # OWASP baseline for argon2id (19 MiB, 2 passes, 1 lane), at least as
+    # strong as PBKDF2-SHA256 with 600000 iterations. Django 3.2's
+    # Argon2PasswordHasher uses 100 MiB and 8 lanes (512 KiB and 2 lanes
+    # up to 3.1), so a hash costs 19 MiB more than PBKDF2 but less than
+    # Django's argon2 default. each pool worker holds one hash at a time,
+    # WORKERS bounds the extra memory per web worker to WORKERS * 19 MiB
+    'ARGON2_TIME_COST': 2,
+    'ARGON2_MEMORY_COST': 19456,
+    'ARGON2_PARALLELISM': 1,
+}
+
+_pool = None
+_pending = None
+_lock = threading.Lock()
+
+
+def get_config():
+    """
+        return password hashing settings merged over the defaults
+    """
+    return {**DEFAULTS, **getattr(settings, 'PASSWORD_HASHING', {})}
+
+
+class HashingBusy(exceptions.APIException):
+    status_code = 503
+    default_detail = _('Too many password checks in progress, retry shortly.')
+    default_code = 'hashing_busy'
+
+
+def _reset():
+    global _pool, _pending
+    _pool = _pending = None
+
+
+# a preloaded gunicorn master must not hand its pool to the workers
+os.register_at_fork(after_in_child=_reset)
+
+
+def _get_pool():
+    global _pool, _pending
+    with _lock:
+        if _pool is None:
+            config = get_config()
+            # spawn, forking a process with request threads is unsafe
+            _pool = ProcessPoolExecutor(
+                max_workers=config['WORKERS'],
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+            _pending = threading.BoundedSemaphore(config['MAX_PENDING'])
+        return _pool, _pending
+
+
+def _call(hasher_path, attributes, method, args):
+    # runs in the pool, the plain Django hasher needs no settings
+    hasher = import_string(hasher_path)()
+    hasher.__dict__.update(attributes)
+    return getattr(hasher, method)(*args)
+
+
+def run(hasher_path, attributes, method, *args):
+    """
+        call `method` of the hasher at `hasher_path`, with `attributes`
+        set on it, in the process pool
+
+        at most MAX_PENDING calls per process run or wait for a pool
+        worker, callers beyond that wait up to TIMEOUT seconds and then
+        get HashingBusy (503), so a login burst queues instead of piling
+        up. WORKERS = 0 hashes inline.
+    """
+    config = get_config()
+    if not config['WORKERS']:
+        return _call(hasher_path, attributes, method, args)
+    pool, pending = _get_pool()
+    if not pending.acquire(timeout=config['TIMEOUT']):
+        raise HashingBusy()
+    try:
+        try:
+            return pool.submit(
+                _call, hasher_path, attributes, method, args
+            ).result()
+        except BrokenProcessPool:
+            # a killed worker breaks the pool for good, start a new one
+            with _lock:
+                if _pool is pool:
+                    _reset()
+            pool, _ = _get_pool()
+            return pool.submit(
+                _call, hasher_path, attributes, method, args
+            ).result()
+    finally:
+        pending.release()
+
+
+class PooledHasherMixin:
+    """
+        run the expensive encode and verify of a Django hasher in the
+        process pool, the algorithm name and hash format are unchanged
+    """
+    base_hasher = None
+    # cost parameters handed to the hasher in the pool
+    cost_attributes = ()
+
+    def encode(self, password, salt, *args):
+        return run(
+            self.base_hasher, self._costs(), 'encode', password, salt, *args
+        )
+
+    def verify(self, password, encoded):
+        return run(
+            self.base_hasher, self._costs(), 'verify', password, encoded
+        )
+
+    def _costs(self):
+        return {name: getattr(self, name) for name in self.cost_attributes}
+
+
+class PooledArgon2PasswordHasher(PooledHasherMixin,
+                                 hashers.Argon2PasswordHasher):
+    """
+        argon2id with the costs from PASSWORD_HASHING, hashes made with
+        other costs are rehashed on the next login (must_update)
+    """
+    base_hasher = 'django.contrib.auth.hashers.Argon2PasswordHasher'
+    cost_attributes = ('time_cost', 'memory_cost', 'parallelism')
+
+    def __init__(self):
+        config = get_config()
+        self.time_cost = config['ARGON2_TIME_COST']
+        self.memory_cost = config['ARGON2_MEMORY_COST']
+        self.parallelism = config['ARGON2_PARALLELISM']
+
+
+class PooledBCryptSHA256PasswordHasher(PooledHasherMixin,
+                                       hashers.BCryptSHA256PasswordHasher):
+    base_hasher = 'django.contrib.auth.hashers.BCryptSHA256PasswordHasher'
+
+
+class PooledPBKDF2PasswordHasher(PooledHasherMixin,
+                                 hashers.PBKDF2PasswordHasher):
+    base_hasher = 'django.contrib.auth.hashers.PBKDF2PasswordHasher'
@@ -0,0 +1,83 @@
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+from django.db.utils import Error
+
+DEFAULTS = {
+    'DATABASES': (DEFAULT_DB_ALIAS,),
+    'CHECK_MIGRATIONS': True,
+}
+
+# aliases whose migrations were seen applied, they do not unapply
+_migrated = set()
+
+
+def get_config():
+    """
+        return health check settings merged over the defaults
+    """
+    return {**DEFAULTS, **getattr(settings, 'HEALTH_CHECKS', {})}
+
+
+def check_database(alias=DEFAULT_DB_ALIAS):
+    """
+        open a real connection and run `SELECT 1`
+
+        `connections[alias]` alone is lazy and never touches the server.
+        a failed probe closes the connection so the next one reconnects
+        instead of reusing a dead socket. raises django.db.Error.
+    """
+    connection = connections[alias]
+    try:
+        connection.ensure_connection()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+    except Error:
+        try:
+            connection.close()
+        except Error:
+            pass
+        raise
+
+
+def pending_migrations(alias=DEFAULT_DB_ALIAS):
+    """
+        return the names of migrations not applied yet to `alias`
+    """
+    if alias in _migrated:
+        return []
+    executor = MigrationExecutor(connections[alias])
+    plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    pending = [
+        f'{migration.app_label}.{migration.name}' for migration, _ in plan
+    ]
+    if not pending:
+        _migrated.add(alias)
+    return pending
+
+
+def readiness():
+    """
+        return (ready, checks) for every configured database, checks maps
+        `<alias>` and `<alias>:migrations` to 'ok', 'unavailable' or
+        'pending'
+    """
+    config = get_config()
+    checks = {}
+    for alias in config['DATABASES']:
+        try:
+            check_database(alias)
+        except Error:
+            checks[alias] = 'unavailable'
+            continue
+        checks[alias] = 'ok'
+        if config['CHECK_MIGRATIONS']:
+            try:
+                pending = pending_migrations(alias)
+            except Error:
+                checks[f'{alias}:migrations'] = 'unavailable'
+                continue
+            checks[f'{alias}:migrations'] = 'pending' if pending else 'ok'
+    ready = all(status == 'ok' for status in checks.values())
+    return ready, checks
@@ -0,0 +1,89 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from django.db.backends.signals import connection_created
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core import benchmarking
+
+MODES = (
+    ('fresh', 0, False),
+    ('persistent', 600, False),
+    ('checked', 600, True),
+)
+
+
+class Command(BaseCommand):
+    """
+        django command timing a cheap endpoint with a new connection per
+        request against persistent connections, with and without the
+        health check before reuse. run it against Postgres, ideally over
+        TLS, connection setup is nearly free on sqlite
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+
+    def handle(self, *args, **options):
+        with override_settings(RECIPE_RESPONSE_CACHE={'ENABLED': False}), \
+                benchmarking.isolated_database():
+            self._run(options['requests'])
+
+    def _run(self, requests):
+        url = reverse('recipe:tag-list')
+        user = benchmarking.create_users(1, prefix='bench-conn')[0]
+        benchmarking.seed_user(user, tags=5)
+        client = APIClient()
+        client.force_authenticate(user)
+
+        connects = []
+
+        def on_connect(sender, connection, **kwargs):
+            connects.append(connection.alias)
+
+        def request():
+            # the test client skips the handler's close_old_connections
+            close_old_connections()
+            client.get(url)
+            close_old_connections()
+
+        self.stdout.write(
+            f'{"mode":>10} {"connects":>9} {"p50 ms":>8} {"p95 ms":>8} '
+            f'{"mean ms":>8}'
+        )
+        settings_dict = connection.settings_dict
+        saved = (
+            settings_dict['CONN_MAX_AGE'],
+            settings_dict.get('CONN_HEALTH_CHECKS', False),
+        )
+        connection_created.connect(on_connect)
+        try:
+            for label, max_age, checks in MODES:
+                connection.close()
+                settings_dict['CONN_MAX_AGE'] = max_age
+                settings_dict['CONN_HEALTH_CHECKS'] = checks
+                request()
+                connects.clear()
+                summary = benchmarking.summarize(
+                    benchmarking.timed(request, requests)
+                )
+                self.stdout.write(
+                    f'{label:>10} {len(connects):>9} '
+                    f'{summary["p50"]:>8.2f} {summary["p95"]:>8.2f} '
+                    f'{summary["mean"]:>8.2f}'
+                )
+        finally:
+            connection_created.disconnect(on_connect)
+            connection.close()
+            (settings_dict['CONN_MAX_AGE'],
+             settings_dict['CONN_HEALTH_CHECKS']) = saved
+
+        start = time.perf_counter()
+        connection.ensure_connection()
+        self.stdout.write(
+            f'one connection setup: '
+            f'{(time.perf_counter() - start) * 1000:.2f} ms'
+        )
@@ -0,0 +1,331 @@
+import asyncio
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework.authtoken.models import Token
+
+from core import benchmarking
+
+CONFIGS = {
+    'sync': {'SERVER_MODE': 'wsgi', 'WORKER_THREADS': '1'},
+    'gthread': {'SERVER_MODE': 'wsgi', 'WORKER_THREADS': '4'},
+    'asgi': {'SERVER_MODE': 'asgi', 'ASYNC_READ_VIEWS': '0'},
+    'asgi-async': {'SERVER_MODE': 'asgi', 'ASYNC_READ_VIEWS': '1'},
+}
+PREFIX = 'bench-serving'
+DRAIN_SECONDS = 10
+# gunicorn.conf.py plus a wait before every query, stands in for the
+# network round trips to Postgres that sqlite does not have
+LATENCY_CONFIG = '''
+exec(open({config!r}).read())
+
+
+def post_fork(server, worker):
+    import time
+    from django.db.backends.signals import connection_created
+
+    def delay(execute, sql, params, many, context):
+        time.sleep({latency!r})
+        return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        if delay not in connection.execute_wrappers:
+            connection.execute_wrappers.append(delay)
+
+    connection_created.connect(install, weak=False)
+'''
+
+
+class Command(BaseCommand):
+    """
+        django command starting gunicorn with each serving configuration
+        and loading the recipe endpoints with an asyncio HTTP client,
+        reporting throughput, latency percentiles and worker memory
+
+        rows are seeded into a throwaway test database, its name reaches
+        the gunicorn processes as DB_NAME, so the configured database is
+        never written. the async read view figures come from
+
+            bench_serving --workers 1 --concurrency 1000 --db-latency 5
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--configs', nargs='+', choices=CONFIGS, default=list(CONFIGS)
+        )
+        parser.add_argument(
+            '--workers', type=int,
+            help='pin WEB_CONCURRENCY instead of autotuning'
+        )
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--duration', type=float, default=10)
+        parser.add_argument('--warmup', type=float, default=2)
+        parser.add_argument('--recipes', type=int, default=200)
+        parser.add_argument(
+            '--db-latency', type=float, default=0,
+            help='milliseconds added to every query in the workers'
+        )
+        parser.add_argument('--output', help='write JSON results to a file')
+
+    def handle(self, *args, **options):
+        with benchmarking.isolated_database():
+            if (
+                connection.vendor == 'sqlite'
+                and connection.is_in_memory_db()
+            ):
+                raise CommandError(
+                    'the test database is in memory, gunicorn workers '
+                    'cannot reach it, configure a database server or a '
+                    'sqlite TEST NAME on disk'
+                )
+            # settings read DB_NAME, the workers open the test database
+            self.database_env = {'DB_NAME': connection.settings_dict['NAME']}
+            results = self._run(options)
+
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(json.dumps(results, indent=2) + '\n')
+
+    def _run(self, options):
+        user = benchmarking.create_users(1, prefix=PREFIX)[0]
+        token = Token.objects.create(user=user).key
+        recipe_ids = benchmarking.seed_user(
+            user, recipes=options['recipes'], tags=20, ingredients=50
+        )
+        paths = ['/api/recipe/tags/', '/api/recipe/recipes/'] + [
+            f'/api/recipe/recipes/{recipe_id}/'
+            for recipe_id in random.Random(0).sample(
+                recipe_ids, min(20, len(recipe_ids))
+            )
+        ]
+        results = {
+            'environment': benchmarking.environment(),
+            'concurrency': options['concurrency'],
+            'db_latency_ms': options['db_latency'],
+            'configs': {},
+        }
+        for name in options['configs']:
+            results['configs'][name] = self._run_config(
+                name, paths, token, options
+            )
+            self._print(name, results['configs'][name])
+        return results
+
+    def _run_config(self, name, paths, token, options):
+        port = _free_port()
+        env = {
+            **os.environ,
+            **CONFIGS[name],
+            **self.database_env,
+            'BIND': f'127.0.0.1:{port}',
+            # recycling mid run would time worker boots
+            'MAX_REQUESTS': '0',
+        }
+        if options['workers']:
+            env['WEB_CONCURRENCY'] = str(options['workers'])
+
+        config = os.path.join(settings.BASE_DIR, 'gunicorn.conf.py')
+        with tempfile.TemporaryFile() as log, \
+                tempfile.NamedTemporaryFile('w', suffix='.py') as latency:
+            if options['db_latency']:
+                latency.write(LATENCY_CONFIG.format(
+                    config=config, latency=options['db_latency'] / 1000
+                ))
+                latency.flush()
+                config = latency.name
+            server = subprocess.Popen(
+                [
+                    sys.executable, '-m', 'gunicorn',
+                    '-c', config, '--access-logfile', '/dev/null',
+                ],
+                cwd=settings.BASE_DIR, env=env,
+                stdout=log, stderr=subprocess.STDOUT,
+            )
+            try:
+                if not _wait_ready(port, server):
+                    log.seek(0)
+                    raise CommandError(
+                        f'gunicorn ({name}) did not start:\n'
+                        + log.read().decode(errors='replace')[-2000:]
+                    )
+                # few connections, a flood would still queue when timing
+                asyncio.run(_load(
+                    port, paths, token, min(options['concurrency'], 16),
+                    options['warmup']
+                ))
+                durations, errors, completed = asyncio.run(_load(
+                    port, paths, token, options['concurrency'],
+                    options['duration']
+                ))
+                memory = _worker_memory(server.pid)
+            finally:
+                server.send_signal(signal.SIGTERM)
+                try:
+                    server.wait(timeout=30)
+                except subprocess.TimeoutExpired:
+                    server.kill()
+                    server.wait()
+
+        return {
+            'workers': len(memory),
+            'requests': len(durations),
+            'errors': errors,
+            **benchmarking.summarize(durations),
+            'throughput_rps': round(completed / options['duration'], 1),
+            'throughput_rps_per_worker': round(
+                completed / options['duration'] / max(1, len(memory)), 1
+            ),
+            'worker_pss_mb': round(sum(memory) / 1024, 1) if memory else None,
+        }
+
+    def _print(self, name, result):
+        self.stdout.write(
+            f'{name:>10}: {result["workers"]} workers, '
+            f'{result["throughput_rps"]} req/s '
+            f'({result["throughput_rps_per_worker"]} per worker), '
+            f'p50 {result["p50"]:.1f} ms, p95 {result["p95"]:.1f} ms, '
+            f'p99 {result["p99"]:.1f} ms, {result["errors"]} errors, '
+            f'workers PSS {result["worker_pss_mb"]} MB'
+        )
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_ready(port, server, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            return False
+        try:
+            with urllib.request.urlopen(
+                f'http://127.0.0.1:{port}/healthz/', timeout=1
+            ):
+                return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+
+def _worker_memory(master_pid):
+    """
+        proportional set size in kB of every worker of `master_pid`,
+        shared pages count once across workers
+    """
+    memory = []
+    for pid in os.listdir('/proc') if os.path.isdir('/proc') else ():
+        if not pid.isdigit():
+            continue
+        try:
+            with open(f'/proc/{pid}/stat') as handle:
+                ppid = int(handle.read().rsplit(')', 1)[1].split()[1])
+            if ppid != master_pid:
+                continue
+            with open(f'/proc/{pid}/smaps_rollup') as handle:
+                for line in handle:
+                    if line.startswith('Pss:'):
+                        memory.append(int(line.split()[1]))
+        except (OSError, IndexError, ValueError):
+            continue
+    return memory
+
+
+async def _load(port, paths, token, concurrency, duration):
+    """
+        `concurrency` keep-alive connections requesting `paths` in turn
+        for `duration` seconds, returns (durations ms, errors, requests
+        completed within `duration`)
+
+        requests still waiting DRAIN_SECONDS after the end, like connects
+        stuck in SYN retries on a full backlog, count as errors
+    """
+    durations, errors, completed = [], [0], [0]
+    deadline = time.perf_counter() + duration
+
+    async def client(offset):
+        reader = writer = None
+        index = offset
+        while time.perf_counter() < deadline:
+            if writer is None:
+                try:
+                    reader, writer = await asyncio.open_connection(
+                        '127.0.0.1', port
+                    )
+                except OSError:
+                    errors[0] += 1
+                    await asyncio.sleep(0.01)
+                    continue
+            path = paths[index % len(paths)]
+            index += 1
+            start = time.perf_counter()
+            try:
+                writer.write((
+                    f'GET {path} HTTP/1.1\r\nHost: localhost\r\n'
+                    f'Authorization: Token {token}\r\n\r\n'
+                ).encode())
+                status, keep_alive = await _read_response(reader)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                errors[0] += 1
+                writer.close()
+                writer = None
+                continue
+            finished = time.perf_counter()
+            durations.append((finished - start) * 1000)
+            if finished <= deadline:
+                completed[0] += 1
+            if status >= 400:
+                errors[0] += 1
+            if not keep_alive:
+                writer.close()
+                writer = None
+        if writer is not None:
+            writer.close()
+
+    tasks = [
+        asyncio.ensure_future(client(offset)) for offset in range(concurrency)
+    ]
+    _, pending = await asyncio.wait(tasks, timeout=duration + DRAIN_SECONDS)
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+    return durations, errors[0] + len(pending), completed[0]
+
+
+async def _read_response(reader):
+    """
+        read one response, return (status, keep alive)
+    """
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split()[1])
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip().lower()
+
+    if headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if not size:
+                break
+    elif 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    else:
+        await reader.read()
+        return status, False
+    return status, headers.get('connection') != 'close'
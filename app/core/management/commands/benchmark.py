@@ -0,0 +1,383 @@
+import http.client
+import io
+import json
+import random
+import shutil
+import tempfile
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.client import MULTIPART_CONTENT, encode_multipart
+from django.test.testcases import LiveServerThread, _StaticFilesHandler
+from django.urls import reverse
+from PIL import Image
+from rest_framework.authtoken.models import Token
+
+from core import benchmarking
+from core.models import Recipe, Tag
+
+SCENARIOS = (
+    'user_create', 'token', 'me', 'recipe_list', 'recipe_filter',
+    'recipe_detail', 'recipe_create', 'recipe_upload',
+)
+PASSWORD = 'password'
+
+
+class ClientTransport:
+    """requests through the Django test client, in process"""
+    counts_queries = True
+
+    def __init__(self):
+        self.client = Client()
+
+    def request(self, method, path, data=None, token=None, multipart=False):
+        extra = {}
+        if token is not None:
+            extra['HTTP_AUTHORIZATION'] = f'Token {token}'
+        if method == 'GET':
+            return self.client.get(path, data, **extra).status_code
+        if multipart:
+            return self.client.post(path, data, **extra).status_code
+        return self.client.generic(
+            method, path, json.dumps(data), 'application/json', **extra
+        ).status_code
+
+    def close(self):
+        pass
+
+
+class HttpTransport:
+    """
+        requests over HTTP, one connection each: the development server
+        splits responses into small writes that stall on delayed ACKs
+        when a connection is kept alive
+    """
+    counts_queries = False
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.prefix = parts.path.rstrip('/')
+        self.host = parts.hostname
+        self.port = parts.port or 80
+
+    def request(self, method, path, data=None, token=None, multipart=False):
+        headers = {'Connection': 'close'}
+        if token is not None:
+            headers['Authorization'] = f'Token {token}'
+        body = None
+        if method == 'GET':
+            if data:
+                path += '?' + urlencode(data)
+        elif multipart:
+            boundary = 'BenchmarkBoundary'
+            body = encode_multipart(boundary, data)
+            headers['Content-Type'] = MULTIPART_CONTENT.replace(
+                'BoUnDaRyStRiNg', boundary
+            )
+        else:
+            body = json.dumps(data).encode()
+            headers['Content-Type'] = 'application/json'
+
+        connection = http.client.HTTPConnection(self.host, self.port)
+        try:
+            connection.request(
+                method, self.prefix + path, body=body, headers=headers
+            )
+            response = connection.getresponse()
+            response.read()
+            return response.status
+        finally:
+            connection.close()
+
+    def close(self):
+        pass
+
+
+class Command(BaseCommand):
+    """
+        django command running API scenarios on seeded data and reporting
+        latency percentiles, queries per request and throughput as JSON
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--recipes', type=int, default=200)
+        parser.add_argument('--tags', type=int, default=20)
+        parser.add_argument('--ingredients', type=int, default=50)
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument(
+            '--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS
+        )
+        parser.add_argument(
+            '--live-server',
+            action='store_true',
+            help='serve the API on a local port and go through HTTP'
+        )
+        parser.add_argument(
+            '--response-cache',
+            action='store_true',
+            help='enable the per user response cache, read scenarios then '
+                 'mostly measure cache hits'
+        )
+        parser.add_argument('--output', help='write JSON results to a file')
+        parser.add_argument(
+            '--compare',
+            help='JSON results of an earlier run to compare against'
+        )
+        parser.add_argument(
+            '--max-regression',
+            type=float,
+            help='fail when a p95 grows by more than this many percent'
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as file:
+                baseline = json.load(file)
+
+        overrides = {
+            'MEDIA_ROOT': tempfile.mkdtemp(prefix='benchmark-'),
+            # every scenario logs in and signs up from one address
+            'REST_FRAMEWORK': {
+                **getattr(settings, 'REST_FRAMEWORK', {}),
+                'DEFAULT_THROTTLE_RATES': {
+                    'login_ip': None, 'login_email': None,
+                },
+            },
+        }
+        if options['live_server']:
+            overrides['ALLOWED_HOSTS'] = ['localhost']
+        # off unless asked for, the read scenarios repeat the same few
+        # requests and would time cache hits. one process, so a private
+        # cache is consistent when it is on
+        overrides['RECIPE_RESPONSE_CACHE'] = {
+            **getattr(settings, 'RECIPE_RESPONSE_CACHE', {}),
+            'ENABLED': options['response_cache'],
+        }
+        try:
+            with override_settings(**overrides), \
+                    benchmarking.isolated_database():
+                results = self._run(options)
+        finally:
+            shutil.rmtree(overrides['MEDIA_ROOT'], ignore_errors=True)
+
+        output = json.dumps(results, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+        if baseline is not None:
+            self._compare(baseline, results, options['max_regression'])
+
+    def _run(self, options):
+        users = benchmarking.create_users(options['users'], prefix='bench')
+        Token.objects.bulk_create([
+            Token(user=user, key=Token.generate_key()) for user in users
+        ])
+        tokens = dict(
+            Token.objects.filter(user__in=users).values_list('user_id', 'key')
+        )
+        for index, user in enumerate(users):
+            benchmarking.seed_user(
+                user,
+                recipes=options['recipes'],
+                tags=options['tags'],
+                ingredients=options['ingredients'],
+                seed=index,
+            )
+        self.context = {
+            'users': users,
+            'tokens': [tokens[user.pk] for user in users],
+            'recipes': [
+                list(Recipe.objects.filter(user=user).values_list(
+                    'id', flat=True
+                ))
+                for user in users
+            ],
+            'tags': [
+                list(Tag.objects.filter(user=user).values_list(
+                    'id', flat=True
+                ))
+                for user in users
+            ],
+            'image': _sample_image(),
+            'rng': random.Random(0),
+        }
+
+        server = None
+        if options['live_server']:
+            server = _start_live_server()
+            transport = HttpTransport(f'http://localhost:{server.port}')
+        else:
+            transport = ClientTransport()
+
+        try:
+            scenarios = {}
+            for name in options['scenarios']:
+                func = getattr(self, f'scenario_{name}')
+                func(transport, -1)
+                scenarios[name] = benchmarking.run_scenario(
+                    lambda index: func(transport, index),
+                    options['requests'],
+                    count_queries=transport.counts_queries,
+                )
+                self.stderr.write(
+                    f'{name}: p50 {scenarios[name]["p50"]} ms, '
+                    f'p95 {scenarios[name]["p95"]} ms'
+                )
+        finally:
+            transport.close()
+            if server is not None:
+                server.terminate()
+
+        return {
+            'environment': {
+                **benchmarking.environment(),
+                'transport': 'http' if server is not None else 'client',
+            },
+            'parameters': {
+                name: options[name] for name in (
+                    'users', 'recipes', 'tags', 'ingredients', 'requests',
+                    'response_cache',
+                )
+            },
+            'scenarios': scenarios,
+        }
+
+    def _user(self, index):
+        position = index % len(self.context['users'])
+        return position, self.context['tokens'][position]
+
+    def scenario_user_create(self, transport, index):
+        return transport.request('POST', reverse('user:create'), {
+            'email': f'new-{index + 1}-{id(self)}@example.com',
+            'password': PASSWORD,
+            'name': 'benchmark',
+        })
+
+    def scenario_token(self, transport, index):
+        position, _ = self._user(index)
+        return transport.request('POST', reverse('user:token'), {
+            'email': self.context['users'][position].email,
+            'password': PASSWORD,
+        })
+
+    def scenario_me(self, transport, index):
+        _, token = self._user(index)
+        return transport.request('GET', reverse('user:me'), token=token)
+
+    def scenario_recipe_list(self, transport, index):
+        _, token = self._user(index)
+        return transport.request(
+            'GET', reverse('recipe:recipe-list'), token=token
+        )
+
+    def scenario_recipe_filter(self, transport, index):
+        position, token = self._user(index)
+        tags = self.context['rng'].sample(
+            self.context['tags'][position],
+            min(2, len(self.context['tags'][position]))
+        )
+        return transport.request(
+            'GET',
+            reverse('recipe:recipe-list'),
+            {'tags': ','.join(map(str, tags)), 'page_size': 50},
+            token=token
+        )
+
+    def scenario_recipe_detail(self, transport, index):
+        position, token = self._user(index)
+        recipe_id = self.context['rng'].choice(
+            self.context['recipes'][position]
+        )
+        return transport.request(
+            'GET', reverse('recipe:recipe-detail', args=[recipe_id]),
+            token=token
+        )
+
+    def scenario_recipe_create(self, transport, index):
+        position, token = self._user(index)
+        return transport.request('POST', reverse('recipe:recipe-list'), {
+            'title': f'benchmark {index}',
+            'time_minutes': 10,
+            'price': '5.00',
+            'tags': self.context['tags'][position][:2],
+            'ingredients': [],
+        }, token=token)
+
+    def scenario_recipe_upload(self, transport, index):
+        position, token = self._user(index)
+        recipe_id = self.context['recipes'][position][0]
+        image = io.BytesIO(self.context['image'])
+        image.name = 'image.jpg'
+        return transport.request(
+            'POST',
+            reverse('recipe:recipe-upload-image', args=[recipe_id]),
+            {'image': image},
+            token=token,
+            multipart=True
+        )
+
+    def _compare(self, baseline, results, max_regression):
+        """
+            print p50/p95 changes against `baseline` and fail on a p95
+            regression above `max_regression` percent
+        """
+        regressions = []
+        self.stdout.write(
+            f'{"scenario":>15} {"p50 before":>11} {"p50 now":>9} '
+            f'{"p95 before":>11} {"p95 now":>9} {"change":>8}'
+        )
+        for name, now in results['scenarios'].items():
+            before = baseline.get('scenarios', {}).get(name)
+            if not before:
+                continue
+            change = (
+                (now['p95'] - before['p95']) / before['p95'] * 100
+                if before['p95'] else 0.0
+            )
+            self.stdout.write(
+                f'{name:>15} {before["p50"]:>11.2f} {now["p50"]:>9.2f} '
+                f'{before["p95"]:>11.2f} {now["p95"]:>9.2f} {change:>+7.1f}%'
+            )
+            if max_regression is not None and change > max_regression:
+                regressions.append(name)
+        if regressions:
+            raise CommandError(
+                f'p95 regressed over {max_regression}%: '
+                + ', '.join(regressions)
+            )
+
+
+def _sample_image():
+    """
+        return the bytes of a small JPEG used by the upload scenario
+    """
+    buffer = io.BytesIO()
+    Image.new('RGB', (640, 480), (200, 120, 40)).save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+def _start_live_server():
+    """
+        serve the API from a thread on a free local port
+    """
+    connections_override = None
+    if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+        connection.inc_thread_sharing()
+        connections_override = {connection.alias: connection}
+    server = LiveServerThread(
+        'localhost', _StaticFilesHandler, connections_override, port=0
+    )
+    server.daemon = True
+    server.start()
+    server.is_ready.wait()
+    if server.error:
+        raise server.error
+    return server
@@ -0,0 +1,62 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.models import Recipe
+from recipe import images
+
+
+class Command(BaseCommand):
+    """django command deleting recipe image files no recipe references"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace',
+            type=int,
+            default=60,
+            help='only delete files older than this many minutes'
+        )
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        storage = Recipe._meta.get_field('image').storage
+        root = storage.path('uploads/recipe')
+        derivatives_root = storage.path(images.get_config()['DIRECTORY'])
+        cutoff = time.time() - options['grace'] * 60
+
+        referenced = set(
+            Recipe.objects.exclude(image__isnull=True).exclude(image='')
+            .order_by().values_list('image', flat=True).distinct()
+        )
+        stems = {
+            os.path.splitext(os.path.basename(name))[0] for name in referenced
+        }
+
+        removed = kept = 0
+        for directory, _, files in os.walk(root):
+            in_derivatives = os.path.commonpath(
+                (directory, derivatives_root)
+            ) == derivatives_root
+            for file_name in files:
+                path = os.path.join(directory, file_name)
+                name = os.path.relpath(path, storage.location).replace(
+                    os.sep, '/'
+                )
+                if in_derivatives:
+                    stem = os.path.splitext(file_name)[0].rsplit('-', 1)[0]
+                    orphan = stem not in stems
+                else:
+                    orphan = name not in referenced
+                if not orphan or os.path.getmtime(path) > cutoff:
+                    kept += 1
+                    continue
+
+                removed += 1
+                self.stdout.write(f'removing {name}')
+                if not options['dry_run']:
+                    os.remove(path)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{removed} orphaned files removed, {kept} kept'
+        ))
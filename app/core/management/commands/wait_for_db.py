@@ -1,22 +1,87 @@
+import random
 import time
 
-from django.db import connections
-from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+from django.db.utils import Error
+from django.core.management.base import BaseCommand, CommandError
+
+from core import health
 
 
 class Command(BaseCommand):
-    """django command to pause execution till database available"""
+    """
+        django command to pause execution till database available
+
+        every attempt opens a real connection and runs `SELECT 1`, failed
+        attempts back off exponentially with full jitter, so a fleet of
+        containers does not hammer a database that is still starting
+    """
+    help = 'Wait until the database accepts queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='Database alias to probe.'
+        )
+        parser.add_argument(
+            '--timeout', type=float, default=60,
+            help='Give up after this many seconds, 0 waits forever.'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=0.1,
+            help='Delay before the first retry, doubled on every attempt.'
+        )
+        parser.add_argument(
+            '--max-interval', type=float, default=5,
+            help='Upper bound of the delay between attempts.'
+        )
+        parser.add_argument(
+            '--wait-migrations', action='store_true',
+            help='Also wait until every migration is applied.'
+        )
 
     def handle(self, *args, **options):
         self.stdout.write("Waiting for database...")
-        db_conn = None
-        count=1
-        while not db_conn:
-            try:
-                db_conn = connections['default']
-            except OperationalError:
-                self.stdout.write('Waiting {0} seconds...'.format(count))
-                count=count+1
-                time.sleep(1)
-        self.stdout.write(self.style.SUCCESS('Database available'))
\ No newline at end of file
+        alias = options['database']
+        deadline = None
+        if options['timeout'] > 0:
+            deadline = time.monotonic() + options['timeout']
+
+        attempt = 0
+        while True:
+            reason = self.probe(alias, options['wait_migrations'])
+            if reason is None:
+                break
+            delay = random.uniform(0, min(
+                options['max_interval'], options['interval'] * 2 ** attempt
+            ))
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise CommandError(
+                        f'Database not ready after {options["timeout"]:g} '
+                        f'seconds: {reason}'
+                    )
+                delay = min(delay, remaining)
+            attempt += 1
+            self.stdout.write(
+                f'Attempt {attempt}: {reason}, retrying in {delay:.2f}s...'
+            )
+            time.sleep(delay)
+        self.stdout.write(self.style.SUCCESS('Database available'))
+
+    def probe(self, alias, wait_migrations):
+        """
+            return None when ready, else why not
+        """
+        try:
+            health.check_database(alias)
+            if wait_migrations:
+                pending = health.pending_migrations(alias)
+                if pending:
+                    return f'{len(pending)} migrations pending'
+        except Error as error:
+            message = str(error).strip()
+            return message.splitlines()[0] if message \
+                else type(error).__name__
+        return None
@@ -0,0 +1,143 @@
+import bisect
+import threading
+
+from django.conf import settings
+
+DEFAULTS = {
+    'ENABLED': True,
+    'SERVER_TIMING': True,
+    'ALLOWED_NETWORKS': ('127.0.0.1/32', '::1/128'),
+    'DURATION_BUCKETS': (
+        0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+    ),
+    'QUERY_BUCKETS': (0, 1, 2, 3, 5, 10, 20, 50, 100),
+}
+
+
+def get_config():
+    """
+        return request metrics settings merged over the defaults
+    """
+    return {**DEFAULTS, **getattr(settings, 'REQUEST_METRICS', {})}
+
+
+class Histogram:
+    """
+        cumulative histogram per label set, in the Prometheus text format
+
+        observations only take a lock around a few integer updates, the
+        counts are per process
+    """
+
+    def __init__(self, name, documentation, label_names, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [
+                    [0] * (len(self.buckets) + 1), 0.0
+                ]
+            series[0][index] += 1
+            series[1] += value
+
+    def reset(self):
+        with self.lock:
+            self.series = {}
+
+    def render(self):
+        """
+            return the exposition lines of the histogram
+        """
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} histogram',
+        ]
+        with self.lock:
+            series = {
+                labels: (list(counts), total)
+                for labels, (counts, total) in self.series.items()
+            }
+        for labels, (counts, total) in sorted(series.items()):
+            base = ','.join(
+                f'{name}="{_escape(value)}"'
+                for name, value in zip(self.label_names, labels)
+            )
+            cumulative = 0
+            bounds = [_format(bound) for bound in self.buckets] + ['+Inf']
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                bucket = _join(base, f'le="{bound}"')
+                lines.append(f'{self.name}_bucket{{{bucket}}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{base}}} {_format(total)}')
+            lines.append(f'{self.name}_count{{{base}}} {cumulative}')
+        return lines
+
+
+def _join(*parts):
+    return ','.join(part for part in parts if part)
+
+
+def _escape(value):
+    return (
+        str(value).replace('\\', '\\\\').replace('\n', '\\n')
+        .replace('"', '\\"')
+    )
+
+
+def _format(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+_config = get_config()
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds',
+    'Total time spent handling a request.',
+    ('view', 'method', 'status'),
+    _config['DURATION_BUCKETS'],
+)
+DB_DURATION = Histogram(
+    'http_request_db_duration_seconds',
+    'Time spent executing database queries per request.',
+    ('view',),
+    _config['DURATION_BUCKETS'],
+)
+DB_QUERIES = Histogram(
+    'http_request_db_queries',
+    'Database queries executed per request.',
+    ('view',),
+    _config['QUERY_BUCKETS'],
+)
+SERIALIZE_DURATION = Histogram(
+    'http_request_serialize_duration_seconds',
+    'Time spent turning objects into response data, queries excluded.',
+    ('view',),
+    _config['DURATION_BUCKETS'],
+)
+RENDER_DURATION = Histogram(
+    'http_request_render_duration_seconds',
+    'Time spent rendering the response body.',
+    ('view',),
+    _config['DURATION_BUCKETS'],
+)
+HISTOGRAMS = (
+    REQUEST_DURATION, DB_DURATION, DB_QUERIES, SERIALIZE_DURATION,
+    RENDER_DURATION,
+)
+
+
+def render():
+    """
+        return all metrics in the Prometheus text exposition format
+    """
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    return '\n'.join(lines) + '\n'
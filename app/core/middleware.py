@@ -0,0 +1,170 @@
+import asyncio
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import markcoroutinefunction
+from django.core.exceptions import MiddlewareNotUsed
+
+from core import db, metrics
+
+
+class _RequestStats:
+    """database, serialization and rendering time of one request"""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializing = False
+        self.serialize_time = 0.0
+        self.render_started = None
+        self.render_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        # execute wrapper, runs around every query of the request
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+
+class RequestMetricsMiddleware:
+    """
+        record query count, query time, serialization time, render time
+        and total time of every request, labelled with the resolved view
+        (`recipe-list`), as `Server-Timing` headers and histograms in
+        core.metrics
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        config = metrics.get_config()
+        if not config['ENABLED']:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.server_timing = config['SERVER_TIMING']
+        if asyncio.iscoroutinefunction(get_response):
+            # the handler awaits instances marked as coroutine functions
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        stats = request._metrics = _RequestStats()
+        start = time.perf_counter()
+        with db.wrapping_queries(stats):
+            response = self.get_response(request)
+        return self.finish(request, response, stats, start)
+
+    async def __acall__(self, request):
+        stats = request._metrics = _RequestStats()
+        start = time.perf_counter()
+        with db.wrapping_queries(stats):
+            response = await self.get_response(request)
+        return self.finish(request, response, stats, start)
+
+    def finish(self, request, response, stats, start):
+        total = time.perf_counter() - start
+
+        view = getattr(request, '_metrics_view', None) or 'unresolved'
+        metrics.REQUEST_DURATION.observe(
+            total, view, request.method, str(response.status_code)
+        )
+        metrics.DB_DURATION.observe(stats.db_time, view)
+        metrics.DB_QUERIES.observe(stats.queries, view)
+        metrics.SERIALIZE_DURATION.observe(stats.serialize_time, view)
+        metrics.RENDER_DURATION.observe(stats.render_time, view)
+
+        if self.server_timing:
+            response['Server-Timing'] = ', '.join((
+                f'db;dur={stats.db_time * 1000:.2f};'
+                f'desc="{stats.queries} queries"',
+                f'serialize;dur={stats.serialize_time * 1000:.2f}',
+                f'render;dur={stats.render_time * 1000:.2f}',
+                f'total;dur={total * 1000:.2f}',
+            ))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._metrics_view = view_label(request, view_func)
+
+    def process_template_response(self, request, response):
+        # DRF responses render after this hook, the callback ends the span,
+        # core.async_views renders in its pool and times it there
+        stats = getattr(request, '_metrics', None)
+        if stats is not None and not response.is_rendered:
+            stats.render_started = time.perf_counter()
+            response.add_post_render_callback(
+                lambda rendered: _render_finished(stats)
+            )
+        return response
+
+
+def _render_finished(stats):
+    stats.render_time += time.perf_counter() - stats.render_started
+
+
+def render(request, response):
+    """
+        render a template response now, timed as rendering
+    """
+    stats = getattr(request, '_metrics', None)
+    if stats is not None:
+        stats.render_started = time.perf_counter()
+    response.render()
+    if stats is not None:
+        _render_finished(stats)
+    return response
+
+
+@contextmanager
+def serializing(request):
+    """
+        time the block as serialization of `request`, queries it runs
+        (lazy relations, prefetches) stay db time only. nested blocks are
+        timed by the outermost one
+    """
+    stats = getattr(request, '_metrics', None)
+    if stats is None or stats.serializing:
+        yield
+        return
+    stats.serializing = True
+    db_time = stats.db_time
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        stats.serialize_time += elapsed - (stats.db_time - db_time)
+        stats.serializing = False
+
+
+class TimedSerializerMixin:
+    """
+        serializer mixin timing `to_representation` as serialization of
+        the request in the serializer context
+    """
+
+    def to_representation(self, instance):
+        with serializing(self.context.get('request')):
+            return super().to_representation(instance)
+
+
+def view_label(request, view_func):
+    """
+        name a request by its DRF viewset action (`recipe-list`,
+        `recipe-create`) or else its URL name (`user:me`)
+    """
+    actions = getattr(view_func, 'actions', None)
+    initkwargs = getattr(view_func, 'initkwargs', None) or {}
+    if actions and initkwargs.get('basename'):
+        action = actions.get(request.method.lower())
+        if action:
+            return f'{initkwargs["basename"]}-{action}'
+    match = request.resolver_match
+    if match is not None and match.view_name:
+        return match.view_name
+    return getattr(view_func, '__name__', 'unknown')
@@ -0,0 +1,71 @@
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    """
+        GIN indexes only exist on postgres, other backends skip the index
+        and search with the LIKE fallback
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX core_recipe_search_idx ON core_recipe '
+        'USING gin (search_vector)'
+    )
+    # frozen copy of recipe.search.REFRESH_SQL as of this migration
+    schema_editor.execute(
+        """
+        UPDATE core_recipe SET search_vector =
+            setweight(to_tsvector(%(config)s::regconfig,
+                coalesce(core_recipe.title, '')), 'A') ||
+            setweight(to_tsvector(%(config)s::regconfig, coalesce((
+                SELECT string_agg(core_tag.name, ' ')
+                FROM core_recipe_tags
+                JOIN core_tag ON core_tag.id = core_recipe_tags.tag_id
+                WHERE core_recipe_tags.recipe_id = core_recipe.id
+            ), '')), 'B') ||
+            setweight(to_tsvector(%(config)s::regconfig, coalesce((
+                SELECT string_agg(core_ingredient.name, ' ')
+                FROM core_recipe_ingredients
+                JOIN core_ingredient ON
+                    core_ingredient.id = core_recipe_ingredients.ingredient_id
+                WHERE core_recipe_ingredients.recipe_id = core_recipe.id
+            ), '')), 'C')
+        """,
+        {'config': getattr(settings, 'RECIPE_SEARCH_CONFIG', 'english')}
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX core_recipe_search_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_recipe_image_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='recipe',
+                    index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='core_recipe_search_idx'),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(create_search_index, drop_search_index),
+            ],
+        ),
+    ]
@@ -1,8 +1,13 @@
 import uuid, os
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser,BaseUserManager,PermissionsMixin
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.conf import settings
 from django.db.models.deletion import CASCADE
+from django.utils import timezone
+
+from core.storage import recipe_image_storage
 
 def recipe_image_file_path(instance, file_name):
     """
@@ -59,7 +64,18 @@ class Tag(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
-
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'name'], name='core_tag_user_name_idx'
+            ),
+            models.Index(
+                fields=['user', 'updated_at', 'id'],
+                name='core_tag_user_updated_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -73,6 +89,19 @@ class Ingredient(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete= models.CASCADE,
     )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'name'],
+                name='core_ingredient_user_name_idx'
+            ),
+            models.Index(
+                fields=['user', 'updated_at', 'id'],
+                name='core_ingr_user_updated_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -89,10 +118,113 @@ class Recipe(models.Model):
     time_minutes = models.IntegerField()
     price = models.DecimalField(max_digits=5, decimal_places=2)
     link = models.CharField(max_length=600, blank=True)
-    ingredients = models.ManyToManyField('Ingredient')
-    tags = models.ManyToManyField('Tag')
-    image = models.ImageField(null = True, upload_to = recipe_image_file_path)
+    ingredients = models.ManyToManyField(
+        'Ingredient', through='RecipeIngredient'
+    )
+    tags = models.ManyToManyField('Tag', through='RecipeTag')
+    image = models.ImageField(
+        null = True,
+        upload_to = recipe_image_file_path,
+        storage = recipe_image_storage,
+    )
+    # title, tag and ingredient names, maintained by recipe.search
+    search_vector = SearchVectorField(null = True, editable = False)
+    # also touched when tags or ingredients are linked, see recipe.sync
+    updated_at = models.DateTimeField(auto_now = True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'id'], name='core_recipe_user_id_idx'
+            ),
+            GinIndex(fields=['search_vector'], name='core_recipe_search_idx'),
+            models.Index(
+                fields=['user', 'updated_at', 'id'],
+                name='core_recipe_user_updated_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
+
+class RecipeTag(models.Model):
+    """
+        through table of Recipe.tags, declared to index it by tag first
+        so tag filters resolve as index only semi-joins
+    """
+    id = models.AutoField(primary_key=True)
+    recipe = models.ForeignKey(
+        'Recipe', on_delete=models.CASCADE, related_name='+'
+    )
+    tag = models.ForeignKey('Tag', on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        db_table = 'core_recipe_tags'
+        unique_together = (('recipe', 'tag'),)
+        indexes = [
+            models.Index(
+                fields=['tag', 'recipe'], name='core_recipe_tags_rev_idx'
+            ),
+        ]
+
+
+class RecipeIngredient(models.Model):
+    """
+        through table of Recipe.ingredients, indexed by ingredient first
+        for the same reason as RecipeTag
+    """
+    id = models.AutoField(primary_key=True)
+    recipe = models.ForeignKey(
+        'Recipe', on_delete=models.CASCADE, related_name='+'
+    )
+    ingredient = models.ForeignKey(
+        'Ingredient', on_delete=models.CASCADE, related_name='+'
+    )
+
+    class Meta:
+        db_table = 'core_recipe_ingredients'
+        unique_together = (('recipe', 'ingredient'),)
+        indexes = [
+            models.Index(
+                fields=['ingredient', 'recipe'],
+                name='core_recipe_ingr_rev_idx'
+            ),
+        ]
+
+
+class Tombstone(models.Model):
+    """Marker of a deleted tag, ingredient or recipe for delta sync"""
+    TAG = 'tag'
+    INGREDIENT = 'ingredient'
+    RECIPE = 'recipe'
+    MODEL_CHOICES = (
+        (TAG, 'Tag'),
+        (INGREDIENT, 'Ingredient'),
+        (RECIPE, 'Recipe'),
+    )
+
+    # no database constraint: deleting a user cascades to its recipes,
+    # whose tombstones would otherwise point at the vanished user row
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        db_constraint=False,
+        related_name='+',
+    )
+    model = models.CharField(max_length=20, choices=MODEL_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'deleted_at', 'id'],
+                name='core_tombstone_user_idx'
+            ),
+            models.Index(fields=['deleted_at'], name='core_tombstone_age_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.model} {self.object_id}'
+
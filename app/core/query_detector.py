@@ -0,0 +1,181 @@
+import asyncio
+import logging
+import re
+import time
+import traceback
+from contextlib import contextmanager
+
+from asgiref.sync import markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from core import db
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': False,
+    'ACTION': 'log',
+    'MAX_REPEATS': 5,
+    'SLOW_QUERY_MS': 200,
+    'IGNORE': (r'^(SAVEPOINT|RELEASE SAVEPOINT|ROLLBACK TO SAVEPOINT)\b',),
+}
+ACTIONS = ('log', 'raise')
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_VALUE_LIST = re.compile(r'\(\s*(?:(?:%s|\?)\s*,\s*)*(?:%s|\?)\s*\)')
+_SPACE = re.compile(r'\s+')
+# execute wrappers, never the code that issued a query
+_WRAPPER_FILES = (
+    '/core/query_detector.py', '/core/middleware.py', '/core/db.py',
+)
+
+
+def get_config(**overrides):
+    """
+        return detector settings merged over the defaults
+    """
+    return {
+        **DEFAULTS, **getattr(settings, 'QUERY_DETECTOR', {}), **overrides
+    }
+
+
+def fingerprint(sql):
+    """
+        normalize literals and value lists so queries that differ only in
+        their parameters compare equal
+    """
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _VALUE_LIST.sub('(...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+class QueryProblem(AssertionError):
+    """raised in `raise` mode, fails the test running the request"""
+
+
+class QueryDetector:
+    """
+        execute wrapper counting queries by fingerprint
+
+        a fingerprint repeated more than MAX_REPEATS times within one
+        unit of work (usually a request) is reported as an N+1, any query
+        slower than SLOW_QUERY_MS as slow. the stack of the offending call
+        is kept, trimmed to project code, so it points at the serializer
+        or view that issued the query.
+    """
+
+    def __init__(self, **overrides):
+        config = get_config(**overrides)
+        if config['ACTION'] not in ACTIONS:
+            raise ValueError(f'ACTION must be one of {", ".join(ACTIONS)}')
+        self.action = config['ACTION']
+        self.max_repeats = config['MAX_REPEATS']
+        self.slow_query = config['SLOW_QUERY_MS'] / 1000
+        self.ignore = [re.compile(pattern) for pattern in config['IGNORE']]
+        self.counts = {}
+        self.problems = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.record(sql, time.perf_counter() - start)
+
+    def record(self, sql, duration):
+        if any(pattern.search(sql) for pattern in self.ignore):
+            return
+        key = fingerprint(sql)
+        count = self.counts[key] = self.counts.get(key, 0) + 1
+        if count == self.max_repeats + 1:
+            self.problems.append(
+                ('repeated', key, _project_stack())
+            )
+        if duration > self.slow_query:
+            self.problems.append((
+                f'slow ({duration * 1000:.0f} ms)', key, _project_stack()
+            ))
+
+    def report(self, label):
+        """
+            log or raise the problems found while handling `label`
+        """
+        if not self.problems:
+            return
+        lines = []
+        for kind, key, stack in self.problems:
+            if kind == 'repeated':
+                kind = f'repeated {self.counts[key]} times'
+            lines.append(f'{kind}: {key}\n{stack}')
+        message = f'query problems in {label}:\n' + '\n'.join(lines)
+        if self.action == 'raise':
+            raise QueryProblem(message)
+        logger.warning(message)
+
+    def installed(self):
+        """
+            wrap every query of the current context while the block runs
+        """
+        return db.wrapping_queries(self)
+
+
+@contextmanager
+def detect_queries(label='block', **overrides):
+    """
+        run a block under the detector, raising by default, for tests
+    """
+    overrides.setdefault('ACTION', 'raise')
+    detector = QueryDetector(**overrides)
+    with detector.installed():
+        yield detector
+    detector.report(label)
+
+
+def _project_stack():
+    """
+        return the current stack without framework and detector frames
+    """
+    frames = [
+        frame for frame in traceback.extract_stack()
+        if frame.filename.startswith(str(settings.BASE_DIR))
+        and 'site-packages' not in frame.filename
+        and not frame.filename.endswith(_WRAPPER_FILES)
+    ]
+    return ''.join(traceback.format_list(frames[-8:]))
+
+
+class QueryDetectorMiddleware:
+    """
+        run every request under a QueryDetector, enabled with
+        QUERY_DETECTOR = {'ENABLED': True} in tests and staging
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not get_config()['ENABLED']:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # the handler awaits instances marked as coroutine functions
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        detector = QueryDetector()
+        with detector.installed():
+            response = self.get_response(request)
+        detector.report(f'{request.method} {request.path}')
+        return response
+
+    async def __acall__(self, request):
+        detector = QueryDetector()
+        with detector.installed():
+            response = await self.get_response(request)
+        detector.report(f'{request.method} {request.path}')
+        return response
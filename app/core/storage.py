@@ -0,0 +1,80 @@
+import hashlib
+import os
+import posixpath
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+        file storage keeping one copy of every distinct file
+
+        content is hashed while it streams to a temporary file, which is
+        then moved to `<dir>/<digest[:2]>/<digest><ext>`. uploading the
+        same bytes again returns the existing name.
+
+        `delete()` is intentionally inert: blobs are shared, so instead of
+        reference counting them, orphans are swept by the
+        `gc_recipe_images` command once their grace window has passed,
+        and every reuse of a blob restarts its window.
+    """
+    temp_prefix = '.upload-'
+
+    def get_available_name(self, name, max_length=None):
+        # the digest picks the final name, identical names are the point
+        return name
+
+    def _save(self, name, content):
+        directory = posixpath.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        os.makedirs(self.path(directory), exist_ok=True)
+
+        digest = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(
+            dir=self.path(directory), prefix=self.temp_prefix
+        )
+        try:
+            with os.fdopen(fd, 'wb') as output:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    output.write(chunk)
+
+            hexdigest = digest.hexdigest()
+            final = posixpath.join(
+                directory, hexdigest[:2], hexdigest + extension
+            )
+            full_path = self.path(final)
+            try:
+                # the blob may be an orphan, restart its gc grace period
+                os.utime(full_path)
+            except FileNotFoundError:
+                pass
+            else:
+                os.remove(temp_path)
+                return final
+
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            os.replace(temp_path, full_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        if self.file_permissions_mode is not None:
+            os.chmod(full_path, self.file_permissions_mode)
+        return final
+
+    def delete(self, name):
+        # other recipes may reference the blob, or be about to: an upload
+        # of the same bytes reuses it before its row is saved. blobs no
+        # row references are removed by gc_recipe_images after the grace
+        # period, which every reuse restarts
+        pass
+
+
+recipe_image_storage = ContentAddressedStorage()
@@ -0,0 +1,156 @@
+import asyncio
+import json
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient, TransactionTestCase, override_settings
+from django.urls import include, path, reverse
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core import async_views, metrics
+from core.asgi import ASGIHandler
+from core.models import Recipe, Tag, Ingredient
+from recipe import urls as recipe_urls
+
+urlpatterns = [
+    path('api/recipe/', include((
+        async_views.async_patterns(
+            recipe_urls.router.urls, recipe_urls.ASYNC_READ_VIEWS
+        ),
+        'recipe'
+    ))),
+]
+
+RECIPES_URL = reverse('recipe:recipe-list')
+EXPORT_URL = reverse('recipe:recipe-export')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+@override_settings(ROOT_URLCONF=__name__,
+                   RECIPE_RESPONSE_CACHE={'ENABLED': False})
+class AsyncReadViewTests(TransactionTestCase):
+
+    def setUp(self):
+        for histogram in metrics.HISTOGRAMS:
+            histogram.reset()
+        self.user = get_user_model().objects.create_user(
+            'async@weeb.com',
+            'root45'
+        )
+        token = Token.objects.create(user=self.user)
+        # the async client takes raw header names
+        self.headers = {'AUTHORIZATION': f'Token {token.key}'}
+        self.client = AsyncClient()
+        self.sync_client = APIClient()
+        self.sync_client.force_authenticate(self.user)
+
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5, price=1
+        )
+        self.recipe.tags.add(tag)
+        self.recipe.ingredients.add(ingredient)
+
+    def get(self, url):
+        return async_to_sync(self.client.get)(url, **self.headers)
+
+    def test_views_are_coroutines(self):
+        """
+            Test the read routes resolve to coroutine functions
+        """
+        for pattern in urlpatterns[0].url_patterns:
+            if pattern.name in recipe_urls.ASYNC_READ_VIEWS:
+                self.assertTrue(
+                    asyncio.iscoroutinefunction(pattern.callback)
+                )
+
+    def test_same_responses_as_sync_views(self):
+        """
+            Test async reads answer like the sync views
+        """
+        for url in (RECIPES_URL, TAGS_URL, INGREDIENTS_URL,
+                    detail_url(self.recipe.id)):
+            res = self.get(url)
+
+            self.assertEqual(res.status_code, 200)
+            self.assertEqual(
+                json.loads(res.content),
+                self.sync_client.get(url).json()
+            )
+
+    def test_reads_run_on_pool(self):
+        """
+            Test reads run on the read view pool, with query metrics
+        """
+        res = self.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertRegex(res['Server-Timing'], r'desc="[1-9]\d* queries"')
+
+    def test_writes_stay_sync(self):
+        """
+            Test writes through an async route still work
+        """
+        res = async_to_sync(self.client.post)(
+            TAGS_URL, json.dumps({'name': 'Dinner'}),
+            content_type='application/json', **self.headers
+        )
+
+        self.assertEqual(res.status_code, 201)
+        self.assertTrue(
+            Tag.objects.filter(user=self.user, name='Dinner').exists()
+        )
+
+    def test_requests_overlap(self):
+        """
+            Test concurrent reads are all answered
+        """
+        async def burst():
+            return await asyncio.gather(*(
+                self.client.get(RECIPES_URL, **self.headers)
+                for _ in range(10)
+            ))
+
+        responses = async_to_sync(burst)()
+
+        self.assertEqual([res.status_code for res in responses], [200] * 10)
+
+    def test_export_streams_under_asgi(self):
+        """
+            Test the streamed export, whose generator queries the
+            database, is served through the ASGI handler
+        """
+        token = self.headers['AUTHORIZATION'].encode()
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'},
+            'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+            'path': EXPORT_URL, 'raw_path': EXPORT_URL.encode(),
+            'query_string': b'', 'root_path': '',
+            'headers': [(b'host', b'testserver'), (b'authorization', token)],
+            'client': ('127.0.0.1', 1234), 'server': ('testserver', 80),
+        }
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            messages.append(message)
+
+        async_to_sync(ASGIHandler())(scope, receive, send)
+
+        self.assertEqual(messages[0]['status'], 200)
+        self.assertFalse(messages[-1].get('more_body'))
+        body = b''.join(message.get('body', b'') for message in messages)
+        self.assertEqual(
+            [json.loads(line)['id'] for line in body.splitlines()],
+            [self.recipe.id]
+        )
@@ -1,28 +1,76 @@
+from io import StringIO
 from unittest.mock import patch
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
 from django.test import TestCase
 
+CHECK_DATABASE = 'core.health.check_database'
+
+
 class CommandTests(TestCase):
 
     def test_wait_for_db_ready(self):
         """
             Test wait for db when db is available
         """
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.return_value = True
-            call_command('wait_for_db')
-            self.assertEquals(gi.call_count,1)
-    
+        with patch(CHECK_DATABASE) as cd:
+            cd.return_value = None
+            call_command('wait_for_db', stdout=StringIO())
+            self.assertEquals(cd.call_count, 1)
 
-    @patch('time.sleep',return_value=True)
+    @patch('time.sleep', return_value=True)
     def test_wait_for_db(self, ts):
         """
             Test waiting for db
         """
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.side_effect=[OperationalError]*5 + [True]
-            call_command('wait_for_db')
-            self.assertEquals(gi.call_count, 6)
+        with patch(CHECK_DATABASE) as cd:
+            cd.side_effect = [OperationalError] * 5 + [None]
+            call_command('wait_for_db', stdout=StringIO())
+            self.assertEquals(cd.call_count, 6)
+            self.assertEquals(ts.call_count, 5)
 
-            
\ No newline at end of file
+    def test_wait_for_db_probes_connection(self):
+        """
+            Test the probe really queries the database
+        """
+        call_command('wait_for_db', stdout=StringIO())
+
+    @patch('random.uniform', side_effect=lambda low, high: high)
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_db_backoff(self, ts, ru):
+        """
+            Test delays double up to the maximum interval
+        """
+        with patch(CHECK_DATABASE) as cd:
+            cd.side_effect = [OperationalError] * 6 + [None]
+            call_command(
+                'wait_for_db', interval=0.5, max_interval=4, stdout=StringIO()
+            )
+        delays = [call.args[0] for call in ts.call_args_list]
+        self.assertEqual(delays, [0.5, 1, 2, 4, 4, 4])
+
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_db_timeout(self, ts):
+        """
+            Test giving up once the timeout elapsed
+        """
+        clock = iter(range(0, 1000, 10))
+        with patch(CHECK_DATABASE) as cd, \
+                patch('time.monotonic', side_effect=lambda: next(clock)):
+            cd.side_effect = OperationalError('connection refused')
+            with self.assertRaisesMessage(CommandError, 'connection refused'):
+                call_command('wait_for_db', timeout=30, stdout=StringIO())
+        self.assertEquals(cd.call_count, 3)
+
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_db_migrations(self, ts):
+        """
+            Test waiting until migrations are applied
+        """
+        with patch(CHECK_DATABASE), \
+                patch('core.health.pending_migrations') as pm:
+            pm.side_effect = [['core.0010_sync_tracking'], []]
+            call_command('wait_for_db', wait_migrations=True,
+                         stdout=StringIO())
+            self.assertEquals(pm.call_count, 2)
@@ -0,0 +1,99 @@
+from unittest.mock import Mock, patch
+
+from django.core.signals import request_started
+from django.test import SimpleTestCase
+
+from core import db
+
+
+class FakeConnection:
+    """the parts of a connection wrapper the health check uses"""
+
+    def __init__(self, usable=True, connected=True, atomic=False,
+                 checks=True):
+        self.connection = object() if connected else None
+        self.in_atomic_block = atomic
+        self.settings_dict = {'CONN_HEALTH_CHECKS': checks}
+        self.is_usable = Mock(return_value=usable)
+        self.close = Mock()
+        self._cursor = Mock(return_value='cursor')
+        # used by Django's own request_started receivers
+        self.queries_log = []
+        self.close_if_unusable_or_obsolete = Mock()
+        db.install_health_check(sender=None, connection=self)
+
+
+class ConnectionHealthCheckTests(SimpleTestCase):
+
+    def start_request(self, *connections):
+        with patch.object(db.connections, 'all',
+                          return_value=list(connections)):
+            request_started.send(sender=self.__class__)
+
+    def test_checked_on_first_cursor(self):
+        """
+            Test a reused connection is probed on its first cursor of a
+            request only, not when the request starts
+        """
+        connection = FakeConnection()
+
+        self.start_request(connection)
+        connection.is_usable.assert_not_called()
+
+        self.assertEqual(connection._cursor(), 'cursor')
+        connection._cursor()
+
+        connection.is_usable.assert_called_once_with()
+        connection.close.assert_not_called()
+
+    def test_dead_connection_closed(self):
+        """
+            Test a connection that died while idle is closed before the
+            cursor is created
+        """
+        dead = FakeConnection(usable=False)
+
+        self.start_request(dead)
+        dead._cursor()
+
+        dead.close.assert_called_once_with()
+
+    def test_request_without_queries_not_probed(self):
+        """
+            Test requests that never query cost no round trip
+        """
+        connection = FakeConnection()
+
+        self.start_request(connection)
+        self.start_request(connection)
+
+        connection.is_usable.assert_not_called()
+
+    def test_skips_unchecked_connections(self):
+        """
+            Test closed, atomic and unconfigured connections are not probed
+        """
+        connections = (
+            FakeConnection(usable=False, connected=False),
+            FakeConnection(usable=False, atomic=True),
+            FakeConnection(usable=False, checks=False),
+        )
+
+        self.start_request(*connections)
+        for connection in connections:
+            connection._cursor()
+
+        for connection in connections:
+            connection.is_usable.assert_not_called()
+            connection.close.assert_not_called()
+
+    def test_installed_once(self):
+        """
+            Test reconnecting does not stack the check
+        """
+        connection = FakeConnection()
+        checked = connection._cursor
+
+        db.install_health_check(sender=None, connection=connection)
+
+        self.assertIs(connection._cursor, checked)
@@ -0,0 +1,60 @@
+from threading import BoundedSemaphore
+from unittest.mock import patch
+
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher,
+    check_password,
+    make_password,
+)
+from django.test import SimpleTestCase, override_settings
+
+from core import hashing
+
+
+class PooledHasherTests(SimpleTestCase):
+
+    def test_pooled_argon2_round_trip(self):
+        """
+            Test hashes from the pool use the configured costs and verify
+            with the plain Django hasher
+        """
+        encoded = make_password('secret pass')
+
+        self.assertTrue(encoded.startswith('argon2$argon2id$'))
+        self.assertIn('m=19456,t=2,p=1', encoded)
+        self.assertTrue(check_password('secret pass', encoded))
+        self.assertFalse(check_password('wrong pass', encoded))
+        self.assertTrue(Argon2PasswordHasher().verify('secret pass', encoded))
+
+    def test_verifies_other_algorithms(self):
+        """
+            Test hashes of the other configured algorithms still verify
+        """
+        for algorithm in ('pbkdf2_sha256', 'bcrypt_sha256'):
+            encoded = make_password('secret pass', hasher=algorithm)
+
+            self.assertTrue(encoded.startswith(algorithm))
+            self.assertTrue(check_password('secret pass', encoded))
+
+    @override_settings(PASSWORD_HASHING={'WORKERS': 1, 'TIMEOUT': 0})
+    def test_busy_when_pending_full(self):
+        """
+            Test callers beyond MAX_PENDING get HashingBusy
+        """
+        pending = BoundedSemaphore(1)
+        pending.acquire()
+        with patch.object(hashing, '_get_pool',
+                          return_value=(None, pending)):
+            with self.assertRaises(hashing.HashingBusy):
+                make_password('secret pass')
+
+    @override_settings(PASSWORD_HASHING={'WORKERS': 0})
+    def test_inline_without_workers(self):
+        """
+            Test WORKERS = 0 hashes in the calling process
+        """
+        with patch.object(hashing, '_get_pool') as get_pool:
+            encoded = make_password('secret pass')
+
+        get_pool.assert_not_called()
+        self.assertTrue(check_password('secret pass', encoded))
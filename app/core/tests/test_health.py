@@ -0,0 +1,61 @@
+from unittest.mock import patch
+
+from django.db.utils import OperationalError
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+HEALTHZ_URL = reverse('healthz')
+READYZ_URL = reverse('readyz')
+
+
+class HealthEndpointTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_liveness_skips_database(self):
+        """
+            Test liveness answers without a database query
+        """
+        with self.assertNumQueries(0):
+            res = self.client.get(HEALTHZ_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json(), {'status': 'ok'})
+
+    def test_ready(self):
+        """
+            Test readiness with a migrated, reachable database
+        """
+        res = self.client.get(READYZ_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()['checks'], {
+            'default': 'ok', 'default:migrations': 'ok'
+        })
+        self.assertIn('no-cache', res['Cache-Control'])
+
+    def test_not_ready_database_down(self):
+        """
+            Test readiness fails while the database refuses connections
+        """
+        with patch('core.health.check_database',
+                   side_effect=OperationalError):
+            res = self.client.get(READYZ_URL)
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.json()['checks'], {'default': 'unavailable'})
+
+    def test_not_ready_migrations_pending(self):
+        """
+            Test readiness fails until migrations are applied
+        """
+        with patch('core.health.pending_migrations',
+                   return_value=['core.0010_sync_tracking']):
+            res = self.client.get(READYZ_URL)
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.json()['checks']['default:migrations'],
+                         'pending')
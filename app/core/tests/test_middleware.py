@@ -0,0 +1,115 @@
+import re
+import time
+
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import metrics, middleware
+from core.models import Tag
+from recipe.serializers import TagSerializer
+
+METRICS_URL = reverse('metrics')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+class RequestMetricsTests(TestCase):
+
+    def setUp(self):
+        for histogram in metrics.HISTOGRAMS:
+            histogram.reset()
+        self.user = get_user_model().objects.create_user(
+            'metrics@weeb.com',
+            'root45'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_server_timing_header(self):
+        """
+            Test responses carry db, serialize, render and total timings
+        """
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.get(TAGS_URL, {'page_size': 10})
+
+        timing = res['Server-Timing']
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertRegex(timing, r'serialize;dur=[\d.]+')
+        self.assertRegex(timing, r'render;dur=[\d.]+')
+        self.assertRegex(timing, r'total;dur=[\d.]+')
+
+    def test_serialization_timed_apart_from_queries(self):
+        """
+            Test serializer time is recorded once and excludes its queries
+        """
+        request = RequestFactory().get(TAGS_URL)
+        stats = request._metrics = middleware._RequestStats()
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+
+        with middleware.serializing(request):
+            TagSerializer(tag, context={'request': request}).data
+            self.assertTrue(stats.serializing)
+            # a 50 ms query run while serializing
+            time.sleep(0.05)
+            stats.db_time += 0.05
+
+        self.assertGreater(stats.serialize_time, 0)
+        self.assertLess(stats.serialize_time, 0.05)
+        self.assertFalse(stats.serializing)
+
+    def test_histograms_labelled_by_action(self):
+        """
+            Test requests are aggregated by viewset action
+        """
+        self.client.get(TAGS_URL)
+        self.client.post(TAGS_URL, {'name': 'Vegan'})
+
+        text = metrics.render()
+
+        self.assertIn(
+            'http_request_duration_seconds_count'
+            '{view="tag-list",method="GET",status="200"} 1',
+            text
+        )
+        self.assertIn(
+            'http_request_duration_seconds_count'
+            '{view="tag-create",method="POST",status="201"} 1',
+            text
+        )
+        queries = re.search(
+            r'http_request_db_queries_sum\{view="tag-create"\} (\d+)', text
+        )
+        self.assertGreater(int(queries.group(1)), 0)
+
+    def test_metrics_endpoint_internal_only(self):
+        """
+            Test the metrics endpoint refuses outside addresses
+        """
+        self.client.get(TAGS_URL)
+
+        res = self.client.get(METRICS_URL)
+        self.assertEqual(res.status_code, 200)
+        self.assertIn(b'# TYPE http_request_duration_seconds histogram',
+                      res.content)
+
+        res = self.client.get(METRICS_URL, REMOTE_ADDR='203.0.113.9')
+        self.assertEqual(res.status_code, 404)
+
+    def test_histogram_buckets_cumulative(self):
+        """
+            Test bucket counts accumulate up to +Inf
+        """
+        histogram = metrics.Histogram('test_seconds', 'Test.', ('view',),
+                                      (0.1, 1))
+        for value in (0.05, 0.5, 5):
+            histogram.observe(value, 'a')
+
+        lines = histogram.render()
+
+        self.assertIn('test_seconds_bucket{view="a",le="0.1"} 1', lines)
+        self.assertIn('test_seconds_bucket{view="a",le="1"} 2', lines)
+        self.assertIn('test_seconds_bucket{view="a",le="+Inf"} 3', lines)
+        self.assertIn('test_seconds_count{view="a"} 3', lines)
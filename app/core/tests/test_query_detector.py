@@ -0,0 +1,115 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from core.query_detector import QueryProblem, detect_queries, fingerprint
+from recipe.views import RecipeViewSet
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class QueryDetectorTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'detector@weeb.com',
+            'root45'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        tags = [
+            Tag.objects.create(user=self.user, name=f'tag {index}')
+            for index in range(3)
+        ]
+        ingredient = Ingredient.objects.create(user=self.user, name='salt')
+        for index in range(8):
+            recipe = Recipe.objects.create(
+                user=self.user, title=f'r{index}', time_minutes=5, price=1
+            )
+            recipe.tags.set(tags)
+            recipe.ingredients.add(ingredient)
+        self.recipe = recipe
+
+    def test_fingerprint_normalizes_literals(self):
+        """
+            Test queries differing only in parameters share a fingerprint
+        """
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id = 1 AND name = 'a''b'"),
+            fingerprint("SELECT *  FROM t WHERE id = 22 AND name = 'c'"),
+        )
+        self.assertEqual(
+            fingerprint('SELECT * FROM t WHERE id IN (%s, %s)'),
+            fingerprint('SELECT * FROM t WHERE id IN (%s, %s, %s)'),
+        )
+
+    def test_detects_n_plus_one(self):
+        """
+            Test per row queries are reported with the issuing stack
+        """
+        with self.assertRaises(QueryProblem) as ctx:
+            with detect_queries(MAX_REPEATS=3):
+                for recipe in Recipe.objects.all():
+                    list(recipe.tags.all())
+
+        self.assertIn('repeated 8 times', str(ctx.exception))
+        self.assertIn('test_query_detector.py', str(ctx.exception))
+
+    def test_detects_slow_queries(self):
+        """
+            Test queries over the budget are logged in log mode
+        """
+        with self.assertLogs('core.query_detector', 'WARNING') as logs:
+            with detect_queries(ACTION='log', SLOW_QUERY_MS=-1):
+                Recipe.objects.count()
+
+        self.assertIn('slow', logs.output[0])
+
+    def test_recipe_endpoints_free_of_n_plus_one(self):
+        """
+            Test recipe list and detail serializers stay prefetched
+        """
+        with detect_queries('recipe endpoints', MAX_REPEATS=2):
+            self.client.get(RECIPES_URL, {'page_size': 10})
+            self.client.get(detail_url(self.recipe.id))
+
+    def test_serializer_regression_detected(self):
+        """
+            Test dropping the prefetch from the serializer path is caught
+        """
+        with patch.object(RecipeViewSet, 'fast_list', False), \
+                patch.object(
+                    RecipeViewSet, '_prefetch_for_action',
+                    lambda self, queryset: queryset
+                ):
+            with self.assertRaises(QueryProblem):
+                with detect_queries(MAX_REPEATS=2):
+                    self.client.get(RECIPES_URL)
+
+    @override_settings(QUERY_DETECTOR={
+        'ENABLED': True, 'ACTION': 'raise', 'MAX_REPEATS': 2
+    })
+    def test_middleware_fails_chatty_requests(self):
+        """
+            Test the middleware raises for a request with an N+1
+        """
+        client = APIClient()
+        client.force_authenticate(self.user)
+        client.get(RECIPES_URL)
+
+        with patch.object(RecipeViewSet, 'fast_list', False), \
+                patch.object(
+                    RecipeViewSet, '_prefetch_for_action',
+                    lambda self, queryset: queryset
+                ):
+            with self.assertRaises(QueryProblem):
+                client.get(RECIPES_URL, {'search': 'r'})
@@ -0,0 +1,66 @@
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from app import serving
+
+
+def cgroup(files):
+    return patch.object(serving, '_read', side_effect=files.get)
+
+
+class ServingProfileTests(SimpleTestCase):
+
+    def test_worker_count_bounded_by_memory(self):
+        """
+            Test 2 * cores + 1 workers, fewer when memory is short
+        """
+        self.assertEqual(serving.worker_count(4, 8192, 150), 9)
+        self.assertEqual(serving.worker_count(4, 728, 150), 4)
+        self.assertEqual(serving.worker_count(4, 100, 150), 1)
+        self.assertEqual(serving.worker_count(2, None, 150), 5)
+
+    def test_cpus_from_cgroup_quota(self):
+        """
+            Test a fractional cgroup v2 quota rounds up
+        """
+        with patch('os.sched_getaffinity', return_value=set(range(16))):
+            with cgroup({'/sys/fs/cgroup/cpu.max': '150000 100000'}):
+                self.assertEqual(serving.available_cpus(), 2)
+            with cgroup({'/sys/fs/cgroup/cpu.max': 'max 100000'}):
+                self.assertEqual(serving.available_cpus(), 16)
+            with cgroup({
+                '/sys/fs/cgroup/cpu/cpu.cfs_quota_us': '400000',
+                '/sys/fs/cgroup/cpu/cpu.cfs_period_us': '100000',
+            }):
+                self.assertEqual(serving.available_cpus(), 4)
+
+    def test_memory_from_cgroup_limit(self):
+        """
+            Test the cgroup memory limit wins over physical memory
+        """
+        with cgroup({'/sys/fs/cgroup/memory.max': str(512 * 1024 * 1024)}):
+            self.assertEqual(serving.available_memory_mb(), 512)
+
+    def test_config_from_environment(self):
+        """
+            Test the environment picks the mode and pins the workers
+        """
+        config = serving.get_config({
+            'SERVER_MODE': 'wsgi', 'WORKER_THREADS': '4',
+            'WEB_CONCURRENCY': '3', 'MAX_REQUESTS': '500',
+        })
+
+        self.assertEqual(config['WORKERS'], 3)
+        self.assertEqual(config['WORKER_CLASS'], 'gthread')
+        self.assertEqual(config['MAX_REQUESTS'], 500)
+        self.assertEqual(config['APPLICATION'], 'app.wsgi:application')
+
+        config = serving.get_config({'SERVER_MODE': 'asgi'})
+        self.assertEqual(config['WORKER_CLASS'],
+                         'uvicorn.workers.UvicornWorker')
+        self.assertEqual(config['APPLICATION'], 'app.asgi:application')
+        self.assertGreaterEqual(config['WORKERS'], 1)
+
+        with self.assertRaises(ValueError):
+            serving.get_config({'SERVER_MODE': 'fastcgi'})
@@ -0,0 +1,104 @@
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from core.models import Recipe
+from core.storage import recipe_image_storage
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ContentAddressedStorageTests(TestCase):
+    """Test deduplicating storage of recipe images"""
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'blob@weeb.com',
+            'root45'
+        )
+
+    def _recipe(self, content=b'same bytes'):
+        recipe = Recipe.objects.create(
+            user=self.user, title='blob', time_minutes=5, price=1
+        )
+        recipe.image.save('photo.JPG', ContentFile(content))
+        return recipe
+
+    def test_identical_content_stored_once(self):
+        """
+            test the same bytes map to one digest named file
+        """
+        recipe1 = self._recipe()
+        recipe2 = self._recipe()
+        recipe3 = self._recipe(b'other bytes')
+
+        self.assertEqual(recipe1.image.name, recipe2.image.name)
+        self.assertNotEqual(recipe1.image.name, recipe3.image.name)
+        self.assertRegex(
+            recipe1.image.name,
+            r'^uploads/recipe/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$'
+        )
+        with recipe1.image.open() as fh:
+            self.assertEqual(fh.read(), b'same bytes')
+
+    def test_delete_leaves_blob_to_gc(self):
+        """
+            test deleting a reference keeps the file, even once no recipe
+            references it, until garbage collection
+        """
+        recipe1 = self._recipe()
+        recipe2 = self._recipe()
+        path = recipe2.image.path
+
+        recipe1.image.delete()
+        recipe2.delete()
+        recipe_image_storage.delete(recipe2.image.name)
+        self.assertTrue(os.path.exists(path))
+
+        call_command('gc_recipe_images', grace=0, stdout=StringIO())
+        self.assertFalse(os.path.exists(path))
+
+    def test_reuse_restarts_gc_grace(self):
+        """
+            test an orphaned blob uploaded again is not collected as an
+            old orphan before its new row is saved
+        """
+        orphan = self._recipe(b'reused bytes')
+        path = orphan.image.path
+        orphan.delete()
+        hour_ago = time.time() - 3600
+        os.utime(path, (hour_ago, hour_ago))
+
+        with patch.object(Recipe, 'save'):
+            self._recipe(b'reused bytes')
+        call_command('gc_recipe_images', grace=30, stdout=StringIO())
+
+        self.assertTrue(os.path.exists(path))
+
+    def test_gc_removes_orphans(self):
+        """
+            test garbage collection deletes unreferenced files only
+        """
+        kept = self._recipe()
+        orphan = self._recipe(b'orphan bytes')
+        orphan_path = orphan.image.path
+        orphan.delete()
+
+        call_command('gc_recipe_images', grace=0, stdout=StringIO())
+
+        self.assertFalse(os.path.exists(orphan_path))
+        self.assertTrue(recipe_image_storage.exists(kept.image.name))
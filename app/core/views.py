@@ -0,0 +1,53 @@
+import ipaddress
+
+from django.http import Http404, HttpResponse, JsonResponse
+from django.views.decorators.cache import never_cache
+
+from core import health, metrics
+
+
+def is_internal(request):
+    """
+        check the client address is in REQUEST_METRICS ALLOWED_NETWORKS
+    """
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(
+        address in ipaddress.ip_network(network, strict=False)
+        for network in metrics.get_config()['ALLOWED_NETWORKS']
+    )
+
+
+def metrics_view(request):
+    """
+        expose request histograms in the Prometheus text format
+    """
+    if not is_internal(request):
+        raise Http404()
+    return HttpResponse(
+        metrics.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
+@never_cache
+def healthz(request):
+    """
+        liveness, the process answers requests, never touches the database
+    """
+    return JsonResponse({'status': 'ok'})
+
+
+@never_cache
+def readyz(request):
+    """
+        readiness, databases accept queries and migrations are applied,
+        503 until then so the orchestrator holds traffic back
+    """
+    ready, checks = health.readiness()
+    return JsonResponse(
+        {'status': 'ok' if ready else 'unavailable', 'checks': checks},
+        status=200 if ready else 503
+    )
@@ -0,0 +1,46 @@
+"""
+gunicorn settings, run with `gunicorn -c gunicorn.conf.py`
+
+values come from app.serving, see its docstring for the environment
+"""
+import gc
+
+from app import serving
+
+_config = serving.get_config()
+
+wsgi_app = _config['APPLICATION']
+bind = _config['BIND']
+workers = _config['WORKERS']
+worker_class = _config['WORKER_CLASS']
+threads = _config['WORKER_THREADS']
+
+# import Django once in the master, workers fork with its pages shared
+preload_app = True
+# recycle workers to bound slow memory growth, jitter staggers restarts
+max_requests = _config['MAX_REQUESTS']
+max_requests_jitter = _config['MAX_REQUESTS_JITTER']
+timeout = _config['WORKER_TIMEOUT']
+graceful_timeout = _config['WORKER_TIMEOUT']
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
+
+
+def when_ready(server):
+    server.log.info(
+        'serving %s with %d %s workers x %d threads '
+        '(%d cpus, %s MB memory)',
+        wsgi_app, workers, worker_class, threads,
+        _config['CPUS'], _config['MEMORY_MB'],
+    )
+
+
+def pre_fork(server, worker):
+    # a connection opened while preloading must not be shared by workers
+    from django.db import connections
+    connections.close_all()
+    # keep preloaded objects out of the collector, so collections in the
+    # workers do not touch, and copy, the shared pages
+    gc.freeze()
@@ -0,0 +1,198 @@
+from django.conf import settings
+from django.db import connection
+from django.db.models import CharField, Value
+from django.utils import timezone
+from rest_framework import serializers as drf_serializers
+from rest_framework.exceptions import ValidationError
+
+from core.models import Tag, Ingredient, Recipe
+from recipe.serializers import RecipeBulkItemSerializer, RecipeListReader
+
+RELATIONS = (('ingredients', Ingredient), ('tags', Tag))
+SCALAR_FIELDS = ('title', 'time_minutes', 'price', 'link')
+DOES_NOT_EXIST = drf_serializers.PrimaryKeyRelatedField.default_error_messages[
+    'does_not_exist'
+]
+
+
+def max_items():
+    return getattr(settings, 'RECIPE_BULK_MAX_ITEMS', 1000)
+
+
+def validate_items(user, data, partial=False):
+    """
+        validate a batch of recipes, raising a ValidationError holding one
+        error dict per item (empty for valid items) if any item is invalid
+    """
+    if not isinstance(data, list) or not data:
+        raise ValidationError({
+            'non_field_errors': ['Expected a non empty list of recipes.']
+        })
+    if len(data) > max_items():
+        raise ValidationError({
+            'non_field_errors': [f'At most {max_items()} recipes per request.']
+        })
+
+    child = RecipeBulkItemSerializer(partial=partial)
+    items, errors = [], []
+    for item in data:
+        try:
+            items.append(dict(child.run_validation(item)))
+            errors.append({})
+        except ValidationError as exc:
+            items.append({})
+            errors.append(exc.detail)
+
+    _check_ownership(user, items, errors)
+    if partial:
+        _check_recipes(user, items, errors)
+
+    if any(errors):
+        raise ValidationError(errors)
+    return items
+
+
+def _check_ownership(user, items, errors):
+    """
+        resolve every referenced tag and ingredient id in one query
+    """
+    wanted = {name: set() for name, _ in RELATIONS}
+    for item in items:
+        for name, _ in RELATIONS:
+            wanted[name].update(item.get(name, ()))
+    if not any(wanted.values()):
+        return
+
+    owned = {name: set() for name, _ in RELATIONS}
+    querysets = [
+        model.objects.filter(user=user, id__in=wanted[name])
+        .annotate(kind=Value(name, output_field=CharField()))
+        .values_list('kind', 'id')
+        for name, model in RELATIONS
+    ]
+    for kind, pk in querysets[0].union(*querysets[1:], all=True):
+        owned[kind].add(pk)
+
+    for item, item_errors in zip(items, errors):
+        for name, _ in RELATIONS:
+            missing = [
+                pk for pk in item.get(name, ()) if pk not in owned[name]
+            ]
+            if missing:
+                item_errors[name] = [
+                    DOES_NOT_EXIST.format(pk_value=pk) for pk in missing
+                ]
+
+
+def _check_recipes(user, items, errors):
+    """
+        make sure every item of an update names an owned recipe, once
+    """
+    ids = [item.get('id') for item in items]
+    owned = set(
+        Recipe.objects.filter(user=user, id__in=[pk for pk in ids if pk])
+        .values_list('id', flat=True)
+    )
+    seen = set()
+    for item, pk, item_errors in zip(items, ids, errors):
+        if not item and item_errors:
+            # failed validation, its id is unknown, `{}` itself is valid
+            continue
+        if pk is None:
+            item_errors['id'] = ['This field is required.']
+        elif pk not in owned:
+            item_errors['id'] = ['Not found.']
+        elif pk in seen:
+            item_errors['id'] = ['Duplicate recipe in request.']
+        seen.add(pk)
+
+
+def _unique(ids):
+    return list(dict.fromkeys(ids))
+
+
+def set_relations(recipes, items, replace=False):
+    """
+        write through table rows for the given recipes in bulk, `replace`
+        clears existing links of relations present in the items first
+    """
+    for name, model in RELATIONS:
+        through = Recipe._meta.get_field(name).remote_field.through
+        column = f'{model._meta.model_name}_id'
+        pairs = [
+            (recipe, item[name]) for recipe, item in zip(recipes, items)
+            if name in item
+        ]
+        if replace and pairs:
+            through.objects.filter(
+                recipe_id__in=[recipe.pk for recipe, _ in pairs]
+            ).delete()
+        through.objects.bulk_create(
+            [
+                through(recipe_id=recipe.pk, **{column: related_id})
+                for recipe, related_ids in pairs
+                for related_id in _unique(related_ids)
+            ],
+            batch_size=1000
+        )
+
+
+def create_recipes(user, items):
+    """
+        insert validated items with their links, return the new ids
+    """
+    recipes = [
+        Recipe(user=user, **{
+            field: item[field] for field in SCALAR_FIELDS if field in item
+        })
+        for item in items
+    ]
+    if connection.features.can_return_rows_from_bulk_insert:
+        Recipe.objects.bulk_create(recipes, batch_size=1000)
+    else:
+        for recipe in recipes:
+            recipe.save()
+    set_relations(recipes, items)
+    return [recipe.pk for recipe in recipes]
+
+
+def update_recipes(user, items):
+    """
+        apply partial updates to owned recipes, return their ids
+    """
+    ids = [item['id'] for item in items]
+    recipes = Recipe.objects.filter(user=user).in_bulk(ids)
+    ordered = [recipes[pk] for pk in ids]
+
+    # bulk_update skips auto_now, delta sync relies on updated_at
+    now = timezone.now()
+    fields = {'updated_at'}
+    for recipe, item in zip(ordered, items):
+        recipe.updated_at = now
+        for field in SCALAR_FIELDS:
+            if field in item:
+                setattr(recipe, field, item[field])
+                fields.add(field)
+    Recipe.objects.bulk_update(ordered, sorted(fields), batch_size=1000)
+    set_relations(ordered, items, replace=True)
+    return ids
+
+
+def delete_recipes(user, ids):
+    """
+        delete owned recipes by id, return how many were deleted
+    """
+    _, deleted = Recipe.objects.filter(user=user, id__in=ids).delete()
+    return deleted.get(Recipe._meta.label, 0)
+
+
+def render(ids, request=None):
+    """
+        return list representation of the recipes, in the order of ids
+    """
+    reader = RecipeListReader()
+    rows = reader.render(
+        reader.values(Recipe.objects.filter(id__in=ids)), request
+    )
+    by_id = {row['id']: row for row in rows}
+    return [by_id[pk] for pk in ids]
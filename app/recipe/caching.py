@@ -0,0 +1,263 @@
+import functools
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import checks
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from app import serving
+from core.models import Tag, Ingredient, Recipe
+
+DEFAULTS = {
+    # None: on when the cache is shared by the worker processes
+    'ENABLED': None,
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': 300,
+}
+SORTED_ID_PARAMS = ('tags', 'ingredients')
+
+
+def get_config():
+    """
+        return response cache settings merged over the defaults
+    """
+    return {**DEFAULTS, **getattr(settings, 'RECIPE_RESPONSE_CACHE', {})}
+
+
+def _cache():
+    return caches[get_config()['CACHE_ALIAS']]
+
+
+def is_shared(alias):
+    """
+        whether the cache `alias` is seen by every process, memory and
+        dummy caches are private to one process
+    """
+    return not isinstance(caches[alias], (LocMemCache, DummyCache))
+
+
+def enabled():
+    """
+        whether responses are cached, a write only bumps the generation in
+        the cache of its own process, so a private cache would let the
+        other workers serve stale lists
+    """
+    config = get_config()
+    if config['ENABLED'] is None:
+        return is_shared(config['CACHE_ALIAS'])
+    return config['ENABLED']
+
+
+@checks.register(checks.Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """
+        warn when the response cache is forced on with a per process
+        cache and gunicorn runs several workers
+    """
+    alias = get_config()['CACHE_ALIAS']
+    if not enabled() or is_shared(alias):
+        return []
+    workers = serving.get_config()['WORKERS']
+    if workers <= 1:
+        return []
+    return [checks.Warning(
+        f'RECIPE_RESPONSE_CACHE is enabled with the per process cache '
+        f'{alias!r} and {workers} workers, writes will not invalidate '
+        f'the lists cached by the other workers.',
+        hint='Set CACHE_LOCATION to a shared memcached server, or '
+             'WEB_CONCURRENCY=1.',
+        id='recipe.W001',
+    )]
+
+
+def _generation_key(user_id):
+    return f'recipe:gen:{user_id}'
+
+
+def get_generation(user_id):
+    """
+        return the change counter of a user's recipe data
+
+        a missing counter starts from the clock so it never falls back to
+        a value some cached response was stored under before eviction
+    """
+    cache = _cache()
+    key = _generation_key(user_id)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, time.time_ns() // 1000, timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+def bump_generation(user_id):
+    """
+        mark every cached response of the user as stale, once now and once
+        more on commit so a read racing the open transaction cannot cache
+        uncommitted state under the new generation
+    """
+    _increment(user_id)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _increment(user_id))
+
+
+def _increment(user_id):
+    cache = _cache()
+    key = _generation_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns() // 1000, timeout=None)
+
+
+def normalize_params(query_params):
+    """
+        return query params as a canonical string, id lists are sorted so
+        `tags=2,1` and `tags=1,2` share an entry
+    """
+    items = []
+    for name in sorted(query_params):
+        for value in sorted(query_params.getlist(name)):
+            if name in SORTED_ID_PARAMS:
+                parts = value.split(',')
+                if all(part.strip().isdigit() for part in parts):
+                    value = ','.join(sorted(parts, key=int))
+            items.append(f'{name}={value}')
+    return '&'.join(items)
+
+
+def response_cache_key(request, view_name):
+    """
+        cache key for a user's response to `view_name` with the request
+        params, it embeds the current generation of that user
+    """
+    user_id = request.user.pk
+    params = hashlib.sha256(
+        f'{request.get_host()}?{normalize_params(request.query_params)}'
+        .encode()
+    ).hexdigest()
+    return (
+        f'recipe:resp:{user_id}:{get_generation(user_id)}:'
+        f'{view_name}:{params}'
+    )
+
+
+def cached_list(method):
+    """
+        decorate a viewset list method to serve repeated requests from the
+        per user response cache
+    """
+    @functools.wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        if not enabled():
+            return method(self, request, *args, **kwargs)
+
+        key = response_cache_key(request, f'{self.basename}-{self.action}')
+        data = _cache().get(key)
+        if data is not None:
+            return Response(data)
+
+        response = method(self, request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            _cache().set(key, response.data, get_config()['TIMEOUT'])
+        return response
+    return wrapper
+
+
+def response_etag(request, view_name, view_kwargs=None):
+    """
+        weak etag of a user's response to `view_name`, derived from the
+        generation and request instead of the rendered body
+    """
+    parts = [
+        response_cache_key(request, view_name),
+        request.accepted_renderer.format,
+    ]
+    parts += [f'{k}={v}' for k, v in sorted((view_kwargs or {}).items())]
+    digest = hashlib.sha256('|'.join(parts).encode()).hexdigest()
+    return f'W/"{digest[:32]}"'
+
+
+def etag_matches(etag, header):
+    """
+        weak comparison of `etag` against the tags of an If-None-Match
+        header, `*` is left to the caller as it depends on the resource
+        existing
+    """
+    if not header or header.strip() == '*':
+        return False
+    opaque = etag[2:] if etag.startswith('W/') else etag
+    return any(
+        (tag[2:] if tag.startswith('W/') else tag) == opaque
+        for tag in parse_etags(header)
+    )
+
+
+def conditional(method):
+    """
+        decorate a viewset read method to answer If-None-Match with 304
+        before the queryset is touched, and to tag 200 responses
+
+        the etags embed the generation, so they are only sent while the
+        response cache is enabled, i.e. the generation is shared by all
+        workers. `If-None-Match: *` matches once the view found the
+        object, a missing one still gets its 404
+    """
+    @functools.wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        if not enabled():
+            return method(self, request, *args, **kwargs)
+        etag = response_etag(
+            request, f'{self.basename}-{self.action}', kwargs
+        )
+        header = request.META.get('HTTP_IF_NONE_MATCH')
+        if etag_matches(etag, header):
+            return _not_modified(etag)
+
+        response = method(self, request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            if header and header.strip() == '*':
+                return _not_modified(etag)
+            response['ETag'] = etag
+        return response
+    return wrapper
+
+
+def _not_modified(etag):
+    return Response(
+        status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag}
+    )
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+def owned_object_changed(sender, instance, **kwargs):
+    bump_generation(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_links_changed(sender, instance, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_generation(instance.user_id)
+
+
+@receiver(post_save, sender=get_user_model())
+def user_created(sender, instance, created, **kwargs):
+    # a reused user id must never see entries cached for an older user
+    if created:
+        bump_generation(instance.pk)
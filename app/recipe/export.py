@@ -0,0 +1,146 @@
+import csv
+from itertools import islice
+
+from django.conf import settings
+from django.db import connections
+from django.core.serializers.json import DjangoJSONEncoder
+
+from core.models import Tag, Ingredient, Recipe
+from recipe import images
+from recipe.serializers import RecipeDetailSerializer
+
+DEFAULT_CHUNK_SIZE = 2000
+COLUMNS = ('id', 'title', 'time_minutes', 'price', 'link', 'image')
+RELATIONS = (('ingredients', Ingredient), ('tags', Tag))
+CSV_HEADER = (
+    'id', 'title', 'ingredients', 'tags', 'time_minutes', 'price', 'link',
+    'image',
+)
+
+
+def chunk_size():
+    return getattr(settings, 'RECIPE_EXPORT_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+
+
+def iter_rows(queryset, size):
+    """
+        yield recipe rows in id order from a server side cursor, or page
+        on the primary key when DISABLE_SERVER_SIDE_CURSORS is set, as
+        behind a transaction pooler, where iterator() would fetch every
+        row at once
+    """
+    queryset = queryset.order_by('id').values(*COLUMNS)
+    settings_dict = connections[queryset.db].settings_dict
+    if not settings_dict.get('DISABLE_SERVER_SIDE_CURSORS'):
+        yield from queryset.iterator(chunk_size=size)
+        return
+    page = list(queryset[:size])
+    while page:
+        yield from page
+        if len(page) < size:
+            return
+        page = list(queryset.filter(id__gt=page[-1]['id'])[:size])
+
+
+def iter_chunks(queryset, size=None):
+    """
+        yield lists of recipe rows, each with its tags and ingredients
+        fetched in one query per chunk
+    """
+    size = size or chunk_size()
+    rows = iter_rows(queryset, size)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        ids = [row['id'] for row in chunk]
+        for name, model in RELATIONS:
+            related = _related_names(ids, name, model)
+            for row in chunk:
+                row[name] = related.get(row['id'], [])
+        yield chunk
+
+
+def _related_names(ids, name, model):
+    """
+        return {recipe_id: [{id, name}, ..]} for a chunk of recipes
+    """
+    through = Recipe._meta.get_field(name).remote_field.through
+    column = model._meta.model_name
+    links = through.objects.filter(recipe_id__in=ids).order_by(
+        f'{column}__name', f'{column}_id'
+    ).values_list('recipe_id', f'{column}_id', f'{column}__name')
+
+    related = {}
+    for recipe_id, related_id, related_name in links:
+        related.setdefault(recipe_id, []).append(
+            {'id': related_id, 'name': related_name}
+        )
+    return related
+
+
+def ndjson(queryset, request=None):
+    """
+        yield the recipes as newline delimited JSON in the detail
+        serializer representation, one string per chunk
+    """
+    price = RecipeDetailSerializer().fields['price'].to_representation
+    encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    for chunk in iter_chunks(queryset):
+        lines = []
+        for row in chunk:
+            lines.append(encoder.encode({
+                'id': row['id'],
+                'title': row['title'],
+                'ingredients': row['ingredients'],
+                'tags': row['tags'],
+                'time_minutes': row['time_minutes'],
+                'price': price(row['price']),
+                'link': row['link'],
+                'image_derivatives': images.derivative_urls(
+                    row['image'], request
+                ),
+            }))
+            lines.append('\n')
+        yield ''.join(lines)
+
+
+class _Buffer:
+    """file-like object handing back what csv.writer writes"""
+
+    def write(self, value):
+        return value
+
+
+def csv_rows(queryset, request=None):
+    """
+        yield the recipes as CSV, tag and ingredient names joined by `|`
+    """
+    storage = Recipe._meta.get_field('image').storage
+    writer = csv.writer(_Buffer())
+    yield writer.writerow(CSV_HEADER)
+    for chunk in iter_chunks(queryset):
+        lines = []
+        for row in chunk:
+            image = ''
+            if row['image']:
+                image = storage.url(row['image'])
+                if request is not None:
+                    image = request.build_absolute_uri(image)
+            lines.append(writer.writerow((
+                row['id'],
+                row['title'],
+                '|'.join(item['name'] for item in row['ingredients']),
+                '|'.join(item['name'] for item in row['tags']),
+                row['time_minutes'],
+                row['price'],
+                row['link'],
+                image,
+            )))
+        yield ''.join(lines)
+
+
+FORMATS = {
+    'ndjson': (ndjson, 'application/x-ndjson', 'ndjson'),
+    'csv': (csv_rows, 'text/csv; charset=utf-8', 'csv'),
+}
@@ -0,0 +1,59 @@
+from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+
+
+class UserManyRelatedField(serializers.ManyRelatedField):
+    """
+        many related field resolving every submitted id with a single
+        `id__in` query and reporting all missing ids together
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        child = self.child_relation
+        pks = []
+        for value in data:
+            # int() would truncate 1.5, '1.5' and Decimal ids
+            if isinstance(value, int) and not isinstance(value, bool):
+                pks.append(value)
+            elif isinstance(value, str) and value.isascii() and \
+                    value.isdigit():
+                pks.append(int(value))
+            else:
+                child.fail('incorrect_type', data_type=type(value).__name__)
+
+        found = child.get_queryset().in_bulk(set(pks))
+        missing = [pk for pk in dict.fromkeys(pks) if pk not in found]
+        if missing:
+            raise serializers.ValidationError([
+                child.error_messages['does_not_exist'].format(pk_value=pk)
+                for pk in missing
+            ], code='does_not_exist')
+
+        return [found[pk] for pk in dict.fromkeys(pks)]
+
+
+class UserPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+        primary key field limited to objects owned by the request user,
+        `many=True` validates the whole list in one query
+    """
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return UserManyRelatedField(**list_kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        request = self.context.get('request')
+        if request is None or not request.user.is_authenticated:
+            return queryset.none()
+        return queryset.filter(user=request.user)
@@ -0,0 +1,107 @@
+from django.db.models import Exists, OuterRef
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from core.models import Recipe
+from recipe import search
+
+
+class RecipeRelationFilter(BaseFilterBackend):
+    """
+        filter recipes by tag and ingredient ids
+
+        `?tags=1,2&tags_mode=any` keeps recipes linked to any of the tags,
+        `tags_mode=all` keeps recipes linked to every one of them. the same
+        goes for `ingredients`. each condition is an EXISTS subquery on the
+        through table so the recipe rows are never multiplied by joins.
+    """
+    relations = (('tags', 'tag_id'), ('ingredients', 'ingredient_id'))
+    modes = ('any', 'all')
+    default_mode = 'any'
+    max_ids = 50
+
+    def filter_queryset(self, request, queryset, view):
+        errors = {}
+        for name, column in self.relations:
+            raw = request.query_params.get(name)
+            if not raw:
+                continue
+            try:
+                ids = self.parse_ids(raw)
+                mode = self.parse_mode(
+                    request.query_params.get(f'{name}_mode')
+                )
+            except ValueError as exc:
+                errors[name] = [str(exc)]
+                continue
+            queryset = self.filter_relation(queryset, name, column, ids, mode)
+
+        if errors:
+            raise ValidationError(errors)
+        return queryset
+
+    def parse_ids(self, raw):
+        """
+            convert comma separated ids into a sorted list of integers
+        """
+        try:
+            ids = {int(value) for value in raw.split(',') if value.strip()}
+        except ValueError:
+            raise ValueError('Expected a comma separated list of ids.')
+        if not ids or any(value < 1 for value in ids):
+            raise ValueError('Expected a comma separated list of ids.')
+        if len(ids) > self.max_ids:
+            raise ValueError(f'At most {self.max_ids} ids are allowed.')
+        return sorted(ids)
+
+    def parse_mode(self, raw):
+        """
+            validate the match mode for a relation
+        """
+        if raw is None:
+            return self.default_mode
+        if raw not in self.modes:
+            raise ValueError(f'Mode must be one of {", ".join(self.modes)}.')
+        return raw
+
+    def filter_relation(self, queryset, name, column, ids, mode):
+        """
+            restrict queryset with EXISTS subqueries on the through table
+        """
+        through = Recipe._meta.get_field(name).remote_field.through
+        links = through.objects.filter(recipe_id=OuterRef('pk'))
+
+        if mode == 'any':
+            return queryset.filter(
+                Exists(links.filter(**{f'{column}__in': ids}))
+            )
+        for related_id in ids:
+            queryset = queryset.filter(
+                Exists(links.filter(**{column: related_id}))
+            )
+        return queryset
+
+
+class RecipeSearchFilter(BaseFilterBackend):
+    """
+        full text search over recipe titles, tag and ingredient names with
+        `?search=`, results are ranked by relevance
+    """
+    search_param = 'search'
+    max_length = 200
+
+    def get_terms(self, request):
+        return request.query_params.get(self.search_param, '').strip()
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_terms(request)
+        if not terms:
+            return queryset
+        if len(terms) > self.max_length:
+            raise ValidationError({
+                self.search_param: [
+                    f'Ensure this field has no more than {self.max_length} '
+                    'characters.'
+                ]
+            })
+        return search.search(queryset, terms).order_by('-search_rank', '-id')
@@ -0,0 +1,165 @@
+import io
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'SIZES': (128, 512),
+    'FORMATS': ('webp', 'jpeg'),
+    'QUALITY': 80,
+    'WORKERS': 2,
+    'DIRECTORY': 'uploads/recipe/derivatives',
+}
+EXTENSIONS = {'jpeg': 'jpg', 'webp': 'webp', 'png': 'png'}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_config():
+    """
+        return derivative settings merged over the defaults
+    """
+    return {
+        **DEFAULTS,
+        **getattr(settings, 'RECIPE_IMAGE_DERIVATIVES', {}),
+    }
+
+
+def derivative_name(name, size, fmt):
+    """
+        return storage name of one derivative of the image `name`
+    """
+    stem = os.path.splitext(os.path.basename(name))[0]
+    return '/'.join(
+        (get_config()['DIRECTORY'], f'{stem}-{size}.{EXTENSIONS[fmt]}')
+    )
+
+
+def derivative_names(name):
+    """
+        return {size: {format: storage name}} for the image `name`
+    """
+    config = get_config()
+    return {
+        str(size): {
+            fmt: derivative_name(name, size, fmt) for fmt in config['FORMATS']
+        }
+        for size in config['SIZES']
+    }
+
+
+def derivative_urls(name, request=None, storage=default_storage):
+    """
+        return {size: {format: url}} of the derivatives already stored for
+        an image, None without image. sizes still pending or that failed
+        to render are left out
+    """
+    if not name:
+        return None
+    urls = {}
+    for size, names in derivative_names(name).items():
+        for fmt, derivative in names.items():
+            if not storage.exists(derivative):
+                continue
+            url = storage.url(derivative)
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            urls.setdefault(size, {})[fmt] = url
+    return urls
+
+
+def _write(storage, name, data):
+    """
+        store `data` under exactly `name`, replacing any previous file.
+        the bytes go to a temporary file renamed over the target, so
+        readers never see a partial derivative and `storage.save` never
+        picks a suffixed name
+    """
+    path = storage.path(name)
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.derivative-')
+    try:
+        with os.fdopen(fd, 'wb') as output:
+            output.write(data)
+        if storage.file_permissions_mode is not None:
+            os.chmod(temp_path, storage.file_permissions_mode)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return name
+
+
+def generate_derivatives(name, storage=default_storage, force=False):
+    """
+        render every configured size and format of the image `name`,
+        skipping the ones already stored unless `force`, and return the
+        names written
+    """
+    config = get_config()
+    wanted = [
+        (size, fmt, derivative_name(name, size, fmt))
+        for size in sorted(config['SIZES'], reverse=True)
+        for fmt in config['FORMATS']
+    ]
+    if not force:
+        wanted = [item for item in wanted if not storage.exists(item[2])]
+    if not wanted:
+        return []
+
+    with storage.open(name, 'rb') as source:
+        image = Image.open(source)
+        # JPEG can decode straight to a reduced scale, keeping memory low
+        largest = max(size for size, _, _ in wanted)
+        image.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        image.load()
+
+    written = []
+    for size, fmt, derivative in wanted:
+        image.thumbnail((size, size))
+        rendered = image
+        if fmt == 'jpeg' and rendered.mode not in ('RGB', 'L'):
+            rendered = rendered.convert('RGB')
+        buffer = io.BytesIO()
+        rendered.save(buffer, format=fmt.upper(), quality=config['QUALITY'])
+        written.append(_write(storage, derivative, buffer.getvalue()))
+    return written
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=get_config()['WORKERS'],
+                thread_name_prefix='recipe-images'
+            )
+        return _executor
+
+
+def _generate_logged(name, force):
+    try:
+        return generate_derivatives(name, force=force)
+    except Exception:
+        logger.exception('could not generate derivatives for %s', name)
+        raise
+
+
+def schedule_derivatives(name, force=False):
+    """
+        generate derivatives of `name` in the worker pool, off the
+        request path, and return the future
+    """
+    return _get_executor().submit(_generate_logged, name, force)
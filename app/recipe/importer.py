@@ -0,0 +1,252 @@
+import codecs
+import csv
+import io
+import json
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from core.models import Tag, Ingredient
+from recipe import bulk, caching, search
+from recipe.serializers import RecipeImportItemSerializer
+
+DEFAULTS = {
+    'BATCH_SIZE': 1000,
+    'MAX_UPLOAD_SIZE': 200 * 1024 * 1024,
+    'MAX_REQUEST_ROWS': 50000,
+    'MAX_ERRORS': 100,
+}
+FORMATS = ('ndjson', 'csv')
+RELATIONS = (('ingredients', Ingredient), ('tags', Tag))
+
+
+def get_config():
+    """
+        return import settings merged over the defaults
+    """
+    return {**DEFAULTS, **getattr(settings, 'RECIPE_IMPORT', {})}
+
+
+def guess_format(filename):
+    """
+        return the import format implied by a file name, or None
+    """
+    extension = filename.rsplit('.', 1)[-1].lower() if filename else ''
+    if extension in ('ndjson', 'jsonl'):
+        return 'ndjson'
+    if extension == 'csv':
+        return 'csv'
+    return None
+
+
+class UnreadableFile(ValueError):
+    """
+        raised while reading records when the rest of the file cannot be
+        parsed, records read so far are still imported
+    """
+
+
+def read_records(stream, import_format):
+    """
+        yield (record, error) for every record of a binary stream, one of
+        them is None. NDJSON lines and CSV rows are parsed lazily so the
+        file is never loaded at once. a NDJSON line that is not UTF-8 is
+        a record error, a CSV file that cannot be decoded or parsed
+        raises UnreadableFile since its row boundaries are lost
+    """
+    if import_format == 'csv':
+        text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+        rows = csv.DictReader(text)
+        while True:
+            try:
+                row = next(rows)
+            except StopIteration:
+                return
+            except UnicodeDecodeError:
+                raise UnreadableFile('File is not valid UTF-8.')
+            except csv.Error as exc:
+                raise UnreadableFile(f'Invalid CSV: {exc}.')
+            yield row, None
+
+    for index, line in enumerate(stream):
+        if index == 0 and line.startswith(codecs.BOM_UTF8):
+            line = line[len(codecs.BOM_UTF8):]
+        try:
+            line = line.decode('utf-8').strip()
+        except UnicodeDecodeError:
+            yield None, 'Invalid UTF-8.'
+            continue
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield None, 'Invalid JSON.'
+            continue
+        if not isinstance(record, dict):
+            yield None, 'Expected a JSON object.'
+            continue
+        yield record, None
+
+
+def _names(value):
+    """
+        accept `a|b`, ['a', 'b'] and the export shape [{'name': 'a'}]
+    """
+    if value in (None, ''):
+        return []
+    if isinstance(value, str):
+        return value.split('|')
+    if isinstance(value, list):
+        return [
+            item.get('name') if isinstance(item, dict) else item
+            for item in value
+        ]
+    return value
+
+
+class RecipeImporter:
+    """
+        import recipes for one user in batches
+
+        each batch resolves all its tag and ingredient names with one
+        lookup per model, bulk creates the missing ones, then inserts the
+        recipes and their through table links with the bulk helpers. a
+        batch is one transaction, `offset` counts the records consumed by
+        committed batches so an interrupted import resumes from there.
+    """
+
+    def __init__(self, user, batch_size=None, max_errors=None,
+                 progress=None):
+        config = get_config()
+        self.user = user
+        self.batch_size = batch_size or config['BATCH_SIZE']
+        self.max_errors = max_errors or config['MAX_ERRORS']
+        self.progress = progress
+        self.child = RecipeImportItemSerializer()
+
+    def run(self, records, offset=0, limit=None):
+        """
+            import `records` from (record, error) pairs skipping the first
+            `offset`, stop after `limit` records and return a summary
+        """
+        self.result = {
+            'offset': offset,
+            'processed': 0,
+            'imported': 0,
+            'failed': 0,
+            'errors': [],
+            'complete': False,
+            'file_error': None,
+            'rows_per_second': 0.0,
+        }
+        self.started = time.perf_counter()
+        records = islice(records, offset, None)
+
+        batch = []
+        try:
+            for record, error in records:
+                if limit is not None and self.result['processed'] >= limit:
+                    self._flush(batch)
+                    return self._finish()
+                number = self.result['offset'] + len(batch) + 1
+                batch.append((number, record, error))
+                self.result['processed'] += 1
+                if len(batch) >= self.batch_size:
+                    self._flush(batch)
+                    batch = []
+        except UnreadableFile as exc:
+            # keep what was read, `offset` then points at the bad record
+            self._flush(batch)
+            self.result['file_error'] = str(exc)
+            self.result['errors'].append(
+                {'record': self.result['offset'] + 1, 'errors': [str(exc)]}
+            )
+            return self._finish()
+
+        self._flush(batch)
+        self.result['complete'] = True
+        return self._finish()
+
+    def _flush(self, batch):
+        if not batch:
+            return
+        items = []
+        for number, record, error in batch:
+            if error is None:
+                try:
+                    items.append(self._validate(record))
+                    continue
+                except ValidationError as exc:
+                    error = exc.detail
+            self.result['failed'] += 1
+            if len(self.result['errors']) < self.max_errors:
+                self.result['errors'].append(
+                    {'record': number, 'errors': error}
+                )
+
+        if items:
+            with transaction.atomic():
+                self._write(items)
+        self.result['offset'] += len(batch)
+        self.result['imported'] += len(items)
+        self._update_rate()
+        if self.progress is not None:
+            self.progress(dict(self.result))
+
+    def _validate(self, record):
+        data = dict(record)
+        for name, _ in RELATIONS:
+            data[name] = _names(data.get(name))
+        item = dict(self.child.run_validation(data))
+        for name, _ in RELATIONS:
+            item[name] = [value for value in item.get(name, ()) if value]
+        return item
+
+    def _write(self, items):
+        for name, model in RELATIONS:
+            ids = self._resolve(model, {
+                value for item in items for value in item[name]
+            })
+            for item in items:
+                item[name] = [ids[value] for value in item[name]]
+
+        recipe_ids = bulk.create_recipes(self.user, items)
+        search.refresh_search_vectors(recipe_ids)
+        caching.bump_generation(self.user.pk)
+
+    def _resolve(self, model, names):
+        """
+            return {name: id} for the user's objects, creating missing ones
+        """
+        if not names:
+            return {}
+        queryset = model.objects.filter(user=self.user).order_by('-id')
+        # the lowest id wins when a user already has duplicate names
+        ids = dict(
+            queryset.filter(name__in=names).values_list('name', 'id')
+        )
+        missing = sorted(names - ids.keys())
+        if missing:
+            model.objects.bulk_create(
+                [model(user=self.user, name=name) for name in missing],
+                batch_size=self.batch_size
+            )
+            ids.update(
+                queryset.filter(name__in=missing).values_list('name', 'id')
+            )
+        return ids
+
+    def _update_rate(self):
+        elapsed = time.perf_counter() - self.started
+        if elapsed > 0:
+            self.result['rows_per_second'] = round(
+                self.result['processed'] / elapsed, 1
+            )
+
+    def _finish(self):
+        self._update_rate()
+        return self.result
@@ -0,0 +1,44 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from core.models import Recipe
+from recipe import images
+
+
+class Command(BaseCommand):
+    """django command generating missing derivatives of recipe images"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='regenerate derivatives that already exist'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=images.get_config()['WORKERS']
+        )
+
+    def handle(self, *args, **options):
+        names = (
+            Recipe.objects.exclude(image__isnull=True).exclude(image='')
+            .order_by().values_list('image', flat=True).distinct()
+        )
+        generated = failed = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            futures = {
+                name: pool.submit(
+                    images.generate_derivatives, name, force=options['force']
+                )
+                for name in names.iterator()
+            }
+            for name, future in futures.items():
+                try:
+                    generated += len(future.result())
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(f'{name}: {exc}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{generated} derivatives generated, {failed} images failed'
+        ))
@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core import benchmarking
+from core.models import Tag, Ingredient
+
+
+class Command(BaseCommand):
+    """django command comparing per item and bulk recipe creation"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        with benchmarking.isolated_database():
+            self._run(options['items'])
+
+    def _run(self, count):
+        user, = benchmarking.create_users(1, prefix='bench-bulk')
+        benchmarking.seed_user(user, tags=20, ingredients=50)
+        tag_ids = list(Tag.objects.values_list('id', flat=True))
+        ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+        payload = [
+            {
+                'title': f'recipe {index}',
+                'time_minutes': 30,
+                'price': '12.50',
+                'tags': tag_ids[index % 20:index % 20 + 2],
+                'ingredients': ingredient_ids[index % 50:index % 50 + 5],
+            }
+            for index in range(count)
+        ]
+        client = APIClient()
+        client.force_authenticate(user)
+
+        start = time.perf_counter()
+        for item in payload:
+            client.post(reverse('recipe:recipe-list'), item, format='json')
+        single = time.perf_counter() - start
+
+        start = time.perf_counter()
+        res = client.post(
+            reverse('recipe:recipe-bulk'), payload, format='json'
+        )
+        batch = time.perf_counter() - start
+        assert res.status_code == 201, res.data
+
+        self.stdout.write(f'per item: {count / single:10.1f} recipes/s')
+        self.stdout.write(f'bulk:     {count / batch:10.1f} recipes/s')
+        self.stdout.write(f'speedup:  {single / batch:10.1f}x')
@@ -0,0 +1,50 @@
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core import benchmarking
+
+
+class Command(BaseCommand):
+    """django command measuring export time and peak memory by size"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[10, 10000, 100000]
+        )
+        parser.add_argument(
+            '--export-format', default='ndjson', choices=('ndjson', 'csv')
+        )
+
+    def handle(self, *args, **options):
+        with benchmarking.isolated_database():
+            self._run(options['sizes'], options['export_format'])
+
+    def _run(self, sizes, export_format):
+        url = reverse('recipe:recipe-export')
+        users = benchmarking.create_users(len(sizes), prefix='bench-export')
+        self.stdout.write(
+            f'{"recipes":>8} {"seconds":>10} {"MB":>10} {"peak KB":>10}'
+        )
+        for user, size in zip(users, sizes):
+            benchmarking.seed_user(
+                user, recipes=size, tags=20, ingredients=50
+            )
+            client = APIClient()
+            client.force_authenticate(user)
+
+            tracemalloc.start()
+            started = time.perf_counter()
+            res = client.get(url, {'export_format': export_format})
+            written = sum(len(part) for part in res.streaming_content)
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            self.stdout.write(
+                f'{size:>8} {elapsed:>10.2f} {written / 2 ** 20:>10.1f} '
+                f'{peak / 1024:>10.0f}'
+            )
@@ -0,0 +1,49 @@
+from unittest.mock import patch
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core import benchmarking
+from recipe.views import RecipeViewSet
+
+
+class Command(BaseCommand):
+    """django command comparing recipe list serializer and fast path"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[100, 1000, 10000]
+        )
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        # repeated requests would otherwise time the response cache
+        with override_settings(RECIPE_RESPONSE_CACHE={'ENABLED': False}), \
+                benchmarking.isolated_database():
+            self._run(options['sizes'], options['repeat'])
+
+    def _run(self, sizes, repeat):
+        url = reverse('recipe:recipe-list')
+        users = benchmarking.create_users(len(sizes), prefix='bench-list')
+        self.stdout.write(
+            f'{"recipes":>8} {"path":>10} {"p50 ms":>10} {"mean ms":>10}'
+        )
+        for user, size in zip(users, sizes):
+            benchmarking.seed_user(
+                user, recipes=size, tags=20, ingredients=50
+            )
+            client = APIClient()
+            client.force_authenticate(user)
+
+            for label, fast in (('serializer', False), ('fast', True)):
+                with patch.object(RecipeViewSet, 'fast_list', fast):
+                    client.get(url)
+                    summary = benchmarking.summarize(
+                        benchmarking.timed(lambda: client.get(url), repeat)
+                    )
+                self.stdout.write(
+                    f'{size:>8} {label:>10} '
+                    f'{summary["p50"]:>10.1f} {summary["mean"]:>10.1f}'
+                )
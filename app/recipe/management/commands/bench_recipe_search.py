@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.db import connection
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core import benchmarking
+from recipe import search
+
+VOCABULARY = (
+    'chicken beef tofu paneer salmon prawn lentil chickpea mushroom '
+    'spinach potato tomato garlic ginger lemon lime coconut chilli basil '
+    'curry stew soup salad roast grilled baked fried braised smoky spicy '
+    'creamy crispy quick easy vegan thai indian mexican italian korean'
+).split()
+
+
+class Command(BaseCommand):
+    """django command timing recipe search on a large library"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=1000000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument(
+            '--terms', nargs='+', default=['curry', 'spicy chicken', 'vegan']
+        )
+
+    def handle(self, *args, **options):
+        # repeated requests would otherwise time the response cache
+        with override_settings(RECIPE_RESPONSE_CACHE={'ENABLED': False}), \
+                benchmarking.isolated_database():
+            self._run(options)
+
+    def _run(self, options):
+        user, = benchmarking.create_users(1, prefix='bench-search')
+        benchmarking.seed_user(
+            user,
+            recipes=options['recipes'],
+            tags=50,
+            ingredients=200,
+            batch_size=5000,
+            vocabulary=VOCABULARY,
+        )
+        search.refresh_search_vectors()
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE core_recipe')
+
+        client = APIClient()
+        client.force_authenticate(user)
+        url = reverse('recipe:recipe-list')
+        self.stdout.write(
+            f'{options["recipes"]} recipes on {connection.vendor}'
+        )
+        for terms in options['terms']:
+            params = {'search': terms, 'page_size': 50}
+            summary = benchmarking.summarize(benchmarking.timed(
+                lambda: client.get(url, params), options['repeat']
+            ))
+            self.stdout.write(
+                f'{terms!r:>18} p50 {summary["p50"]:8.1f} ms '
+                f'p95 {summary["p95"]:8.1f} ms'
+            )
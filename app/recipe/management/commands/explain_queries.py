@@ -0,0 +1,113 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core import benchmarking
+from core.models import Tag, Ingredient
+from recipe import serializers, views
+
+
+class Command(BaseCommand):
+    """django command printing query plans of the recipe viewsets"""
+
+    help = 'Seed a throwaway database and EXPLAIN every viewset queryset'
+
+    seq_scan_patterns = {
+        'postgresql': re.compile(r'Seq Scan on (core_\w+)'),
+        # \b keeps `core_\w+` from backtracking into a table name
+        # followed by USING INDEX
+        'sqlite': re.compile(r'\bSCAN (?:TABLE )?(core_\w+)\b(?! USING)'),
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--tags', type=int, default=50)
+        parser.add_argument('--ingredients', type=int, default=200)
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='fail when a plan scans a core table sequentially'
+        )
+
+    def handle(self, *args, **options):
+        with benchmarking.isolated_database():
+            failures = self._run(options)
+
+        if failures:
+            raise CommandError(
+                'sequential scans found: ' + ', '.join(sorted(failures))
+            )
+
+    def _run(self, options):
+        users = benchmarking.create_users(options['users'], prefix='explain')
+        for user in users:
+            benchmarking.seed_user(
+                user,
+                recipes=options['recipes'],
+                tags=options['tags'],
+                ingredients=options['ingredients'],
+            )
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+        failures = set()
+        for label, queryset in self._querysets(users[0]):
+            plan = queryset.explain()
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            self.stdout.write(plan)
+            pattern = self.seq_scan_patterns.get(connection.vendor)
+            if options['check'] and pattern:
+                failures.update(
+                    f'{label} ({table})' for table in pattern.findall(plan)
+                )
+        return failures
+
+    def _querysets(self, user):
+        """
+            yield the querysets each viewset action runs, as executed
+        """
+        tag_ids = list(
+            Tag.objects.filter(user=user).values_list('id', flat=True)[:2]
+        )
+        ingredient_id = Ingredient.objects.filter(user=user).values_list(
+            'id', flat=True
+        ).first()
+        reader = serializers.RecipeListReader()
+
+        yield 'tag-list', self._queryset(views.TagViewSet, 'list', user)
+        yield 'ingredient-list', self._queryset(
+            views.IngredientViewSet, 'list', user
+        )
+
+        recipes = self._queryset(views.RecipeViewSet, 'list', user)
+        yield 'recipe-list', reader.values(recipes)
+        yield 'recipe-list page', reader.values(recipes)[:101]
+
+        recipe_id = recipes.values_list('id', flat=True).first()
+        yield 'recipe-detail', self._queryset(
+            views.RecipeViewSet, 'retrieve', user
+        ).filter(pk=recipe_id)
+
+        for mode in ('any', 'all'):
+            filtered = self._queryset(
+                views.RecipeViewSet, 'list', user, {
+                    'tags': ','.join(str(pk) for pk in tag_ids),
+                    'tags_mode': mode,
+                    'ingredients': str(ingredient_id),
+                }
+            )
+            yield f'recipe-list tags_mode={mode}', reader.values(filtered)
+
+    def _queryset(self, viewset, action, user, params=None):
+        """
+            build a viewset for a fake request and return its queryset
+        """
+        request = Request(APIRequestFactory().get('/', params or {}))
+        request.user = user
+        view = viewset(action=action, request=request, format_kwarg=None)
+        return view.filter_queryset(view.get_queryset())
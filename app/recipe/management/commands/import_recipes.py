@@ -0,0 +1,89 @@
+import json
+import os
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe import importer
+
+
+class Command(BaseCommand):
+    """django command importing recipes from an NDJSON or CSV file"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--user', required=True, help='owner email')
+        parser.add_argument('--import-format', choices=importer.FORMATS)
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument(
+            '--checkpoint',
+            help='progress file, defaults to <path>.checkpoint'
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='continue after the last committed batch'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        import_format = (
+            options['import_format'] or importer.guess_format(path)
+        )
+        if import_format is None:
+            raise CommandError('Cannot tell the format, use --import-format')
+        try:
+            user = get_user_model().objects.get(email=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'No user {options["user"]}')
+
+        checkpoint = options['checkpoint'] or f'{path}.checkpoint'
+        offset = 0
+        if options['resume'] and os.path.exists(checkpoint):
+            with open(checkpoint) as file:
+                state = json.load(file)
+            if state.get('source') != os.path.abspath(path):
+                raise CommandError(f'{checkpoint} belongs to another file')
+            offset = state['offset']
+            self.stdout.write(f'resuming after record {offset}')
+
+        def progress(result):
+            self._save_checkpoint(checkpoint, path, result)
+            self.stdout.write(
+                f'{result["offset"]} records, {result["failed"]} failed, '
+                f'{result["rows_per_second"]:.0f} rows/s'
+            )
+
+        recipe_importer = importer.RecipeImporter(
+            user, batch_size=options['batch_size'], progress=progress
+        )
+        with open(path, 'rb') as stream:
+            result = recipe_importer.run(
+                importer.read_records(stream, import_format), offset=offset
+            )
+
+        for error in result['errors']:
+            self.stderr.write(f'record {error["record"]}: {error["errors"]}')
+        if result['file_error'] is not None:
+            raise CommandError(
+                f'{result["file_error"]} Stopped after record '
+                f'{result["offset"]}.'
+            )
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        self.stdout.write(self.style.SUCCESS(
+            f'{result["imported"]} recipes imported, {result["failed"]} '
+            f'failed, {result["rows_per_second"]:.0f} rows/s'
+        ))
+
+    def _save_checkpoint(self, checkpoint, path, result):
+        """
+            atomically record the offset of the last committed batch
+        """
+        temp = f'{checkpoint}.tmp'
+        with open(temp, 'w') as file:
+            json.dump({
+                'source': os.path.abspath(path),
+                'offset': result['offset'],
+            }, file)
+        os.replace(temp, checkpoint)
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from recipe import sync
+
+
+class Command(BaseCommand):
+    """django command deleting delta sync tombstones past retention"""
+
+    def handle(self, *args, **options):
+        deleted = sync.prune_tombstones()
+        self.stdout.write(self.style.SUCCESS(f'{deleted} tombstones pruned'))
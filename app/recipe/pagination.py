@@ -0,0 +1,284 @@
+import base64
+import json
+from collections import namedtuple
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import models
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+Cursor = namedtuple('Cursor', ['reverse', 'position'])
+
+
+def positive_int(value, cutoff=None):
+    """
+        parse a query parameter of plain digits as an integer above zero,
+        capped at `cutoff`, raise ValueError for anything else
+    """
+    if not (isinstance(value, str) and value.isascii() and value.isdigit()):
+        raise ValueError(f'{value!r} is not a positive integer')
+    number = int(value)
+    if number == 0:
+        raise ValueError(f'{value!r} is not a positive integer')
+    if cutoff is not None:
+        return min(number, cutoff)
+    return number
+
+
+class KeysetPagination(BasePagination):
+    """
+        opt-in keyset (cursor) pagination over a fixed ordering
+
+        the cursor stores the ordering values of the last row seen, so
+        every page is a `WHERE (a, b) < (x, y) ORDER BY a, b LIMIT n`
+        query and costs the same no matter how deep the client is.
+        pagination only kicks in when the client sends `cursor` or
+        `page_size`, plain requests keep returning the full list.
+    """
+    ordering = ('-id',)
+    page_size = 100
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_ordering(self, request, queryset, view):
+        """
+            return the ordering, the view can override it for a request
+        """
+        ordering = None
+        if hasattr(view, 'get_keyset_ordering'):
+            ordering = view.get_keyset_ordering()
+        return tuple(ordering or self.ordering)
+
+    def is_requested(self, request):
+        """
+            check if the client asked for a paginated response
+        """
+        params = request.query_params
+        return (
+            self.cursor_query_param in params or
+            self.page_size_query_param in params
+        )
+
+    def get_page_size(self, request):
+        """
+            return page size requested by the client, capped
+        """
+        try:
+            return positive_int(
+                request.query_params[self.page_size_query_param],
+                cutoff=self.max_page_size
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_requested(request):
+            return None
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, queryset, view)
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            cursor = cursor._replace(
+                position=self.clean_position(queryset, cursor.position)
+            )
+
+        ordering = self.ordering
+        if cursor is not None and cursor.reverse:
+            ordering = tuple(_flip(field) for field in ordering)
+
+        queryset = queryset.order_by(*ordering)
+        if cursor is not None:
+            queryset = queryset.filter(
+                self._after_position(ordering, cursor.position)
+            )
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if cursor is not None and cursor.reverse:
+            results.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, cursor is not None
+
+        self.next_position = None
+        self.previous_position = None
+        if results:
+            if has_next:
+                self.next_position = self._position(results[-1])
+            if has_previous:
+                self.previous_position = self._position(results[0])
+        elif cursor is not None:
+            # empty page, let the client walk back from where it was
+            if cursor.reverse:
+                self.next_position = cursor.position
+            else:
+                self.previous_position = cursor.position
+
+        return results
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(Cursor(False, self.next_position))
+
+    def get_previous_link(self):
+        if self.previous_position is None:
+            return None
+        return self.encode_cursor(Cursor(True, self.previous_position))
+
+    def decode_cursor(self, request):
+        """
+            return the cursor sent by the client, or None for first page
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            reverse = bool(payload['r'])
+            position = list(payload['p'])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        return Cursor(reverse, position)
+
+    def clean_position(self, queryset, position):
+        """
+            check every cursor value against the type of its ordering
+            field, a forged value would otherwise fail in the query
+        """
+        cleaned = []
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            try:
+                output = queryset.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                output = queryset.query.annotations[name].output_field
+            try:
+                cleaned.append(_clean_value(output, value))
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+        return cleaned
+
+    def encode_cursor(self, cursor):
+        """
+            return url for the given cursor
+        """
+        payload = json.dumps(
+            {'r': int(cursor.reverse), 'p': cursor.position},
+            separators=(',', ':'),
+            default=str
+        )
+        encoded = base64.urlsafe_b64encode(payload.encode()).decode()
+        url = replace_query_param(
+            self.base_url,
+            self.cursor_query_param,
+            encoded.rstrip('=')
+        )
+        return url
+
+    def _position(self, item):
+        """
+            return the ordering values of a row, model or values() dict
+        """
+        names = [field.lstrip('-') for field in self.ordering]
+        if isinstance(item, dict):
+            return [item[name] for name in names]
+        return [getattr(item, name) for name in names]
+
+    def _after_position(self, ordering, position):
+        """
+            build the row comparison `(a, b, ..) > position` as a Q object
+        """
+        clauses = []
+        for index, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            equal = {
+                prev.lstrip('-'): value
+                for prev, value in zip(ordering[:index], position)
+            }
+            clauses.append(
+                Q(**equal, **{f'{name}__{lookup}': position[index]})
+            )
+        return reduce(or_, clauses)
+
+
+def _clean_value(field, value):
+    """
+        return a cursor value as the ordering `field` compares it, raise
+        ValueError when it has the wrong type
+    """
+    if value is None or isinstance(value, bool):
+        raise ValueError('not a cursor value')
+    if isinstance(field, models.DateTimeField):
+        # encoded with str(), only aware stamps are ever issued
+        stamp = parse_datetime(value) if isinstance(value, str) else None
+        if stamp is None or stamp.tzinfo is None:
+            raise ValueError('not an aware timestamp')
+        return stamp
+    if isinstance(field, models.IntegerField):
+        if not isinstance(value, int):
+            raise ValueError('not an integer')
+        return value
+    if isinstance(field, models.FloatField):
+        if not isinstance(value, (int, float)):
+            raise ValueError('not a number')
+        return value
+    if isinstance(field, (models.CharField, models.TextField)):
+        if not isinstance(value, str):
+            raise ValueError('not a string')
+        return value
+    return field.to_python(value)
+
+
+def _flip(field):
+    """
+        reverse direction of an ordering field
+    """
+    return field[1:] if field.startswith('-') else f'-{field}'
+
+
+class RecipeKeysetPagination(KeysetPagination):
+    """keyset pagination for recipes, newest first"""
+    ordering = ('-id',)
+
+
+class NameKeysetPagination(KeysetPagination):
+    """keyset pagination for tags and ingredients, id breaks name ties"""
+    ordering = ('-name', '-id')
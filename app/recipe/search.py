@@ -0,0 +1,161 @@
+from functools import reduce
+from operator import and_
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import (
+    Case, Exists, F, FloatField, OuterRef, Q, Value, When,
+)
+from django.db.models.functions import Cast
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete,
+)
+from django.dispatch import receiver
+
+from core.models import Tag, Ingredient, Recipe
+
+REFRESH_SQL = """
+    UPDATE core_recipe SET search_vector =
+        setweight(to_tsvector(%(config)s::regconfig,
+            coalesce(core_recipe.title, '')), 'A') ||
+        setweight(to_tsvector(%(config)s::regconfig, coalesce((
+            SELECT string_agg(core_tag.name, ' ')
+            FROM core_recipe_tags
+            JOIN core_tag ON core_tag.id = core_recipe_tags.tag_id
+            WHERE core_recipe_tags.recipe_id = core_recipe.id
+        ), '')), 'B') ||
+        setweight(to_tsvector(%(config)s::regconfig, coalesce((
+            SELECT string_agg(core_ingredient.name, ' ')
+            FROM core_recipe_ingredients
+            JOIN core_ingredient
+                ON core_ingredient.id = core_recipe_ingredients.ingredient_id
+            WHERE core_recipe_ingredients.recipe_id = core_recipe.id
+        ), '')), 'C')
+"""
+
+
+def search_config():
+    return getattr(settings, 'RECIPE_SEARCH_CONFIG', 'english')
+
+
+def is_supported():
+    """
+        full text search needs postgres, other backends fall back to LIKE
+    """
+    return connection.vendor == 'postgresql'
+
+
+def refresh_search_vectors(recipe_ids=None):
+    """
+        recompute the stored tsvector of the given recipes, or of every
+        recipe when `recipe_ids` is None, in a single UPDATE
+    """
+    if not is_supported():
+        return
+    params = {'config': search_config()}
+    sql = REFRESH_SQL
+    if recipe_ids is not None:
+        recipe_ids = list(recipe_ids)
+        if not recipe_ids:
+            return
+        sql += ' WHERE core_recipe.id = ANY(%(ids)s)'
+        params['ids'] = recipe_ids
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def search(queryset, terms):
+    """
+        filter recipes matching `terms` in the title, tag or ingredient
+        names, annotated with `search_rank` (higher is more relevant)
+    """
+    if is_supported():
+        query = SearchQuery(
+            terms, config=search_config(), search_type='websearch'
+        )
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=Cast(
+                SearchRank(F('search_vector'), query), FloatField()
+            )
+        )
+
+    # fallback for sqlite in tests, every word must match somewhere
+    conditions = []
+    for word in terms.split():
+        matches = Q(title__icontains=word)
+        for name, model in (('tags', Tag), ('ingredients', Ingredient)):
+            through = Recipe._meta.get_field(name).remote_field.through
+            column = model._meta.model_name
+            matches |= Exists(through.objects.filter(
+                recipe_id=OuterRef('pk'),
+                **{f'{column}__name__icontains': word}
+            ))
+        conditions.append(matches)
+    if not conditions:
+        return queryset.none()
+    return queryset.filter(reduce(and_, conditions)).annotate(
+        search_rank=Case(
+            When(title__icontains=terms, then=Value(1.0)),
+            default=Value(0.5),
+            output_field=FloatField(),
+        )
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, created, update_fields=None, **kwargs):
+    """
+        keep the vector current when the title changes
+    """
+    if created or update_fields is None or 'title' in update_fields:
+        refresh_search_vectors([instance.pk])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_links_changed(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    """
+        keep the vector current when tags or ingredients are linked
+    """
+    if reverse and action == 'pre_clear' and is_supported():
+        instance._search_recipe_ids = _linked_recipe_ids(instance)
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        refresh_search_vectors([instance.pk])
+    elif action == 'post_clear':
+        refresh_search_vectors(getattr(instance, '_search_recipe_ids', ()))
+    else:
+        refresh_search_vectors(pk_set)
+
+
+def _linked_recipe_ids(instance):
+    field = 'tags' if isinstance(instance, Tag) else 'ingredients'
+    return list(
+        Recipe.objects.filter(**{field: instance}).values_list('id', flat=True)
+    )
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def attr_saved(sender, instance, created, **kwargs):
+    """
+        renamed tags and ingredients change the vectors of their recipes
+    """
+    if not created and is_supported():
+        refresh_search_vectors(_linked_recipe_ids(instance))
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def attr_deleting(sender, instance, **kwargs):
+    if is_supported():
+        instance._search_recipe_ids = _linked_recipe_ids(instance)
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def attr_deleted(sender, instance, **kwargs):
+    refresh_search_vectors(getattr(instance, '_search_recipe_ids', ()))
@@ -1,12 +1,20 @@
+from functools import cached_property
+
 from django.forms import fields
 from django.contrib.auth import models
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.db import connection
+from django.db.models import OuterRef, Subquery
 
 from rest_framework import serializers
 
+from core.middleware import TimedSerializerMixin, serializing
 from core.models import Tag, Ingredient, Recipe
+from recipe import images
+from recipe.fields import UserPrimaryKeyRelatedField
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """serializer for tag object"""
 
     class Meta:
@@ -15,7 +23,7 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """serializer for ingredients object"""
 
     class Meta:
@@ -24,19 +32,21 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """serializer for recipe app"""
 
-    ingredients = serializers.PrimaryKeyRelatedField(
+    ingredients = UserPrimaryKeyRelatedField(
         many = True,
         queryset = Ingredient.objects.all()
     )
 
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = UserPrimaryKeyRelatedField(
         many = True,
         queryset = Tag.objects.all()
     )
 
+    image_derivatives = serializers.SerializerMethodField()
+
     class Meta:
         model = Recipe
         fields = (
@@ -46,10 +56,19 @@ class RecipeSerializer(serializers.ModelSerializer):
             'tags', 
             'time_minutes', 
             'price', 
-            'link'
+            'link',
+            'image_derivatives',
         )
         read_only_fields = ('id',)
 
+    def get_image_derivatives(self, obj):
+        """
+            return thumbnail urls by size and format
+        """
+        return images.derivative_urls(
+            obj.image.name, self.context.get('request')
+        )
+
     
 
 class RecipeDetailSerializer(RecipeSerializer):
@@ -58,9 +77,168 @@ class RecipeDetailSerializer(RecipeSerializer):
     tags = TagSerializer(many=True, read_only = True)
 
 
-class RecipeImageSerializer(serializers.ModelSerializer):
+class RecipeImageSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """seriaizer for uploading image"""
+    image_derivatives = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Recipe
+        fields = ('id', 'image', 'image_derivatives')
+        read_only_fields = ('id',)
+
+    def get_image_derivatives(self, obj):
+        """
+            return thumbnail urls by size and format
+        """
+        return images.derivative_urls(
+            obj.image.name, self.context.get('request')
+        )
+
+
+class RecipeBulkItemSerializer(serializers.ModelSerializer):
+    """
+        serializer for one recipe of a bulk request, related ids are only
+        type checked here, ownership is checked for the whole batch
+    """
+    id = serializers.IntegerField(required=False)
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False
+    )
+    tags = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False
+    )
+
     class Meta:
         model = Recipe
-        fields = ('id', 'image')
-        read_only_fields = ('id',)
\ No newline at end of file
+        fields = (
+            'id',
+            'title',
+            'ingredients',
+            'tags',
+            'time_minutes',
+            'price',
+            'link',
+        )
+
+
+class RecipeImportItemSerializer(serializers.ModelSerializer):
+    """
+        serializer for one imported recipe, tags and ingredients are
+        names resolved or created by the importer
+    """
+    ingredients = serializers.ListField(
+        child=serializers.CharField(max_length=255, allow_blank=True),
+        required=False
+    )
+    tags = serializers.ListField(
+        child=serializers.CharField(max_length=255, allow_blank=True),
+        required=False
+    )
+
+    class Meta:
+        model = Recipe
+        fields = (
+            'title',
+            'ingredients',
+            'tags',
+            'time_minutes',
+            'price',
+            'link',
+        )
+
+
+class RecipeListReader:
+    """
+        read only fast path for the recipe list
+
+        fetches plain column values plus tag / ingredient id arrays and
+        builds the dicts directly, producing the same output as
+        RecipeSerializer without per field introspection
+    """
+    columns = ('id', 'title', 'time_minutes', 'price', 'link', 'image')
+    relations = (('ingredients', 'ingredient_id'), ('tags', 'tag_id'))
+
+    @cached_property
+    def price_field(self):
+        return RecipeSerializer().fields['price']
+
+    def values(self, queryset, extra=()):
+        """
+            return a values() queryset with the columns the list renders,
+            `extra` adds columns the paginator orders by
+        """
+        queryset = queryset.prefetch_related(None)
+        if connection.vendor == 'postgresql':
+            queryset = queryset.annotate(**{
+                f'{name}_ids': self._id_array(name, column)
+                for name, column in self.relations
+            })
+            return queryset.values(
+                *self.columns,
+                *extra,
+                *(f'{name}_ids' for name, _ in self.relations)
+            )
+        return queryset.values(*self.columns, *extra)
+
+    def _id_array(self, name, column):
+        """
+            correlated subquery aggregating related ids of a recipe
+        """
+        through = Recipe._meta.get_field(name).remote_field.through
+        return Subquery(
+            through.objects.filter(recipe_id=OuterRef('pk'))
+            .order_by()
+            .values('recipe_id')
+            .annotate(ids=ArrayAgg(column, ordering=('id',)))
+            .values('ids')
+        )
+
+    def render(self, rows, request=None):
+        """
+            return representation for a sequence of rows from values(),
+            `request` makes urls absolute like the serializer context does
+        """
+        with serializing(request):
+            return self._render(rows, request)
+
+    def _render(self, rows, request):
+        rows = list(rows)
+        related = {}
+        for name, column in self.relations:
+            if rows and f'{name}_ids' not in rows[0]:
+                related[name] = self._related_ids(rows, name, column)
+
+        price = self.price_field.to_representation
+        data = []
+        for row in rows:
+            pk = row['id']
+            item = {'id': pk, 'title': row['title']}
+            for name, _ in self.relations:
+                if name in related:
+                    item[name] = related[name].get(pk, [])
+                else:
+                    item[name] = row[f'{name}_ids'] or []
+            item['time_minutes'] = row['time_minutes']
+            item['price'] = price(row['price'])
+            item['link'] = row['link']
+            item['image_derivatives'] = images.derivative_urls(
+                row['image'], request
+            )
+            data.append(item)
+        return data
+
+    def _related_ids(self, rows, name, column):
+        """
+            fetch related ids for all rows in one query
+        """
+        through = Recipe._meta.get_field(name).remote_field.through
+        links = through.objects.filter(
+            recipe_id__in=[row['id'] for row in rows]
+        ).order_by('id').values_list('recipe_id', column)
+
+        ids = {}
+        for recipe_id, related_id in links:
+            ids.setdefault(recipe_id, []).append(related_id)
+        return ids
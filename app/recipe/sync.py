@@ -0,0 +1,224 @@
+import base64
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_delete, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.models import Tag, Ingredient, Recipe, Tombstone
+from recipe import serializers
+
+DEFAULTS = {
+    'PAGE_SIZE': 200,
+    'MAX_PAGE_SIZE': 1000,
+    'SAFETY_WINDOW': 10,
+    'TOMBSTONE_RETENTION_DAYS': 30,
+}
+STREAMS = ('tags', 'ingredients', 'recipes', 'deleted')
+TOMBSTONE_STREAMS = {
+    Tombstone.TAG: 'tags',
+    Tombstone.INGREDIENT: 'ingredients',
+    Tombstone.RECIPE: 'recipes',
+}
+
+
+class InvalidCursor(ValueError):
+    """raised for a cursor that cannot be decoded"""
+
+
+class CursorExpired(Exception):
+    """raised when tombstones newer than the cursor may be pruned"""
+
+
+def get_config():
+    """
+        return delta sync settings merged over the defaults
+    """
+    return {**DEFAULTS, **getattr(settings, 'RECIPE_SYNC', {})}
+
+
+def encode_cursor(positions):
+    """
+        return an opaque cursor for {stream: (timestamp, id)}
+    """
+    payload = json.dumps(
+        {
+            stream: [position[0].isoformat(), position[1]]
+            for stream, position in positions.items()
+        },
+        separators=(',', ':'),
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(encoded):
+    """
+        return {stream: (timestamp, id)} from a cursor, an empty cursor
+        starts every stream from the beginning
+    """
+    if not encoded:
+        return {}
+    try:
+        padded = encoded + '=' * (-len(encoded) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        positions = {}
+        for stream in STREAMS:
+            if stream not in payload:
+                continue
+            stamp, pk = payload[stream]
+            stamp = parse_datetime(stamp)
+            # only aware stamps are issued, naive ones cannot be compared
+            if (
+                stamp is None or stamp.tzinfo is None
+                or not isinstance(pk, int) or isinstance(pk, bool)
+            ):
+                raise ValueError(stream)
+            positions[stream] = (stamp, pk)
+    except (TypeError, ValueError, KeyError):
+        raise InvalidCursor('Invalid cursor')
+    return positions
+
+
+def changes(user, positions, limit, request=None):
+    """
+        return one page of changes after `positions`
+
+        every stream is read with `WHERE (updated_at, id) > position ORDER
+        BY updated_at, id LIMIT n` on the (user, updated_at, id) indexes.
+        rows are stamped before their transaction commits, so exhausted
+        streams restart `SAFETY_WINDOW` seconds back and resend the rows
+        of that window, clients apply changes as idempotent upserts.
+    """
+    config = get_config()
+    now = timezone.now()
+    oldest = now - timedelta(days=config['TOMBSTONE_RETENTION_DAYS'])
+    deleted_position = positions.get('deleted')
+    if deleted_position is not None and deleted_position[0] < oldest:
+        raise CursorExpired()
+
+    restart = (now - timedelta(seconds=config['SAFETY_WINDOW']), 0)
+    querysets = {
+        'tags': Tag.objects.filter(user=user),
+        'ingredients': Ingredient.objects.filter(user=user),
+        'recipes': serializers.RecipeListReader().values(
+            Recipe.objects.filter(user=user), extra=('updated_at',)
+        ),
+        'deleted': Tombstone.objects.filter(user=user).values(
+            'id', 'model', 'object_id', 'deleted_at'
+        ),
+    }
+
+    data = {}
+    has_more = False
+    next_positions = {}
+    for stream in STREAMS:
+        field = 'deleted_at' if stream == 'deleted' else 'updated_at'
+        queryset = querysets[stream].order_by(field, 'id')
+        position = positions.get(stream)
+        if position is not None:
+            queryset = queryset.filter(_after(field, position))
+        if stream in ('tags', 'ingredients'):
+            queryset = queryset.values('id', 'name', field)
+
+        rows = list(queryset[:limit + 1])
+        if len(rows) > limit:
+            rows = rows[:limit]
+            has_more = True
+            next_positions[stream] = (rows[-1][field], rows[-1]['id'])
+        else:
+            next_positions[stream] = restart
+        data[stream] = rows
+
+    deleted = {name: [] for name in TOMBSTONE_STREAMS.values()}
+    for row in data['deleted']:
+        deleted[TOMBSTONE_STREAMS[row['model']]].append(row['object_id'])
+
+    return {
+        'tags': [
+            {'id': row['id'], 'name': row['name']} for row in data['tags']
+        ],
+        'ingredients': [
+            {'id': row['id'], 'name': row['name']}
+            for row in data['ingredients']
+        ],
+        'recipes': serializers.RecipeListReader().render(
+            data['recipes'], request
+        ),
+        'deleted': deleted,
+        'has_more': has_more,
+        'cursor': encode_cursor(next_positions),
+    }
+
+
+def _after(field, position):
+    stamp, pk = position
+    return Q(**{f'{field}__gt': stamp}) | Q(**{field: stamp, 'id__gt': pk})
+
+
+def touch_recipes(recipe_ids):
+    """
+        mark recipes changed without sending save signals
+    """
+    recipe_ids = list(recipe_ids)
+    if recipe_ids:
+        Recipe.objects.filter(pk__in=recipe_ids).update(
+            updated_at=timezone.now()
+        )
+
+
+def prune_tombstones(now=None):
+    """
+        delete tombstones past the retention period, return the count
+    """
+    now = now or timezone.now()
+    cutoff = now - timedelta(days=get_config()['TOMBSTONE_RETENTION_DAYS'])
+    deleted, _ = Tombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    return deleted
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_links_changed(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    """
+        a recipe's representation lists its tag and ingredient ids
+    """
+    if reverse and action == 'pre_clear':
+        instance._sync_recipe_ids = _linked_recipe_ids(instance)
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        touch_recipes([instance.pk])
+    elif action == 'post_clear':
+        touch_recipes(getattr(instance, '_sync_recipe_ids', ()))
+    else:
+        touch_recipes(pk_set or ())
+
+
+def _linked_recipe_ids(instance):
+    field = 'tags' if isinstance(instance, Tag) else 'ingredients'
+    return list(
+        Recipe.objects.filter(**{field: instance}).values_list('id', flat=True)
+    )
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def attr_deleting(sender, instance, **kwargs):
+    # the through rows go away with the tag, without m2m signals
+    touch_recipes(_linked_recipe_ids(instance))
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+def object_deleted(sender, instance, **kwargs):
+    Tombstone.objects.create(
+        user_id=instance.user_id,
+        model=sender._meta.model_name,
+        object_id=instance.pk,
+    )
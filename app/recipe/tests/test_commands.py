@@ -0,0 +1,35 @@
+from django.test import SimpleTestCase
+
+from recipe.management.commands.explain_queries import Command
+
+
+class ExplainQueriesTests(SimpleTestCase):
+
+    def test_sqlite_index_scans_not_reported(self):
+        """
+            Test only full table scans of core tables count as sequential
+        """
+        plan = '\n'.join((
+            'SCAN core_recipe USING INDEX core_recipe_user_id_idx',
+            'SCAN TABLE core_tag USING COVERING INDEX core_tag_user_name',
+            'SEARCH core_ingredient USING INDEX core_ingredient_user',
+            'SCAN core_recipe_tags',
+            'SCAN TABLE core_ingredient',
+        ))
+
+        found = Command.seq_scan_patterns['sqlite'].findall(plan)
+
+        self.assertEqual(found, ['core_recipe_tags', 'core_ingredient'])
+
+    def test_postgresql_seq_scans_reported(self):
+        """
+            Test Postgres Seq Scan nodes are reported, index scans are not
+        """
+        plan = '\n'.join((
+            'Index Scan using core_recipe_user_id_idx on core_recipe',
+            '  ->  Seq Scan on core_tag  (cost=0.00..1.01 rows=1 width=4)',
+        ))
+
+        found = Command.seq_scan_patterns['postgresql'].findall(plan)
+
+        self.assertEqual(found, ['core_tag'])
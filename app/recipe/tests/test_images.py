@@ -0,0 +1,156 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from recipe import images
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ImageDerivativeTests(TestCase):
+    """Test thumbnail generation for recipe images"""
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'thumbs@weeb.com',
+            'root45'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _store_image(self, size=(800, 600)):
+        with tempfile.TemporaryFile() as tmp:
+            Image.new('RGB', size, color='red').save(tmp, format='JPEG')
+            tmp.seek(0)
+            return default_storage.save(
+                'uploads/recipe/original.jpg', ContentFile(tmp.read())
+            )
+
+    def test_generate_derivatives(self):
+        """
+            test every configured size and format is rendered and bounded
+        """
+        name = self._store_image()
+
+        written = images.generate_derivatives(name)
+
+        self.assertEqual(len(written), 4)
+        small = images.derivative_name(name, 128, 'webp')
+        with default_storage.open(small) as fh:
+            self.assertEqual(Image.open(fh).size, (128, 96))
+        self.assertEqual(images.generate_derivatives(name), [])
+
+    def test_regenerate_keeps_names(self):
+        """
+            test forced regeneration overwrites derivatives in place
+        """
+        name = self._store_image()
+        first = images.generate_derivatives(name)
+
+        again = images.generate_derivatives(name, force=True)
+
+        self.assertEqual(sorted(again), sorted(first))
+        stem = os.path.splitext(os.path.basename(name))[0]
+        stored = [
+            file_name for file_name in default_storage.listdir(
+                images.get_config()['DIRECTORY']
+            )[1]
+            if file_name.startswith(f'{stem}-')
+        ]
+        self.assertEqual(len(stored), len(first))
+
+    def test_derivative_urls_exposed(self):
+        """
+            test recipe responses list derivative urls of the image
+        """
+        recipe = Recipe.objects.create(
+            user=self.user, title='thumbs', time_minutes=5, price=1
+        )
+        recipe.image = self._store_image()
+        recipe.save()
+        images.generate_derivatives(recipe.image.name)
+
+        res = self.client.get(reverse('recipe:recipe-list'))
+
+        derivatives = res.data[0]['image_derivatives']
+        self.assertEqual(set(derivatives), {'128', '512'})
+        self.assertTrue(derivatives['128']['webp'].startswith('http'))
+        self.assertTrue(derivatives['512']['jpeg'].endswith('-512.jpg'))
+
+    def test_pending_derivatives_not_exposed(self):
+        """
+            test only derivatives that were stored are listed
+        """
+        recipe = Recipe.objects.create(
+            user=self.user, title='thumbs', time_minutes=5, price=1
+        )
+        recipe.image = self._store_image()
+        recipe.save()
+        url = reverse('recipe:recipe-list')
+
+        self.assertEqual(self.client.get(url).data[0]['image_derivatives'], {})
+
+        with override_settings(RECIPE_IMAGE_DERIVATIVES={'SIZES': (128,)}):
+            images.generate_derivatives(recipe.image.name)
+        derivatives = self.client.get(url).data[0]['image_derivatives']
+        self.assertEqual(set(derivatives), {'128'})
+
+    def test_upload_schedules_derivatives(self):
+        """
+            test uploading an image queues derivatives after commit
+        """
+        recipe = Recipe.objects.create(
+            user=self.user, title='thumbs', time_minutes=5, price=1
+        )
+        url = reverse('recipe:recipe-upload-image', args=[recipe.id])
+
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            Image.new('RGB', (10, 10)).save(ntf, format='JPEG')
+            ntf.seek(0)
+            with patch('recipe.images.schedule_derivatives') as schedule:
+                with self.captureOnCommitCallbacks(execute=True):
+                    res = self.client.post(
+                        url, {'image': ntf}, format='multipart'
+                    )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipe.refresh_from_db()
+        schedule.assert_called_once_with(recipe.image.name)
+        self.assertIn('image_derivatives', res.data)
+
+    def test_backfill_command(self):
+        """
+            test the backfill command renders derivatives of stored images
+        """
+        recipe = Recipe.objects.create(
+            user=self.user, title='thumbs', time_minutes=5, price=1
+        )
+        recipe.image = self._store_image()
+        recipe.save()
+
+        call_command('backfill_image_derivatives', stdout=StringIO())
+
+        self.assertTrue(default_storage.exists(
+            images.derivative_name(recipe.image.name, 512, 'jpeg')
+        ))
@@ -0,0 +1,271 @@
+import csv
+import io
+import json
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.urls import reverse
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+IMPORT_URL = reverse('recipe:recipe-import')
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+def ndjson(*records):
+    return ''.join(json.dumps(record) + '\n' for record in records).encode()
+
+
+def recipe_record(title, tags=(), ingredients=()):
+    return {
+        'title': title,
+        'time_minutes': 10,
+        'price': '5.00',
+        'tags': list(tags),
+        'ingredients': list(ingredients),
+    }
+
+
+class RecipeImportApiTest(TestCase):
+    """Test importing recipes from files"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'import@weeb.com',
+            'root45'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, content, name='recipes.ndjson', **params):
+        url = IMPORT_URL
+        if params:
+            url += '?' + '&'.join(f'{k}={v}' for k, v in params.items())
+        return self.client.post(
+            url,
+            {'file': SimpleUploadedFile(name, content)},
+            format='multipart'
+        )
+
+    def test_import_ndjson(self):
+        """
+            test recipes are created with tags resolved by name
+        """
+        vegan = Tag.objects.create(user=self.user, name='vegan')
+        other = get_user_model().objects.create_user('x@weeb.com', 'root45')
+        Tag.objects.create(user=other, name='dinner')
+
+        res = self.upload(ndjson(
+            recipe_record('Soup', ['vegan', 'dinner'], ['salt']),
+            recipe_record('Stew', ['dinner'], ['salt', 'pepper']),
+        ))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['imported'], 2)
+        self.assertTrue(res.data['complete'])
+        soup = Recipe.objects.get(user=self.user, title='Soup')
+        dinner = Tag.objects.get(user=self.user, name='dinner')
+        self.assertEqual(
+            set(soup.tags.values_list('id', flat=True)), {vegan.id, dinner.id}
+        )
+        self.assertEqual(
+            Ingredient.objects.filter(user=self.user).count(), 2
+        )
+
+    def test_import_reports_invalid_records(self):
+        """
+            test invalid records are skipped and reported by number
+        """
+        content = ndjson(recipe_record('Soup')) + b'not json\n' + ndjson(
+            {'title': 'No time', 'price': '1.00'}
+        )
+
+        res = self.upload(content)
+
+        self.assertEqual(res.data['imported'], 1)
+        self.assertEqual(res.data['failed'], 2)
+        self.assertEqual(
+            [error['record'] for error in res.data['errors']], [2, 3]
+        )
+        self.assertIn('time_minutes', res.data['errors'][1]['errors'])
+
+    def test_export_csv_round_trip(self):
+        """
+            test a CSV export imports back into another account
+        """
+        recipe = Recipe.objects.create(
+            user=self.user, title='Curry', time_minutes=30, price='9.50'
+        )
+        recipe.tags.add(Tag.objects.create(user=self.user, name='spicy'))
+        exported = b''.join(self.client.get(
+            EXPORT_URL, {'export_format': 'csv'}
+        ).streaming_content)
+        other = get_user_model().objects.create_user('y@weeb.com', 'root45')
+        self.client.force_authenticate(other)
+
+        res = self.upload(exported, name='recipes.csv')
+
+        self.assertEqual(res.data['imported'], 1)
+        copy = Recipe.objects.get(user=other)
+        self.assertEqual(copy.title, 'Curry')
+        self.assertEqual(
+            list(copy.tags.values_list('name', flat=True)), ['spicy']
+        )
+
+    @override_settings(RECIPE_IMPORT={'MAX_REQUEST_ROWS': 2})
+    def test_import_continues_from_offset(self):
+        """
+            test large files are imported over several requests
+        """
+        content = ndjson(*(recipe_record(f'r{i}') for i in range(5)))
+
+        res = self.upload(content)
+        self.assertFalse(res.data['complete'])
+        while not res.data['complete']:
+            res = self.upload(content, offset=res.data['offset'])
+
+        self.assertEqual(
+            list(Recipe.objects.order_by('id').values_list(
+                'title', flat=True
+            )),
+            [f'r{i}' for i in range(5)]
+        )
+
+    @override_settings(RECIPE_IMPORT={'BATCH_SIZE': 50})
+    def test_import_queries_per_batch(self):
+        """
+            test name resolution does not query per record
+        """
+        content = ndjson(*(
+            recipe_record(f'r{i}', [f't{i % 7}'], [f'i{i % 11}'])
+            for i in range(50)
+        ))
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.upload(content)
+
+        lookups = [
+            q for q in ctx.captured_queries
+            if q['sql'].startswith('SELECT') and 'core_tag' in q['sql']
+        ]
+        self.assertEqual(len(lookups), 2)
+
+    def test_import_reports_undecodable_ndjson_lines(self):
+        """
+            test a NDJSON line that is not UTF-8 is a record error
+        """
+        content = ndjson(recipe_record('Soup')) + b'{"title": "\xff"}\n' + (
+            ndjson(recipe_record('Stew'))
+        )
+
+        res = self.upload(content)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['imported'], 2)
+        self.assertEqual(
+            res.data['errors'], [{'record': 2, 'errors': 'Invalid UTF-8.'}]
+        )
+
+    def test_import_reports_undecodable_csv(self):
+        """
+            test a CSV file that is not UTF-8 is rejected at the bad row
+        """
+        content = (
+            b'title,time_minutes,price\r\n'
+            b'Soup,10,1.00\r\n'
+            + b'x' * 10000 + b'\xff,10,1.00\r\n'
+        )
+
+        res = self.upload(content, name='recipes.csv')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['file_error'], 'File is not valid UTF-8.')
+        self.assertEqual(res.data['imported'], 1)
+        self.assertEqual(res.data['offset'], 1)
+        self.assertEqual(res.data['errors'][-1]['record'], 2)
+        self.assertFalse(res.data['complete'])
+
+    def test_import_reports_malformed_csv(self):
+        """
+            test a CSV parse error is a file error, not a server error
+        """
+        content = (
+            b'title,time_minutes,price\r\n'
+            + b'x' * (csv.field_size_limit() + 1) + b',10,1.00\r\n'
+        )
+
+        res = self.upload(content, name='recipes.csv')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(res.data['file_error'].startswith('Invalid CSV'))
+        self.assertEqual(res.data['offset'], 0)
+
+    def test_import_requires_known_format(self):
+        res = self.upload(b'', name='recipes.xml')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ImportCommandTest(TestCase):
+    """Test the import_recipes management command"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'command@weeb.com',
+            'root45'
+        )
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'recipes.ndjson')
+        with open(self.path, 'wb') as file:
+            file.write(ndjson(*(recipe_record(f'r{i}') for i in range(4))))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_resume_from_checkpoint(self):
+        """
+            test --resume skips records committed by an earlier run
+        """
+        with open(f'{self.path}.checkpoint', 'w') as file:
+            json.dump({'source': self.path, 'offset': 3}, file)
+
+        call_command(
+            'import_recipes', self.path, user=self.user.email, resume=True,
+            stdout=io.StringIO()
+        )
+
+        self.assertEqual(
+            list(Recipe.objects.values_list('title', flat=True)), ['r3']
+        )
+        self.assertFalse(os.path.exists(f'{self.path}.checkpoint'))
+
+    def test_unreadable_file_fails_with_offset(self):
+        """
+            test the command stops cleanly on a file that is not UTF-8
+        """
+        path = os.path.join(self.directory.name, 'recipes.csv')
+        with open(path, 'wb') as file:
+            file.write(
+                b'title,time_minutes,price\r\nSoup,10,1.00\r\n'
+                + b'x' * 10000 + b'\xff,10,1.00\r\n'
+            )
+
+        with self.assertRaisesMessage(CommandError, 'after record 1'):
+            call_command(
+                'import_recipes', path, user=self.user.email,
+                stdout=io.StringIO(), stderr=io.StringIO()
+            )
+
+        self.assertEqual(
+            list(Recipe.objects.values_list('title', flat=True)), ['Soup']
+        )
+        self.assertTrue(os.path.exists(f'{path}.checkpoint'))
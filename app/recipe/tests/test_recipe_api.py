@@ -1,19 +1,28 @@
-import tempfile, os
+import base64, csv, io, json, shutil, tempfile, os
+from unittest.mock import patch
 
 from PIL import Image
 from django import urls
 
 from django.contrib.auth import get_user_model
 from django.urls import reverse
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
 
 from core.models import Recipe, Tag, Ingredient
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
+from recipe import uploads
+from recipe.tests.utils import QueryCountMixin
 
 RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+BULK_URL = reverse('recipe:recipe-bulk')
+EXPORT_URL = reverse('recipe:recipe-export')
 
 def image_upload_url(recipe_id):
     """
@@ -67,7 +76,7 @@ class PublicRecipeAPITest(TestCase):
         res = self.client.get(RECIPES_URL)
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
-class PrivateRecipAPITest(TestCase):
+class PrivateRecipAPITest(QueryCountMixin, TestCase):
     """Test private apis for recipe api"""
 
     def setUp(self):
@@ -192,6 +201,80 @@ class PrivateRecipAPITest(TestCase):
         self.assertIn(ingredient1, ingredients)
         self.assertIn(ingredient2, ingredients)
 
+    def test_create_recipe_validates_ingredients_in_one_query(self):
+        """
+            test related ids are resolved with a single query per field
+        """
+        ingredients = [
+            sample_ingredient(self.user, name=f'ingredient {i}')
+            for i in range(30)
+        ]
+        payload = {
+            'title': 'Stew',
+            'ingredients': [ingredient.id for ingredient in ingredients],
+            'tags': [],
+            'time_minutes': 30,
+            'price': 4.00
+        }
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        lookups = [
+            q for q in ctx.captured_queries
+            if '"core_ingredient"."id" IN (' in q['sql']
+        ]
+        self.assertEqual(len(lookups), 1)
+
+    def test_create_recipe_with_foreign_tags(self):
+        """
+            test tags of other users are rejected, all reported together
+        """
+        user_2 = get_user_model().objects.create_user('o@weeb.com', 'pass12')
+        tag1 = sample_tag(user_2, name='theirs')
+        tag2 = sample_tag(user_2, name='also theirs')
+        payload = {
+            'title': 'Stolen',
+            'tags': [tag1.id, tag2.id, 999],
+            'ingredients': [],
+            'time_minutes': 30,
+            'price': 4.00
+        }
+
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(res.data['tags']), 3)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_create_recipe_with_non_integer_ids(self):
+        """
+            test ids that are not integers are rejected, not truncated
+        """
+        tag = sample_tag(user=self.user)
+        payload = {
+            'title': 'Rounded',
+            'ingredients': [],
+            'time_minutes': 30,
+            'price': 4.00
+        }
+
+        for value in (tag.id + 0.5, float(tag.id), f'{tag.id}.5', True):
+            res = self.client.post(
+                RECIPES_URL, {**payload, 'tags': [value]}, format='json'
+            )
+
+            self.assertEqual(
+                res.status_code, status.HTTP_400_BAD_REQUEST, value
+            )
+        self.assertFalse(Recipe.objects.exists())
+
+        res = self.client.post(
+            RECIPES_URL, {**payload, 'tags': [str(tag.id)]}, format='json'
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
     def test_parital_updtae_recipe(self):
         """
             patch updtae recipe
@@ -232,6 +315,531 @@ class PrivateRecipAPITest(TestCase):
         tags = recipe.tags.all()
         self.assertEqual(len(tags), 0)
 
+    def test_filter_tags_any_without_duplicates(self):
+        """
+            test a recipe matching several tags is returned once
+        """
+        tag1 = sample_tag(user=self.user, name='vegan')
+        tag2 = sample_tag(user=self.user, name='quick')
+        recipe = sample_recipe(user=self.user)
+        recipe.tags.add(tag1, tag2)
+        sample_recipe(user=self.user, title='untagged')
+
+        res = self.client.get(RECIPES_URL, {'tags': f'{tag1.id},{tag2.id}'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['id'] for item in res.data], [recipe.id])
+
+    def test_filter_tags_and_ingredients_all(self):
+        """
+            test mode all keeps recipes linked to every requested id
+        """
+        tag1 = sample_tag(user=self.user, name='vegan')
+        tag2 = sample_tag(user=self.user, name='quick')
+        ingredient = sample_ingredient(user=self.user)
+        both = sample_recipe(user=self.user, title='both')
+        both.tags.add(tag1, tag2)
+        both.ingredients.add(ingredient)
+        one = sample_recipe(user=self.user, title='one')
+        one.tags.add(tag1)
+        one.ingredients.add(ingredient)
+
+        res = self.client.get(RECIPES_URL, {
+            'tags': f'{tag1.id},{tag2.id}',
+            'tags_mode': 'all',
+            'ingredients': str(ingredient.id),
+            'ingredients_mode': 'all',
+        })
+
+        self.assertEqual([item['id'] for item in res.data], [both.id])
+
+    def test_filter_invalid_params(self):
+        """
+            test malformed ids and modes are rejected with bad request
+        """
+        for params in (
+            {'tags': 'one,2'},
+            {'ingredients': '-1'},
+            {'tags': '1', 'tags_mode': 'some'},
+        ):
+            res = self.client.get(RECIPES_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_create_recipes(self):
+        """
+            test creating many recipes with links in one request
+        """
+        tag = sample_tag(user=self.user)
+        ingredient = sample_ingredient(user=self.user)
+        payload = [
+            {
+                'title': f'bulk {i}',
+                'time_minutes': 10,
+                'price': '2.50',
+                'tags': [tag.id],
+                'ingredients': [ingredient.id],
+            }
+            for i in range(3)
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([item['title'] for item in res.data],
+                         ['bulk 0', 'bulk 1', 'bulk 2'])
+        recipes = Recipe.objects.filter(user=self.user, tags=tag)
+        self.assertEqual(recipes.count(), 3)
+        self.assertEqual(res.data[0], RecipeSerializer(
+            Recipe.objects.get(id=res.data[0]['id'])
+        ).data)
+
+    def test_bulk_create_reports_errors_per_item(self):
+        """
+            test nothing is written when an item is invalid or foreign
+        """
+        user_2 = get_user_model().objects.create_user('o@weeb.com', 'pass12')
+        foreign_tag = sample_tag(user=user_2)
+        payload = [
+            {'title': 'ok', 'time_minutes': 10, 'price': '1.00'},
+            {'title': 'foreign', 'time_minutes': 10, 'price': '1.00',
+             'tags': [foreign_tag.id]},
+            {'title': 'bad', 'price': '1.00'},
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('tags', res.data[1])
+        self.assertIn('time_minutes', res.data[2])
+        self.assertFalse(Recipe.objects.filter(user=self.user).exists())
+
+    def test_bulk_update_and_delete_recipes(self):
+        """
+            test patching and deleting many recipes in one request
+        """
+        recipe1 = sample_recipe(user=self.user)
+        recipe2 = sample_recipe(user=self.user)
+        recipe1.tags.add(sample_tag(user=self.user))
+        new_tag = sample_tag(user=self.user, name='new')
+
+        res = self.client.patch(BULK_URL, [
+            {'id': recipe1.id, 'tags': [new_tag.id]},
+            {'id': recipe2.id, 'title': 'renamed'},
+        ], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(recipe1.tags.all()), [new_tag])
+        recipe2.refresh_from_db()
+        self.assertEqual(recipe2.title, 'renamed')
+
+        res = self.client.delete(
+            BULK_URL, {'ids': [recipe1.id, recipe2.id]}, format='json'
+        )
+
+        self.assertEqual(res.data, {'deleted': 2})
+        self.assertFalse(Recipe.objects.filter(user=self.user).exists())
+
+    def test_bulk_update_other_users_recipe(self):
+        """
+            test bulk updates cannot touch recipes of another user
+        """
+        user_2 = get_user_model().objects.create_user('o@weeb.com', 'pass12')
+        recipe = sample_recipe(user=user_2)
+
+        res = self.client.patch(
+            BULK_URL, [{'id': recipe.id, 'title': 'mine'}], format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'sample recipe')
+
+    def test_bulk_update_requires_ids(self):
+        """
+            test every bulk update item needs an id, empty items included,
+            and nothing is written otherwise
+        """
+        recipe = sample_recipe(user=self.user)
+
+        res = self.client.patch(BULK_URL, [
+            {'id': recipe.id, 'title': 'renamed'}, {},
+        ], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('id', res.data[1])
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'sample recipe')
+
+    def test_bulk_delete_rejects_booleans(self):
+        """
+            test JSON booleans are not accepted as recipe ids
+        """
+        recipe = sample_recipe(user=self.user)
+
+        res = self.client.delete(
+            BULK_URL, {'ids': [True, recipe.id]}, format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(Recipe.objects.filter(id=recipe.id).exists())
+
+    def test_search_recipes(self):
+        """
+            test search matches titles, tag and ingredient names
+        """
+        curry = sample_recipe(user=self.user, title='Thai green curry')
+        tagged = sample_recipe(user=self.user, title='Weeknight bowl')
+        tagged.tags.add(sample_tag(user=self.user, name='Curry night'))
+        spiced = sample_recipe(user=self.user, title='Rice')
+        spiced.ingredients.add(
+            sample_ingredient(user=self.user, name='curry powder')
+        )
+        sample_recipe(user=self.user, title='Pancakes')
+
+        res = self.client.get(RECIPES_URL, {'search': 'curry'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            {item['id'] for item in res.data},
+            {curry.id, tagged.id, spiced.id}
+        )
+
+    def test_search_recipes_paginated(self):
+        """
+            test search results can be walked with cursors
+        """
+        for i in range(3):
+            sample_recipe(user=self.user, title=f'soup {i}')
+        sample_recipe(user=self.user, title='salad')
+
+        res = self.client.get(RECIPES_URL, {'search': 'soup', 'page_size': 2})
+        seen = [item['title'] for item in res.data['results']]
+        res = self.client.get(res.data['next'])
+        seen += [item['title'] for item in res.data['results']]
+
+        self.assertEqual(sorted(seen), ['soup 0', 'soup 1', 'soup 2'])
+        self.assertIsNone(res.data['next'])
+
+    @override_settings(RECIPE_RESPONSE_CACHE={'ENABLED': True})
+    def test_recipe_list_cache_invalidated_by_links(self):
+        """
+            test linking a tag to a recipe refreshes the cached list
+        """
+        recipe = sample_recipe(user=self.user)
+        self.client.get(RECIPES_URL)
+        tag = sample_tag(user=self.user)
+        recipe.tags.add(tag)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.data[0]['tags'], [tag.id])
+
+    @override_settings(RECIPE_RESPONSE_CACHE={'ENABLED': True})
+    def test_recipe_list_cache_key_normalized(self):
+        """
+            test reordered filter ids share one cache entry
+        """
+        tag1 = sample_tag(user=self.user)
+        tag2 = sample_tag(user=self.user, name='vegan')
+        self.client.get(RECIPES_URL, {'tags': f'{tag1.id},{tag2.id}'})
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(RECIPES_URL, {'tags': f'{tag2.id},{tag1.id}'})
+
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    def test_export_ndjson_matches_detail(self):
+        """
+            test the NDJSON export streams detail representations
+        """
+        recipes = [sample_recipe(user=self.user) for _ in range(3)]
+        recipes[0].tags.add(sample_tag(user=self.user))
+        recipes[1].ingredients.add(sample_ingredient(user=self.user))
+        sample_recipe(user=get_user_model().objects.create_user(
+            'export@weeb.com', 'root45'
+        ))
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(res.streaming_content).decode().splitlines()
+        request = res.wsgi_request
+        expected = RecipeDetailSerializer(
+            recipes, many=True, context={'request': request}
+        ).data
+        self.assertEqual(
+            [json.loads(line) for line in lines],
+            json.loads(JSONRenderer().render(expected))
+        )
+
+    def test_export_csv(self):
+        """
+            test the CSV export joins tag and ingredient names
+        """
+        recipe = sample_recipe(user=self.user, title='Soup')
+        recipe.tags.add(sample_tag(user=self.user, name='vegan'))
+        recipe.tags.add(sample_tag(user=self.user, name='dinner'))
+
+        res = self.client.get(EXPORT_URL, {'export_format': 'csv'})
+
+        rows = list(csv.reader(io.StringIO(
+            b''.join(res.streaming_content).decode()
+        )))
+        self.assertEqual(rows[0][:4], ['id', 'title', 'ingredients', 'tags'])
+        self.assertEqual(
+            rows[1][:4], [str(recipe.id), 'Soup', '', 'dinner|vegan']
+        )
+
+    def test_export_queries_per_chunk(self):
+        """
+            test the export runs a fixed number of queries per chunk
+        """
+        for _ in range(5):
+            recipe = sample_recipe(user=self.user)
+            recipe.tags.add(sample_tag(user=self.user))
+
+        with override_settings(RECIPE_EXPORT_CHUNK_SIZE=2), \
+                CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(EXPORT_URL)
+            lines = b''.join(res.streaming_content).splitlines()
+
+        self.assertEqual(len(lines), 5)
+        recipe_queries = [
+            q for q in ctx.captured_queries if 'core_recipe' in q['sql']
+        ]
+        # one cursor plus tags and ingredients for each of 3 chunks
+        self.assertEqual(len(recipe_queries), 1 + 3 * 2)
+
+    def test_export_keyset_without_server_side_cursors(self):
+        """
+            test the export pages on id when server side cursors are off
+        """
+        recipes = [sample_recipe(user=self.user) for _ in range(5)]
+
+        with override_settings(RECIPE_EXPORT_CHUNK_SIZE=2), \
+                patch.dict(connection.settings_dict,
+                           DISABLE_SERVER_SIDE_CURSORS=True), \
+                CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(EXPORT_URL)
+            lines = b''.join(res.streaming_content).splitlines()
+
+        self.assertEqual(
+            [json.loads(line)['id'] for line in lines],
+            [recipe.id for recipe in recipes]
+        )
+        pages = [
+            q for q in ctx.captured_queries
+            if q['sql'].startswith('SELECT "core_recipe"."id"')
+        ]
+        self.assertEqual(len(pages), 3)
+        self.assertIn('LIMIT 2', pages[-1]['sql'])
+
+    def test_export_invalid_format(self):
+        res = self.client.get(EXPORT_URL, {'export_format': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(RECIPE_RESPONSE_CACHE={'ENABLED': True})
+    def test_recipe_list_not_modified(self):
+        """
+            test a matching If-None-Match gets 304 without touching recipes
+        """
+        sample_recipe(user=self.user)
+        etag = self.client.get(RECIPES_URL)['ETag']
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    @override_settings(RECIPE_RESPONSE_CACHE={'ENABLED': True})
+    def test_recipe_etag_changes_on_write(self):
+        """
+            test a write makes the previous etag stale
+        """
+        recipe = sample_recipe(user=self.user)
+        url = detail_url(recipe.id)
+        etag = self.client.get(url)['ETag']
+
+        self.client.patch(url, {'title': 'Renamed'})
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+        self.assertEqual(res.data['title'], 'Renamed')
+
+    @override_settings(RECIPE_RESPONSE_CACHE={'ENABLED': True})
+    def test_recipe_etag_differs_per_recipe_and_params(self):
+        """
+            test etags are not shared between details or filters
+        """
+        recipe1 = sample_recipe(user=self.user)
+        recipe2 = sample_recipe(user=self.user)
+
+        etags = {
+            self.client.get(detail_url(recipe1.id))['ETag'],
+            self.client.get(detail_url(recipe2.id))['ETag'],
+            self.client.get(RECIPES_URL)['ETag'],
+            self.client.get(RECIPES_URL, {'search': 'x'})['ETag'],
+        }
+
+        self.assertEqual(len(etags), 4)
+
+    @override_settings(RECIPE_RESPONSE_CACHE={'ENABLED': True})
+    def test_recipe_if_none_match_any(self):
+        """
+            test If-None-Match: * answers 304 only for a recipe the user
+            can read, others still get 404
+        """
+        recipe = sample_recipe(user=self.user)
+        other = get_user_model().objects.create_user(
+            'other_etag@weeb.com', 'adafhhauhffs'
+        )
+        foreign = sample_recipe(user=other)
+
+        res = self.client.get(detail_url(recipe.id), HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        for recipe_id in (foreign.id, foreign.id + 1000):
+            res = self.client.get(
+                detail_url(recipe_id), HTTP_IF_NONE_MATCH='*'
+            )
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_paginate_recipes_with_cursor(self):
+        """
+            test walking recipe pages forward and back with cursors
+        """
+        recipes = [
+            sample_recipe(user=self.user, title=f'recipe {i}')
+            for i in range(5)
+        ]
+        expected = [recipe.id for recipe in reversed(recipes)]
+
+        res = self.client.get(RECIPES_URL, {'page_size': 2})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsNone(res.data['previous'])
+
+        seen = [item['id'] for item in res.data['results']]
+        next_url = res.data['next']
+        while next_url:
+            res = self.client.get(next_url)
+            seen += [item['id'] for item in res.data['results']]
+            next_url = res.data['next']
+        self.assertEqual(seen, expected)
+
+        res = self.client.get(res.data['previous'])
+        self.assertEqual(
+            [item['id'] for item in res.data['results']],
+            expected[2:4]
+        )
+
+    def test_invalid_page_size_uses_default(self):
+        """
+            test a page size that is not a positive integer is ignored
+        """
+        for i in range(3):
+            sample_recipe(user=self.user, title=f'recipe {i}')
+
+        for page_size in ('0', '-1', '1.5', ' 2', 'two'):
+            res = self.client.get(RECIPES_URL, {'page_size': page_size})
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(res.data['results']), 3, page_size)
+
+    def test_list_fast_path_matches_serializer(self):
+        """
+            test the list fast path renders the same bytes as the serializer
+        """
+        tag1 = sample_tag(user=self.user)
+        tag2 = sample_tag(user=self.user, name='vegan')
+        recipe = sample_recipe(
+            user=self.user, price=5.5, link='https://example.com/x'
+        )
+        recipe.tags.add(tag2, tag1)
+        recipe.ingredients.add(sample_ingredient(user=self.user))
+        sample_recipe(user=self.user, title='no links')
+
+        res = self.client.get(RECIPES_URL, {'format': 'json'})
+        recipes = Recipe.objects.filter(user=self.user).order_by('-id')
+        expected = JSONRenderer().render(
+            RecipeSerializer(recipes, many=True).data
+        )
+
+        self.assertEqual(res.content, expected)
+
+    def test_list_recipes_query_count_constant(self):
+        """
+            test listing recipes does not query tags and ingredients per row
+        """
+        def add_recipes(count):
+            for _ in range(count):
+                recipe = sample_recipe(user=self.user)
+                recipe.tags.add(
+                    sample_tag(user=self.user, name=f'tag {recipe.id}')
+                )
+                recipe.ingredients.add(sample_ingredient(
+                    user=self.user, name=f'ingredient {recipe.id}'
+                ))
+
+        # a page holding 1 and then 10 recipes, before the unpaginated
+        # list grows on top of those
+        self.assertConstantQueries(
+            RECIPES_URL, add_recipes, sizes=(1, 10), page_size=10
+        )
+        self.assertConstantQueries(RECIPES_URL, add_recipes, sizes=(1, 5, 20))
+
+    def test_retrieve_recipe_query_count(self):
+        """
+            test recipe detail prefetches nested tags and ingredients
+        """
+        recipe = sample_recipe(user=self.user)
+        recipe.tags.add(sample_tag(user=self.user))
+
+        def add_links(count):
+            for i in range(count):
+                recipe.tags.add(sample_tag(user=self.user, name=f'tag {i}'))
+                recipe.ingredients.add(
+                    sample_ingredient(user=self.user, name=f'ingredient {i}')
+                )
+
+        self.assertConstantQueries(detail_url(recipe.id), add_links)
+
+    def test_invalid_cursor(self):
+        """
+            test a tampered cursor returns not found
+        """
+        res = self.client.get(RECIPES_URL, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_forged_cursor_values(self):
+        """
+            test well formed cursors with values of the wrong type return
+            not found instead of failing in the query
+        """
+        sample_recipe(user=self.user)
+        forged = [
+            (RECIPES_URL, {}, [['abc'], [None], [True], [1.5]]),
+            (TAGS_URL, {}, [[1, 2], ['a', 'b'], ['a', None]]),
+            (RECIPES_URL, {'search': 'soup'}, [['x', 1], [0.5, 'x']]),
+        ]
+        for url, params, positions in forged:
+            for position in positions:
+                cursor = base64.urlsafe_b64encode(
+                    json.dumps({'r': 0, 'p': position}).encode()
+                ).decode()
+
+                res = self.client.get(url, {**params, 'cursor': cursor})
+
+                self.assertEqual(
+                    res.status_code, status.HTTP_404_NOT_FOUND, position
+                )
+
 
 class RecipeImageUplaodTests(TestCase):
     
@@ -244,9 +852,14 @@ class RecipeImageUplaodTests(TestCase):
         self.client.force_authenticate(user=self.user)
 
         self.recipe = sample_recipe(user = self.user)
+        # blobs outlive delete(), keep them out of the real MEDIA_ROOT
+        self.media_root = tempfile.mkdtemp()
+        self.media = override_settings(MEDIA_ROOT=self.media_root)
+        self.media.enable()
 
     def tearDown(self):
-        self.recipe.image.delete()
+        self.media.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
 
     def test_uplaod_image_to_recipe(self):
         """
@@ -263,6 +876,62 @@ class RecipeImageUplaodTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertTrue(os.path.exists(self.recipe.image.path))
 
+    def test_upload_image_streamed_to_disk(self):
+        """
+            test small uploads are streamed to a temporary file too
+        """
+        url = image_upload_url(self.recipe.id)
+        seen = {}
+        inspect = uploads.inspect_image
+
+        def spy(uploaded):
+            seen['path'] = uploaded.temporary_file_path()
+            return inspect(uploaded)
+
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            Image.new('RGB', (10, 10)).save(ntf, format='JPEG')
+            ntf.seek(0)
+            with patch('recipe.uploads.inspect_image', side_effect=spy):
+                res = self.client.post(url, {'image': ntf}, format='multipart')
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('path', seen)
+
+    @override_settings(RECIPE_IMAGE_MAX_PIXELS=50 * 50)
+    def test_upload_image_too_many_pixels(self):
+        """
+            test images over the pixel limit are rejected from the header
+        """
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.png') as ntf:
+            Image.new('RGB', (100, 100)).save(ntf, format='PNG')
+            ntf.seek(0)
+            res = self.client.post(url, {'image': ntf}, format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+
+    @override_settings(RECIPE_IMAGE_MAX_UPLOAD_SIZE=128 * 1024)
+    def test_upload_image_too_large(self):
+        """
+            test uploads over the size limit are cut off while streaming
+            or refused from the content length
+        """
+        url = image_upload_url(self.recipe.id)
+        for size in (160 * 1024, 512 * 1024):
+            with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+                ntf.write(os.urandom(size))
+                ntf.seek(0)
+                res = self.client.post(
+                    url, {'image': ntf}, format='multipart'
+                )
+
+            self.assertEqual(
+                res.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+
     def test_upload_image_bad_request(self):
         """
             test uploading a bad image
@@ -0,0 +1,220 @@
+import base64
+import json
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient, Tombstone
+from recipe import sync
+
+SYNC_URL = reverse('recipe:sync')
+BULK_URL = reverse('recipe:recipe-bulk')
+
+
+def sample_recipe(user, **params):
+    """
+        create and return a sample recipe
+    """
+    defaults = {
+        'title': 'sample recipe',
+        'time_minutes': 10,
+        'price': 30.00
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class PublicSyncApiTest(TestCase):
+    """Test unauthenticated sync access"""
+
+    def test_auth_required(self):
+        res = APIClient().get(SYNC_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(RECIPE_SYNC={'SAFETY_WINDOW': 0})
+class PrivateSyncApiTest(TestCase):
+    """Test the delta sync endpoint"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'sync@weeb.com',
+            'root45'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def sync(self, cursor=None, **params):
+        if cursor:
+            params['since'] = cursor
+        res = self.client.get(SYNC_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def test_initial_sync_returns_everything(self):
+        """
+            test a sync without cursor returns all rows of the user
+        """
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        recipe = sample_recipe(self.user)
+        recipe.tags.add(tag)
+        other = get_user_model().objects.create_user('other@weeb.com', 'x1')
+        Tag.objects.create(user=other, name='Hidden')
+
+        data = self.sync()
+
+        self.assertEqual(data['tags'], [{'id': tag.id, 'name': 'Vegan'}])
+        self.assertEqual(
+            data['ingredients'], [{'id': ingredient.id, 'name': 'Salt'}]
+        )
+        self.assertEqual(len(data['recipes']), 1)
+        self.assertEqual(data['recipes'][0]['tags'], [tag.id])
+        self.assertFalse(data['has_more'])
+
+    def test_sync_returns_only_changes(self):
+        """
+            test a cursor only yields rows changed after it
+        """
+        sample_recipe(self.user, title='Old')
+        changed = sample_recipe(self.user, title='Soup')
+        cursor = self.sync()['cursor']
+
+        self.assertEqual(self.sync(cursor)['recipes'], [])
+
+        changed.title = 'Stew'
+        changed.save()
+        data = self.sync(cursor)
+
+        self.assertEqual([r['title'] for r in data['recipes']], ['Stew'])
+        self.assertEqual(data['tags'], [])
+
+    def test_sync_reports_deletions(self):
+        """
+            test deleted rows come back as ids, linked recipes as changes
+        """
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe = sample_recipe(self.user)
+        recipe.tags.add(tag)
+        gone = sample_recipe(self.user)
+        cursor = self.sync()['cursor']
+
+        tag_id = tag.id
+        tag.delete()
+        self.client.delete(reverse('recipe:recipe-detail', args=[gone.id]))
+        data = self.sync(cursor)
+
+        self.assertEqual(data['deleted']['tags'], [tag_id])
+        self.assertEqual(data['deleted']['recipes'], [gone.id])
+        self.assertEqual([r['id'] for r in data['recipes']], [recipe.id])
+        self.assertEqual(data['recipes'][0]['tags'], [])
+
+    def test_sync_link_change_touches_recipe(self):
+        """
+            test linking a tag marks the recipe changed
+        """
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe = sample_recipe(self.user)
+        cursor = self.sync()['cursor']
+
+        tag.recipe_set.add(recipe)
+        data = self.sync(cursor)
+
+        self.assertEqual([r['id'] for r in data['recipes']], [recipe.id])
+
+    def test_sync_bulk_update_touches_recipes(self):
+        """
+            test bulk updates are visible to delta sync
+        """
+        recipe = sample_recipe(self.user)
+        cursor = self.sync()['cursor']
+
+        self.client.patch(
+            BULK_URL, [{'id': recipe.id, 'time_minutes': 5}], format='json'
+        )
+        data = self.sync(cursor)
+
+        self.assertEqual([r['time_minutes'] for r in data['recipes']], [5])
+
+    def test_sync_pages(self):
+        """
+            test following the cursor walks bounded pages in order
+        """
+        ids = [sample_recipe(self.user).id for _ in range(5)]
+
+        seen = []
+        data = self.sync(limit=2)
+        seen += [r['id'] for r in data['recipes']]
+        self.assertEqual(len(data['recipes']), 2)
+        while data['has_more']:
+            data = self.sync(data['cursor'], limit=2)
+            seen += [r['id'] for r in data['recipes']]
+
+        self.assertEqual(seen, ids)
+
+    def test_invalid_cursor(self):
+        res = self.client.get(SYNC_URL, {'since': 'garbage'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_forged_cursor(self):
+        """
+            test cursors with naive stamps or non integer ids are invalid
+        """
+        for position in (['2020-01-01T00:00:00', 0],
+                         ['2020-01-01T00:00:00+00:00', True],
+                         ['2020-01-01T00:00:00+00:00', '1']):
+            cursor = base64.urlsafe_b64encode(
+                json.dumps({'deleted': position}).encode()
+            ).decode()
+
+            res = self.client.get(SYNC_URL, {'since': cursor})
+
+            self.assertEqual(
+                res.status_code, status.HTTP_404_NOT_FOUND, position
+            )
+
+    def test_expired_cursor(self):
+        """
+            test a cursor older than the tombstone retention needs a resync
+        """
+        old = timezone.now() - timedelta(days=365)
+        cursor = sync.encode_cursor({'deleted': (old, 0)})
+
+        res = self.client.get(SYNC_URL, {'since': cursor})
+
+        self.assertEqual(res.status_code, status.HTTP_410_GONE)
+
+    def test_prune_tombstones(self):
+        """
+            test tombstones past retention are pruned
+        """
+        Tombstone.objects.create(
+            user=self.user, model=Tombstone.TAG, object_id=1,
+            deleted_at=timezone.now() - timedelta(days=365)
+        )
+        Tombstone.objects.create(
+            user=self.user, model=Tombstone.TAG, object_id=2
+        )
+
+        self.assertEqual(sync.prune_tombstones(), 1)
+        self.assertEqual(Tombstone.objects.get().object_id, 2)
+
+    def test_delete_user_with_recipes(self):
+        """
+            test cascading a user delete is not blocked by tombstones
+        """
+        recipe = sample_recipe(self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+
+        self.user.delete()
+
+        self.assertFalse(Recipe.objects.exists())
@@ -1,12 +1,17 @@
+from unittest.mock import patch
+
 from django.contrib.auth import get_user_model
 from django.urls import reverse
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
 from core.models import Tag
 
+from recipe import caching
 from recipe.serializers import TagSerializer
 
 TAGS_URL = reverse('recipe:tag-list')
@@ -92,4 +97,107 @@ class PrivateTagsAPITest(TestCase):
         payload = {'name':''}
         res = self.client.post(TAGS_URL,payload)
 
-        self.assertEqual(res.status_code,status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        self.assertEqual(res.status_code,status.HTTP_400_BAD_REQUEST)
+
+    def test_paginate_tags_with_same_name(self):
+        """
+            test cursor pagination breaks ties on name by id
+        """
+        tags = [
+            Tag.objects.create(user = self.user, name = 'Vegan')
+            for _ in range(3)
+        ]
+        Tag.objects.create(user = self.user, name = 'Dessert')
+
+        res = self.client.get(TAGS_URL, {'page_size': 2})
+        self.assertEqual(
+            [tag['id'] for tag in res.data['results']],
+            [tags[2].id, tags[1].id]
+        )
+
+        res = self.client.get(res.data['next'])
+        self.assertEqual(
+            [tag['name'] for tag in res.data['results']],
+            ['Vegan', 'Dessert']
+        )
+        self.assertIsNone(res.data['next'])
+
+    @override_settings(RECIPE_RESPONSE_CACHE={'ENABLED': True})
+    def test_tag_list_cached_until_change(self):
+        """
+            test repeated lists are served from cache and writes invalidate
+        """
+        Tag.objects.create(user = self.user, name = 'Vegan')
+        self.client.get(TAGS_URL)
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(TAGS_URL)
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual(len(res.data), 1)
+
+        self.client.post(TAGS_URL, {'name': 'Dessert'})
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(len(res.data), 2)
+
+    def test_tag_list_not_cached_in_process_cache(self):
+        """
+            test the cache stays off by default with a per process cache,
+            another worker would not see the invalidation
+        """
+        Tag.objects.create(user = self.user, name = 'Vegan')
+        self.client.get(TAGS_URL)
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(TAGS_URL)
+
+        self.assertGreater(len(ctx.captured_queries), 0)
+        self.assertEqual(len(res.data), 1)
+        self.assertNotIn('ETag', res)
+
+    @override_settings(RECIPE_RESPONSE_CACHE={'ENABLED': True})
+    def test_process_cache_with_workers_warns(self):
+        """
+            test forcing the cache on with a per process cache and several
+            workers fails the system check with a warning
+        """
+        with patch.object(caching.serving, 'get_config',
+                          return_value={'WORKERS': 3}):
+            warnings = caching.check_shared_cache(None)
+
+        self.assertEqual([w.id for w in warnings], ['recipe.W001'])
+
+        with patch.object(caching.serving, 'get_config',
+                          return_value={'WORKERS': 1}):
+            self.assertEqual(caching.check_shared_cache(None), [])
+
+    @override_settings(RECIPE_RESPONSE_CACHE={'ENABLED': True})
+    def test_tag_list_cache_per_user(self):
+        """
+            test cached lists are never shared between users
+        """
+        Tag.objects.create(user = self.user, name = 'Vegan')
+        self.client.get(TAGS_URL)
+        user_2 = get_user_model().objects.create_user(
+            'cache_2@weeb.com',
+            'root45'
+        )
+        self.client.force_authenticate(user_2)
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.data, [])
+
+    @override_settings(RECIPE_RESPONSE_CACHE={'ENABLED': True})
+    def test_tag_list_not_modified(self):
+        """
+            test tag lists answer If-None-Match until a tag changes
+        """
+        Tag.objects.create(user = self.user, name = 'Vegan')
+        etag = self.client.get(TAGS_URL)['ETag']
+
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Tag.objects.create(user = self.user, name = 'Dessert')
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -0,0 +1,31 @@
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryCountMixin:
+    """assertions that keep endpoints free of N+1 queries"""
+
+    def assertConstantQueries(self, url, add_rows, sizes=(1, 10), **params):
+        """
+            assert GET `url` runs the same number of queries no matter
+            how many rows `add_rows(n)` has created before the request,
+            the response cache is off so every request reaches the database
+        """
+        counts = []
+        created = 0
+        for size in sizes:
+            add_rows(size - created)
+            created = size
+            with override_settings(RECIPE_RESPONSE_CACHE={'ENABLED': False}):
+                with CaptureQueriesContext(connection) as ctx:
+                    res = self.client.get(url, params)
+            self.assertEqual(res.status_code, 200)
+            counts.append(len(ctx.captured_queries))
+
+        self.assertEqual(
+            len(set(counts)), 1,
+            f'query count grows with rows {dict(zip(sizes, counts))}: '
+            + '\n'.join(q['sql'] for q in ctx.captured_queries)
+        )
+        return counts[0]
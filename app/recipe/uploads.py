@@ -0,0 +1,108 @@
+import warnings
+
+from django.conf import settings
+from django.core.files.uploadhandler import (
+    StopUpload,
+    TemporaryFileUploadHandler,
+)
+from PIL import Image
+
+DEFAULT_MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+DEFAULT_MAX_PIXELS = 24000000
+
+
+def max_upload_size():
+    return getattr(
+        settings, 'RECIPE_IMAGE_MAX_UPLOAD_SIZE', DEFAULT_MAX_UPLOAD_SIZE
+    )
+
+
+def max_pixels():
+    return getattr(settings, 'RECIPE_IMAGE_MAX_PIXELS', DEFAULT_MAX_PIXELS)
+
+
+class ImageRejected(Exception):
+    """raised when an upload is refused before it is decoded"""
+
+    def __init__(self, message, too_large=False):
+        super().__init__(message)
+        self.too_large = too_large
+
+
+class LimitedTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    """
+        stream every uploaded file to a temporary file chunk by chunk and
+        stop reading once more than `max_size` bytes arrived
+    """
+
+    def __init__(self, request=None, max_size=None, label='Image'):
+        super().__init__(request)
+        self.max_size = max_size or max_upload_size()
+        self.label = label
+        self.received = 0
+        self.exceeded = False
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_size:
+            self.exceeded = True
+            raise StopUpload(connection_reset=False)
+        return super().receive_data_chunk(raw_data, start)
+
+    def check(self):
+        """
+            raise ImageRejected if the upload was cut off at the limit
+        """
+        if self.exceeded:
+            raise ImageRejected(
+                _size_message(self.max_size, self.label), too_large=True
+            )
+
+
+def stream_uploads(request, max_size=None, label='Image'):
+    """
+        make `request` stream its files to disk with the size limit,
+        must run before request.data is first accessed
+    """
+    max_size = max_size or max_upload_size()
+    content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+    if content_length > max_size + 64 * 1024:
+        raise ImageRejected(_size_message(max_size, label), too_large=True)
+
+    handler = LimitedTemporaryFileUploadHandler(
+        request._request, max_size, label
+    )
+    request._request.upload_handlers = [handler]
+    return handler
+
+
+def inspect_image(uploaded):
+    """
+        check dimensions of an uploaded image reading only its header,
+        pixels are never decoded here
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', Image.DecompressionBombWarning)
+        try:
+            with Image.open(uploaded) as image:
+                width, height = image.size
+        except (Image.DecompressionBombWarning, Image.DecompressionBombError):
+            raise ImageRejected(_pixels_message())
+        except (OSError, SyntaxError, ValueError):
+            # not an image, the serializer reports it
+            return None
+        finally:
+            uploaded.seek(0)
+
+    if width * height > max_pixels():
+        raise ImageRejected(_pixels_message())
+    return width, height
+
+
+def _size_message(max_size=None, label='Image'):
+    max_size = max_size or max_upload_size()
+    return f'{label} exceeds the maximum size of {max_size} bytes.'
+
+
+def _pixels_message():
+    return f'Image exceeds the maximum of {max_pixels()} pixels.'
@@ -1,6 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
+from core import async_views
 from recipe import views
 
 router = DefaultRouter()
@@ -8,8 +9,17 @@ router.register('tags', views.TagViewSet)
 router.register('ingredients',views.IngredientViewSet)
 router.register('recipes',views.RecipeViewSet)
 
+# read endpoints served by core.async_views under ASGI
+ASYNC_READ_VIEWS = ('tag-list', 'ingredient-list', 'recipe-list',
+                    'recipe-detail')
+
+router_urls = router.urls
+if async_views.get_config()['ENABLED']:
+    router_urls = async_views.async_patterns(router_urls, ASYNC_READ_VIEWS)
+
 app_name = 'recipe'
 
 urlpatterns = [
-    path('', include(router.urls))
+    path('sync/', views.SyncView.as_view(), name='sync'),
+    path('', include(router_urls))
 ]
\ No newline at end of file
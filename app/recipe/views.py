@@ -1,17 +1,30 @@
 from os import stat
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.db.models import Prefetch
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
 
 from core.models import Tag, Ingredient, Recipe
-from recipe import serializers
+from recipe import (
+    serializers, pagination, filters, bulk, images, uploads, search, caching,
+    sync, export, importer,
+)
+from user.authentication import CachedTokenAuthentication
 
 class BaseRecipeAttrViewSet(viewsets.GenericViewSet, mixins.ListModelMixin, mixins.CreateModelMixin):
     """Manage classes in the db"""
-    authentication_classes = (TokenAuthentication, )
+    authentication_classes = (CachedTokenAuthentication, )
     permission_classes = (IsAuthenticated, )
+    pagination_class = pagination.NameKeysetPagination
+
+    list = caching.conditional(
+        caching.cached_list(mixins.ListModelMixin.list)
+    )
 
     def get_queryset(self):
         """
@@ -41,30 +54,71 @@ class RecipeViewSet(viewsets.ModelViewSet):
     """manage RECIPE apis"""
     serializer_class = serializers.RecipeSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = (TokenAuthentication, )
+    authentication_classes = (CachedTokenAuthentication, )
     permission_classes = (IsAuthenticated, )
-
-    def _params_to_ints(self, qs):
-        """
-            convert list of string ids into a list of integers
-        """
-        return [int(str_id) for str_id in qs.split(',')]
+    pagination_class = pagination.RecipeKeysetPagination
+    filter_backends = (
+        filters.RecipeRelationFilter,
+        filters.RecipeSearchFilter,
+    )
+    fast_list = True
 
     def get_queryset(self):
         """
             retrive recipes for authenticated user
         """
-        tags = self.request.query_params.get('tags')
-        ingredients = self.request.query_params.get('ingredients')
-        queryset = self.queryset
-        if tags:
-            tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
-        if ingredients:
-            ingredient_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
+        queryset = self._prefetch_for_action(self.queryset)
         return queryset.filter(user=self.request.user).order_by('-id')
 
+    def _prefetch_for_action(self, queryset):
+        """
+            prefetch tags and ingredients in the shape the serializer needs
+        """
+        if self.action == 'retrieve':
+            return queryset.prefetch_related('tags', 'ingredients')
+        if self.action in ('list', 'update', 'partial_update'):
+            return queryset.prefetch_related(
+                Prefetch('tags', queryset=Tag.objects.only('id')),
+                Prefetch(
+                    'ingredients', queryset=Ingredient.objects.only('id')
+                ),
+            )
+        return queryset
+
+    @caching.conditional
+    @caching.cached_list
+    def list(self, request, *args, **kwargs):
+        """
+            list recipes through the read only fast path
+        """
+        if not self.fast_list:
+            return super().list(request, *args, **kwargs)
+
+        reader = serializers.RecipeListReader()
+        rows = reader.values(
+            self.filter_queryset(self.get_queryset()),
+            extra=('search_rank',) if self._is_search() else ()
+        )
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(reader.render(page, request))
+        return Response(reader.render(rows, request))
+
+    @caching.conditional
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    def _is_search(self):
+        return bool(filters.RecipeSearchFilter().get_terms(self.request))
+
+    def get_keyset_ordering(self):
+        """
+            page search results by relevance, id breaks ties
+        """
+        if self._is_search():
+            return ('-search_rank', '-id')
+        return None
+
     def get_serializer_class(self):
         """
             return appropriate serializer class
@@ -86,7 +140,20 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """
             upload an image to a recipe
         """
-        recipe = self.get_object()
+        try:
+            handler = uploads.stream_uploads(request)
+            recipe = self.get_object()
+            image = request.data.get('image')
+            handler.check()
+            if hasattr(image, 'temporary_file_path'):
+                uploads.inspect_image(image)
+        except uploads.ImageRejected as exc:
+            return Response(
+                {'image': [str(exc)]},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+                if exc.too_large else status.HTTP_400_BAD_REQUEST
+            )
+
         serializer = self.get_serializer(
             recipe,
             data=request.data
@@ -94,6 +161,11 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         if serializer.is_valid():
             serializer.save()
+            name = recipe.image.name
+            if name:
+                transaction.on_commit(
+                    lambda: images.schedule_derivatives(name)
+                )
             return Response(
                 serializer.data,
                 status=status.HTTP_200_OK
@@ -104,3 +176,154 @@ class RecipeViewSet(viewsets.ModelViewSet):
             status = status.HTTP_400_BAD_REQUEST
         )
 
+    @action(methods=['POST', 'PATCH', 'DELETE'], detail=False, url_path='bulk')
+    def bulk(self, request):
+        """
+            create (POST), partially update (PATCH) or delete (DELETE, with
+            {"ids": [...]}) many recipes in one transaction
+        """
+        if request.method == 'DELETE':
+            ids = request.data.get('ids') if isinstance(
+                request.data, dict
+            ) else None
+            # JSON true and false are ints to Python
+            if not isinstance(ids, list) or not all(
+                isinstance(pk, int) and not isinstance(pk, bool)
+                for pk in ids
+            ):
+                return Response(
+                    {'ids': ['Expected a list of recipe ids.']},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            with transaction.atomic():
+                deleted = bulk.delete_recipes(request.user, ids)
+            return Response({'deleted': deleted}, status=status.HTTP_200_OK)
+
+        partial = request.method == 'PATCH'
+        with transaction.atomic():
+            items = bulk.validate_items(request.user, request.data, partial)
+            if partial:
+                ids = bulk.update_recipes(request.user, items)
+            else:
+                ids = bulk.create_recipes(request.user, items)
+            search.refresh_search_vectors(ids)
+            caching.bump_generation(request.user.pk)
+
+        return Response(
+            bulk.render(ids, request),
+            status=status.HTTP_200_OK if partial else status.HTTP_201_CREATED
+        )
+
+    @action(
+        methods=['POST'], detail=False, url_path='import', url_name='import'
+    )
+    def import_recipes(self, request):
+        """
+            import recipes from an uploaded NDJSON or CSV `file`
+
+            at most MAX_REQUEST_ROWS records are read per request, while
+            `complete` is false upload the file again with `?offset=` set
+            to the returned offset to continue. a file that cannot be read
+            past some record answers 400 with `file_error` set, records
+            before it are kept
+        """
+        config = importer.get_config()
+        try:
+            handler = uploads.stream_uploads(
+                request, config['MAX_UPLOAD_SIZE'], label='File'
+            )
+            upload = request.data.get('file')
+            handler.check()
+        except uploads.ImageRejected as exc:
+            return Response(
+                {'file': [str(exc)]},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+
+        errors = {}
+        if upload is None or not hasattr(upload, 'read'):
+            errors['file'] = ['No file was submitted.']
+        import_format = request.query_params.get('import_format') or (
+            importer.guess_format(getattr(upload, 'name', ''))
+        )
+        if import_format not in importer.FORMATS:
+            errors['import_format'] = [
+                f'Expected one of {", ".join(importer.FORMATS)}.'
+            ]
+        try:
+            offset = int(request.query_params.get('offset', 0))
+            if offset < 0:
+                raise ValueError()
+        except ValueError:
+            errors['offset'] = ['Expected a non negative integer.']
+        if errors:
+            raise ValidationError(errors)
+
+        result = importer.RecipeImporter(request.user).run(
+            importer.read_records(upload, import_format),
+            offset=offset,
+            limit=config['MAX_REQUEST_ROWS']
+        )
+        if result['file_error'] is not None:
+            return Response(result, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result, status=status.HTTP_200_OK)
+
+    @action(
+        methods=['GET'], detail=False, url_path='export', url_name='export'
+    )
+    def export_recipes(self, request):
+        """
+            stream the user's recipes as NDJSON (default) or CSV with
+            `?export_format=csv`, tag and ingredient filters apply
+        """
+        name = request.query_params.get('export_format', 'ndjson')
+        if name not in export.FORMATS:
+            raise ValidationError({'export_format': [
+                f'Expected one of {", ".join(export.FORMATS)}.'
+            ]})
+        generate, content_type, extension = export.FORMATS[name]
+
+        queryset = self.filter_queryset(self.get_queryset())
+        response = StreamingHttpResponse(
+            generate(queryset, request), content_type=content_type
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="recipes.{extension}"'
+        )
+        return response
+
+
+class SyncView(APIView):
+    """
+        delta sync of tags, ingredients and recipes
+
+        `GET /api/recipe/sync/?since=<cursor>&limit=<n>` returns the rows
+        created or changed and the ids deleted after the cursor, at most
+        `limit` per stream. keep following `cursor` while `has_more`, then
+        store it for the next sync. 410 means the cursor is older than
+        the tombstone retention and a full resync is required.
+    """
+    authentication_classes = (CachedTokenAuthentication, )
+    permission_classes = (IsAuthenticated, )
+
+    def get(self, request):
+        config = sync.get_config()
+        try:
+            limit = pagination.positive_int(
+                request.query_params['limit'],
+                cutoff=config['MAX_PAGE_SIZE']
+            )
+        except (KeyError, ValueError):
+            limit = config['PAGE_SIZE']
+
+        try:
+            positions = sync.decode_cursor(request.query_params.get('since'))
+            data = sync.changes(request.user, positions, limit, request)
+        except sync.InvalidCursor as exc:
+            raise NotFound(str(exc))
+        except sync.CursorExpired:
+            return Response(
+                {'detail': 'Cursor expired, a full resync is required.'},
+                status=status.HTTP_410_GONE
+            )
+        return Response(data)
@@ -0,0 +1,233 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import router
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+DEFAULTS = {
+    'TTL': 60,
+    'MAX_ENTRIES': 10000,
+    'CACHE_ALIAS': None,
+}
+
+
+def get_config():
+    """
+        return token cache settings merged over the defaults
+    """
+    return {**DEFAULTS, **getattr(settings, 'TOKEN_AUTH_CACHE', {})}
+
+
+class LRUCache:
+    """thread safe in process LRU with per entry expiry"""
+
+    def __init__(self):
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl, max_entries):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+token_cache = LRUCache()
+
+
+def _shared_key(key):
+    """
+        key for the django cache tier, never store raw tokens in it
+    """
+    return 'authtoken:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def _version_key(key):
+    return _shared_key(key) + ':version'
+
+
+def _version(cache, key):
+    """
+        return the version of a token's cache entries, kept in the shared
+        tier so a revocation reaches the LRU of every process
+    """
+    version_key = _version_key(key)
+    version = cache.get(version_key)
+    if version is None:
+        cache.add(version_key, time.time_ns(), timeout=None)
+        version = cache.get(version_key)
+    return version
+
+
+def _current(entry, version):
+    """
+        return the value of a (version, value) entry still valid
+    """
+    if entry is None or entry[0] != version:
+        return None
+    return entry[1]
+
+
+def _pack(token):
+    """
+        return what the shared tier keeps of a token: its creation time
+        and the columns of its user except the password hash
+    """
+    user = token.user
+    return {
+        'created': token.created,
+        'user': {
+            field.attname: getattr(user, field.attname)
+            for field in user._meta.concrete_fields
+            if field.attname != 'password'
+        },
+    }
+
+
+def _unpack(key, data):
+    """
+        rebuild a token and its user from a shared tier entry, the
+        password stays deferred and is only loaded if something reads it
+    """
+    user_model = get_user_model()
+    using = router.db_for_read(user_model)
+    columns = data['user']
+    names = [
+        field.attname for field in user_model._meta.concrete_fields
+        if field.attname in columns
+    ]
+    user = user_model.from_db(
+        using, names, [columns[name] for name in names]
+    )
+    token = Token.from_db(
+        using, ['key', 'user_id', 'created'],
+        [key, user.pk, data['created']]
+    )
+    token.user = user
+    return token
+
+
+def invalidate_token(key):
+    """
+        drop a token from both cache tiers, and with a shared tier move
+        its version on so other processes drop their LRU entry too
+    """
+    token_cache.delete(key)
+    alias = get_config()['CACHE_ALIAS']
+    if alias:
+        cache = caches[alias]
+        cache.delete(_shared_key(key))
+        cache.set(_version_key(key), time.time_ns(), timeout=None)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+        token authentication that caches the token and its user
+
+        lookups hit an in process LRU first, then the optional django
+        cache tier, then the database. entries expire after `TTL` seconds
+        and are evicted when the token is deleted or the user is saved.
+        with a shared `CACHE_ALIAS` every entry carries the token's
+        version from that cache, read on each request, so deleting a
+        token or deactivating a user takes effect at once in every
+        process. without it other processes notice within `TTL`. the
+        shared tier never holds the password hash, the user is rebuilt
+        from its other columns.
+    """
+
+    def authenticate_credentials(self, key):
+        config = get_config()
+        cache = None
+        version = None
+        if config['CACHE_ALIAS']:
+            cache = caches[config['CACHE_ALIAS']]
+            version = _version(cache, key)
+
+        token = _current(token_cache.get(key), version)
+
+        if token is None and cache is not None:
+            data = _current(cache.get(_shared_key(key)), version)
+            if data is not None:
+                token = _unpack(key, data)
+                token_cache.set(
+                    key, (version, token), config['TTL'],
+                    config['MAX_ENTRIES']
+                )
+
+        if token is None:
+            model = self.get_model()
+            try:
+                token = model.objects.select_related('user').get(key=key)
+            except model.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+            token_cache.set(
+                key, (version, token), config['TTL'], config['MAX_ENTRIES']
+            )
+            if cache is not None:
+                cache.set(
+                    _shared_key(key), (version, _pack(token)), config['TTL']
+                )
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+
+        # requests must not share (and mutate) the cached user instance
+        return (copy.copy(token.user), token)
+
+
+@receiver(post_delete, sender=Token)
+def evict_deleted_token(sender, instance, **kwargs):
+    """
+        forget a token as soon as it is deleted
+    """
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=get_user_model())
+def evict_user_tokens(sender, instance, created, update_fields=None,
+                      **kwargs):
+    """
+        forget cached tokens of a user whose row changed, e.g. deactivated
+    """
+    if created or (update_fields and set(update_fields) == {'last_login'}):
+        return
+    for key in Token.objects.filter(user=instance).values_list(
+        'key', flat=True
+    ):
+        invalidate_token(key)
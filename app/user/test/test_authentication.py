@@ -0,0 +1,145 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from user.authentication import _shared_key, token_cache
+
+ME_URL = reverse('user:me')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test the cached token authentication backend"""
+
+    def setUp(self):
+        token_cache.clear()
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='cache@weeb.com',
+            password='root45',
+            name='cached'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_token_lookup_cached(self):
+        """
+            test the token query runs only on the first request
+        """
+        self.client.get(ME_URL)
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertFalse(
+            [q for q in ctx.captured_queries if 'authtoken_token' in q['sql']]
+        )
+
+    def test_deleted_token_rejected(self):
+        """
+            test deleting a token evicts it from the cache
+        """
+        self.client.get(ME_URL)
+        self.token.delete()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """
+            test deactivating a user evicts their cached token
+        """
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_profile_update_visible(self):
+        """
+            test the cached user is refreshed after a profile update
+        """
+        self.client.get(ME_URL)
+        self.client.patch(ME_URL, {'name': 'renamed'})
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'renamed')
+
+    @override_settings(TOKEN_AUTH_CACHE={'CACHE_ALIAS': 'default'})
+    def test_shared_cache_tier(self):
+        """
+            test a token found in the django cache skips the database
+        """
+        self.client.get(ME_URL)
+        token_cache.clear()
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    @override_settings(TOKEN_AUTH_CACHE={'CACHE_ALIAS': 'default'})
+    def test_shared_cache_tier_omits_password(self):
+        """
+            test the shared tier does not store the password hash, and a
+            user rebuilt from it still saves without losing the password
+        """
+        self.client.get(ME_URL)
+        token_cache.clear()
+
+        entry = cache.get(_shared_key(self.token.key))
+        self.assertNotIn(self.user.password, repr(entry))
+        self.assertNotIn('password', entry[1]['user'])
+
+        res = self.client.patch(ME_URL, {'name': 'renamed'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.name, 'renamed')
+        self.assertTrue(self.user.check_password('root45'))
+
+    @override_settings(TOKEN_AUTH_CACHE={'CACHE_ALIAS': 'default'})
+    def test_revocation_reaches_other_processes(self):
+        """
+            test a token deleted in another process is rejected although
+            this process still holds it in its LRU
+        """
+        self.client.get(ME_URL)
+
+        # the other process only clears its own LRU
+        with patch.object(token_cache, 'delete'):
+            self.token.delete()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(TOKEN_AUTH_CACHE={'CACHE_ALIAS': 'default'})
+    def test_deactivation_reaches_other_processes(self):
+        """
+            test deactivating a user in another process is seen at once
+        """
+        self.client.get(ME_URL)
+
+        with patch.object(token_cache, 'delete'):
+            self.user.is_active = False
+            self.user.save()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
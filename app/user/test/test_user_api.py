@@ -1,6 +1,10 @@
 from logging import setLoggerClass
-from django.test import TestCase
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
 from django.urls import reverse
 
 from rest_framework.test import APIClient, force_authenticate
@@ -181,3 +185,111 @@ class PrivateUserApiTests(TestCase):
         self.assertTrue(self.user.check_password(payload['password']))
         self.assertEqual(res.status_code,status.HTTP_200_OK)
 
+
+@override_settings(REST_FRAMEWORK={'DEFAULT_THROTTLE_RATES': {
+    'login_ip': '3/min', 'login_email': '2/min',
+}})
+class LoginProtectionTests(TestCase):
+    """
+        Test password upgrades and rate limits of token and signup
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.payload = {'email': 'limit@weeb.com', 'password': 'adafhhauhffs'}
+
+    def test_rehash_on_login(self):
+        """
+            Test a PBKDF2 password is upgraded to argon2 on login
+        """
+        user = create_user(**self.payload)
+        user.password = make_password(
+            self.payload['password'], hasher='pbkdf2_sha256'
+        )
+        user.save()
+
+        res = self.client.post(TOKEN_URL, self.payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('argon2$'))
+        self.assertTrue(user.check_password(self.payload['password']))
+
+    def test_token_throttled_per_email(self):
+        """
+            Test attempts on one account are limited across addresses
+        """
+        create_user(**self.payload)
+        for address in ('203.0.113.1', '203.0.113.2'):
+            res = self.client.post(TOKEN_URL, self.payload,
+                                   REMOTE_ADDR=address)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with patch('user.serializers.authenticate') as authenticate:
+            res = self.client.post(TOKEN_URL, self.payload,
+                                   REMOTE_ADDR='203.0.113.3')
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', res)
+        authenticate.assert_not_called()
+
+    def test_token_throttled_per_ip(self):
+        """
+            Test attempts from one address are limited across accounts
+        """
+        for index in range(3):
+            res = self.client.post(TOKEN_URL, {
+                'email': f'user{index}@weeb.com', 'password': 'wrong'
+            })
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.post(TOKEN_URL, {
+            'email': 'user3@weeb.com', 'password': 'wrong'
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_non_object_body_rejected(self):
+        """
+            Test a JSON body that is not an object gets a 400, not a 500
+        """
+        for url in (TOKEN_URL, CREATE_USER_URL):
+            for body in ([], 'email', 1):
+                cache.clear()
+                res = self.client.post(url, body, format='json')
+
+                self.assertEqual(
+                    res.status_code, status.HTTP_400_BAD_REQUEST
+                )
+
+    def test_signup_throttled(self):
+        """
+            Test signups from one address are limited
+        """
+        for index in range(3):
+            res = self.client.post(CREATE_USER_URL, {
+                'email': f'new{index}@weeb.com', 'password': 'adafhhauhffs',
+                'name': 'new'
+            })
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        res = self.client.post(CREATE_USER_URL, {
+            'email': 'new3@weeb.com', 'password': 'adafhhauhffs',
+            'name': 'new'
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertFalse(
+            get_user_model().objects.filter(email='new3@weeb.com').exists()
+        )
+
+    @override_settings(REST_FRAMEWORK={'DEFAULT_THROTTLE_RATES': {}})
+    def test_throttles_disabled_without_rates(self):
+        """
+            Test an unset rate disables the limit
+        """
+        create_user(**self.payload)
+        for _ in range(4):
+            res = self.client.post(TOKEN_URL, self.payload)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -0,0 +1,44 @@
+from collections.abc import Mapping
+
+from django.contrib.auth import get_user_model
+
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class LoginRateThrottle(SimpleRateThrottle):
+    """
+        rate limit for endpoints that hash a password, checked before the
+        serializer runs so rejected requests cost no hashing
+
+        rates are read on every request from DEFAULT_THROTTLE_RATES, a
+        rate of None disables the throttle
+    """
+
+    def get_rate(self):
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+
+
+class LoginIPThrottle(LoginRateThrottle):
+    """attempts per client address"""
+    scope = 'login_ip'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            'scope': self.scope, 'ident': self.get_ident(request)
+        }
+
+
+class LoginEmailThrottle(LoginRateThrottle):
+    """attempts per account, however many addresses they come from"""
+    scope = 'login_email'
+
+    def get_cache_key(self, request, view):
+        # a JSON list or scalar body is left to the serializer's 400
+        if not isinstance(request.data, Mapping):
+            return None
+        email = request.data.get('email')
+        if not isinstance(email, str) or not email:
+            return None
+        email = get_user_model().objects.normalize_email(email).lower()
+        return self.cache_format % {'scope': self.scope, 'ident': email}
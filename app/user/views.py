@@ -1,16 +1,19 @@
 from django.contrib import auth
 from django.shortcuts import render
 
-from rest_framework import generics, authentication, permissions 
+from rest_framework import generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
 
+from user.authentication import CachedTokenAuthentication
 from user.serializers import UserSerializer, AuthTokenSerializer
+from user.throttling import LoginIPThrottle, LoginEmailThrottle
 
 
 class CreateUserView(generics.CreateAPIView):
     """ create a new user in the system"""
     serializer_class = UserSerializer
+    throttle_classes = (LoginIPThrottle, LoginEmailThrottle)
 
 
 
@@ -18,12 +21,13 @@ class CreateTokenView(ObtainAuthToken):
     """create a new auth token for user"""
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    throttle_classes = (LoginIPThrottle, LoginEmailThrottle)
 
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """Manage the authenticated user"""
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):